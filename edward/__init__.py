@@ -10,14 +10,19 @@ from edward import util
 
 # Direct imports for convenience
 from edward.criticisms import evaluate, ppc
-from edward.inferences import Inference, MonteCarlo, VariationalInference, \
-    HMC, MetropolisHastings, SGLD, \
-    KLpq, KLqp, MFVI, ReparameterizationKLqp, ReparameterizationKLKLqp, \
-    ReparameterizationEntropyKLqp, ScoreKLqp, ScoreKLKLqp, ScoreEntropyKLqp, \
-    MAP, Laplace
+from edward.inferences import Inference, MonteCarlo, SGMCMC, \
+    VariationalInference, \
+    AdaptiveMetropolisHastings, ConsensusMonteCarlo, \
+    EllipticalSliceSampling, EnsembleSampler, \
+    Gibbs, HMC, ImportanceSampling, MetropolisHastings, NUTS, \
+    ParallelTempering, SGHMC, SGLD, SMC, SubsampledMetropolisHastings, \
+    CAVI, IWVI, KLpq, KLqp, MFVI, ReparameterizationKLqp, \
+    ReparameterizationKLKLqp, ReparameterizationEntropyKLqp, ScoreKLqp, \
+    ScoreKLKLqp, ScoreEntropyKLqp, StochasticCAVI, SVI, MAP, Laplace
 from edward.models import PyMC3Model, PythonModel, StanModel, \
     RandomVariable
 from edward.util import copy, dot, get_dims, get_session, hessian, \
-    kl_multivariate_normal, log_sum_exp, logit, \
-    multivariate_rbf, placeholder, rbf, set_seed, tile, to_simplex
+    kl_divergence, kl_multivariate_normal, log_sum_exp, logit, \
+    multivariate_rbf, placeholder, rbf, register_kl, set_seed, tile, \
+    to_simplex
 from edward.version import __version__
@@ -0,0 +1,252 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import tensorflow as tf
+
+from edward.models import Empirical
+
+
+def autocorrelation(x):
+  """Autocorrelation of a Markov chain along its outer dimension.
+
+  It is computed in the graph with the fast Fourier transform, and it
+  is vectorized over all other dimensions.
+
+  Parameters
+  ----------
+  x : Empirical, tf.Tensor, np.ndarray, or list
+    Samples of shape ``[n, ...]``, where ``n`` is the number of
+    iterations. It can also be a list of such objects, each
+    representing a separate chain.
+
+  Returns
+  -------
+  tf.Tensor
+    Autocorrelation at lags ``0, ..., n - 1`` of shape ``[n, ...]``.
+    If ``x`` is a list, the shape is ``[n_chains, n, ...]``.
+
+  Examples
+  --------
+  >>> qz = Empirical(params=tf.Variable(tf.zeros([1000, 5])))
+  >>> # ... run inference ...
+  >>> rho = ed.criticisms.autocorrelation(qz)  # shape [1000, 5]
+  """
+  chains = _to_chains(x)
+  acov = _autocovariance(chains)
+  rank = len(acov.get_shape())
+  lag_zero = tf.slice(acov, tf.zeros([rank], dtype=tf.int32),
+                      [-1, 1] + [-1] * (rank - 2))
+  acor = acov / lag_zero
+  if isinstance(x, list):
+    return acor
+  else:
+    return tf.squeeze(acor, [0])
+
+
+def effective_sample_size(x):
+  """Effective sample size of a Markov chain (Geyer, 1992; Gelman et
+  al., 2013).
+
+  The autocorrelations are combined across chains (when available)
+  and summed over Geyer's initial positive sequence, which is
+  truncated in the graph. It is vectorized over all dimensions of
+  the samples.
+
+  Parameters
+  ----------
+  x : Empirical, tf.Tensor, np.ndarray, or list
+    Samples of shape ``[n, ...]``, where ``n`` is the number of
+    iterations. It can also be a list of such objects, each
+    representing a separate chain of the same length.
+
+  Returns
+  -------
+  tf.Tensor
+    Effective sample size for each dimension, of shape ``[...]``.
+  """
+  chains = _to_chains(x)
+  m = chains.get_shape()[0].value
+  n = tf.cast(tf.shape(chains)[1], tf.float32)
+  acov = _autocovariance(chains)
+  var_plus = _var_plus(chains, m, n)
+  _, chain_var = tf.nn.moments(chains, [1])
+  within = tf.reduce_mean(chain_var, 0) * n / (n - 1.0)
+  rho = 1.0 - (within - tf.reduce_mean(acov, 0)) / var_plus
+
+  # Sum autocorrelations in consecutive pairs, stopping at the first
+  # pair whose sum is negative (Geyer's initial positive sequence).
+  n_pairs = tf.shape(rho)[0] // 2
+  rest = tf.shape(rho)[1:]
+  rho = tf.slice(rho, tf.zeros_like(tf.shape(rho)),
+                 tf.concat(0, [tf.expand_dims(2 * n_pairs, 0), rest]))
+  rho = tf.reshape(rho, tf.concat(0, [tf.pack([n_pairs, 2]), rest]))
+  pairs = tf.reduce_sum(rho, 1)
+  mask = tf.cumprod(tf.cast(pairs > 0.0, tf.float32), axis=0)
+  tau = -1.0 + 2.0 * tf.reduce_sum(pairs * mask, 0)
+  return m * n / tau
+
+
+def potential_scale_reduction(x):
+  """Split potential scale reduction factor, or split R-hat (Gelman
+  and Rubin, 1992; Gelman et al., 2013).
+
+  Each chain is split into halves, and R-hat compares the
+  between-chain and within-chain variance of the halves. Values close
+  to 1 suggest convergence. It is vectorized over all dimensions of
+  the samples.
+
+  Parameters
+  ----------
+  x : Empirical, tf.Tensor, np.ndarray, or list
+    Samples of shape ``[n, ...]``, where ``n`` is the number of
+    iterations. It can also be a list of such objects, each
+    representing a separate chain of the same length.
+
+  Returns
+  -------
+  tf.Tensor
+    Split R-hat for each dimension, of shape ``[...]``.
+  """
+  chains = _to_chains(x)
+  m = 2 * chains.get_shape()[0].value
+  chains = _split_chains(chains)
+  n = tf.cast(tf.shape(chains)[1], tf.float32)
+  var_plus = _var_plus(chains, m, n)
+  _, chain_var = tf.nn.moments(chains, [1])
+  within = tf.reduce_mean(chain_var, 0) * n / (n - 1.0)
+  return tf.sqrt(var_plus / within)
+
+
+def monte_carlo_standard_error(x):
+  """Monte Carlo standard error of the posterior mean estimate.
+
+  Parameters
+  ----------
+  x : Empirical, tf.Tensor, np.ndarray, or list
+    Samples of shape ``[n, ...]``, where ``n`` is the number of
+    iterations. It can also be a list of such objects, each
+    representing a separate chain of the same length.
+
+  Returns
+  -------
+  tf.Tensor
+    Standard error for each dimension, of shape ``[...]``.
+  """
+  chains = _to_chains(x)
+  m = chains.get_shape()[0].value
+  n = tf.cast(tf.shape(chains)[1], tf.float32)
+  return tf.sqrt(_var_plus(chains, m, n) / effective_sample_size(x))
+
+
+def pareto_k(log_weights):
+  """Shape parameter k of a generalized Pareto distribution fit to the
+  largest importance weights (Vehtari et al., 2015).
+
+  It diagnoses the reliability of importance sampling estimates. For
+  k < 0.5, the weights have finite variance; for 0.5 <= k < 0.7,
+  estimates are still usable; for k >= 0.7, they are unreliable. The
+  fit uses the largest min(n / 5, 3 sqrt(n)) weights and the method
+  of Zhang and Stephens (2009), with a weak prior on k.
+
+  Parameters
+  ----------
+  log_weights : tf.Tensor or np.ndarray
+    Vector of unnormalized log importance weights, of known size.
+
+  Returns
+  -------
+  tf.Tensor
+    Scalar estimate of k.
+  """
+  log_weights = tf.cast(tf.convert_to_tensor(log_weights), tf.float32)
+  n = log_weights.get_shape()[0].value
+  m = int(min(n / 5.0, 3.0 * np.sqrt(n)))
+  top, _ = tf.nn.top_k(log_weights, m + 1)
+  # Exceedances of the largest m weights over the next largest, in
+  # ascending order.
+  x = tf.exp(tf.slice(top, [0], [m]) - top[0]) - tf.exp(top[m] - top[0])
+  x = tf.reverse(x, [True])
+
+  n_grid = 30 + int(np.sqrt(m))
+  grid = 1.0 - np.sqrt(n_grid / (np.arange(1, n_grid + 1) - 0.5))
+  quartile = x[int(m / 4.0 + 0.5) - 1]
+  b = tf.constant(grid, dtype=tf.float32) / (3.0 * quartile) + 1.0 / x[m - 1]
+  k = tf.reduce_mean(tf.log(1.0 - tf.expand_dims(b, 1) * x), 1)
+  log_lik = m * (tf.log(-b / k) - k - 1.0)
+  weights = 1.0 / tf.reduce_sum(
+      tf.exp(tf.expand_dims(log_lik, 0) - tf.expand_dims(log_lik, 1)), 1)
+  b_post = tf.reduce_sum(b * weights)
+  k_post = tf.reduce_mean(tf.log(1.0 - b_post * x))
+  return (m * k_post + 10.0 * 0.5) / (m + 10.0)
+
+
+def _to_chains(x):
+  """Stack samples into a tensor of shape ``[n_chains, n, ...]``."""
+  if isinstance(x, list):
+    return tf.pack([_to_samples(chain) for chain in x])
+  else:
+    return tf.expand_dims(_to_samples(x), 0)
+
+
+def _to_samples(x):
+  if isinstance(x, Empirical):
+    x = x.gather(tf.range(x.n_filled))
+
+  return tf.cast(tf.convert_to_tensor(x), tf.float32)
+
+
+def _split_chains(chains):
+  """Split each chain into halves, dropping the middle sample if the
+  number of iterations is odd."""
+  shape = tf.shape(chains)
+  half = shape[1] // 2
+  first = tf.slice(chains, tf.zeros_like(shape),
+                   tf.concat(0, [shape[:1], tf.expand_dims(half, 0),
+                                 shape[2:]]))
+  second = tf.slice(chains,
+                    tf.concat(0, [[0], tf.expand_dims(shape[1] - half, 0),
+                                  tf.zeros_like(shape[2:])]),
+                    tf.concat(0, [shape[:1], tf.expand_dims(half, 0),
+                                  shape[2:]]))
+  return tf.concat(0, [first, second])
+
+
+def _var_plus(chains, m, n):
+  """Marginal posterior variance estimate, pooling the within-chain
+  and between-chain variances of ``m`` chains of length ``n``."""
+  chain_mean, chain_var = tf.nn.moments(chains, [1])
+  within = tf.reduce_mean(chain_var, 0) * n / (n - 1.0)
+  var_plus = (n - 1.0) / n * within
+  if m > 1:
+    _, between = tf.nn.moments(chain_mean, [0])
+    var_plus += between * m / (m - 1.0)
+
+  return var_plus
+
+
+def _autocovariance(chains):
+  """Biased autocovariance of each chain along its second dimension.
+
+  The chains are zero-padded to twice their length so that the
+  circular convolution computed by the FFT equals the linear one.
+  """
+  rank = len(chains.get_shape())
+  # Move the iteration dimension innermost, where ``tf.fft`` operates.
+  perm = [0] + list(range(2, rank)) + [1]
+  inv_perm = [0, rank - 1] + list(range(1, rank - 1))
+  y = tf.transpose(chains, perm)
+  y -= tf.reduce_mean(y, rank - 1, keep_dims=True)
+
+  n = tf.shape(y)[rank - 1]
+  paddings = tf.concat(0, [tf.zeros([rank - 1, 2], dtype=tf.int32),
+                           tf.reshape(tf.pack([0, n]), [1, 2])])
+  y = tf.pad(y, paddings)
+  f = tf.fft(tf.complex(y, tf.zeros_like(y)))
+  acov = tf.real(tf.ifft(f * tf.conj(f)))
+  acov = tf.slice(acov, tf.zeros([rank], dtype=tf.int32),
+                  tf.concat(0, [-tf.ones([rank - 1], dtype=tf.int32),
+                                tf.expand_dims(n, 0)]))
+  acov /= tf.cast(n, tf.float32)
+  return tf.transpose(acov, inv_perm)
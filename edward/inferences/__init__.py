@@ -2,12 +2,28 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+from edward.inferences.adaptive_metropolis_hastings import *
+from edward.inferences.cavi import *
+from edward.inferences.conjugacy import *
+from edward.inferences.consensus_monte_carlo import *
+from edward.inferences.elliptical_slice_sampling import *
+from edward.inferences.ensemble_sampler import *
+from edward.inferences.gibbs import *
 from edward.inferences.hmc import *
+from edward.inferences.importance_sampling import *
 from edward.inferences.inference import *
+from edward.inferences.iwvi import *
 from edward.inferences.klpq import *
 from edward.inferences.klqp import *
 from edward.inferences.map import *
 from edward.inferences.metropolis_hastings import *
 from edward.inferences.monte_carlo import *
+from edward.inferences.nuts import *
+from edward.inferences.parallel_tempering import *
+from edward.inferences.sghmc import *
 from edward.inferences.sgld import *
+from edward.inferences.sgmcmc import *
+from edward.inferences.smc import *
+from edward.inferences.subsampled_metropolis_hastings import *
+from edward.inferences.svi import *
 from edward.inferences.variational_inference import *
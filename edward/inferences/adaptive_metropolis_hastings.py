@@ -0,0 +1,145 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import six
+import tensorflow as tf
+
+from edward.inferences.metropolis_hastings import MetropolisHastings
+
+
+class AdaptiveMetropolisHastings(MetropolisHastings):
+  """Adaptive Metropolis (Haario et al., 2001).
+
+  It is random walk Metropolis-Hastings whose proposal covariance is
+  learned from the chain. The proposal is a multivariate normal over
+  all latent variables jointly, centered at the last sample. Its
+  covariance is the running covariance of the chain, scaled by
+  2.38^2 / d (Gelman et al., 1996), where d is the total number of
+  dimensions.
+  """
+  def __init__(self, latent_vars, data=None, model_wrapper=None):
+    """
+    Examples
+    --------
+    >>> z = Normal(mu=0.0, sigma=1.0)
+    >>> x = Normal(mu=tf.ones(10) * z, sigma=1.0)
+    >>>
+    >>> qz = Empirical(tf.Variable(tf.zeros([500])))
+    >>> data = {x: np.array([0.0] * 10, dtype=np.float32)}
+    >>> inference = ed.AdaptiveMetropolisHastings({z: qz}, data)
+    """
+    super(AdaptiveMetropolisHastings, self).__init__(
+        latent_vars, {}, data, model_wrapper)
+
+  def initialize(self, n_adapt=1000, n_initial=100, initial_scale=0.1,
+                 epsilon=1e-6, *args, **kwargs):
+    """
+    Parameters
+    ----------
+    n_adapt : int, optional
+      Number of iterations during which the covariance is adapted.
+      After that, the proposal is fixed, so the chain is Markov.
+    n_initial : int, optional
+      Number of iterations before the running covariance is used.
+      Until then, the proposal has covariance ``initial_scale^2 I``.
+    initial_scale : float, optional
+      Standard deviation of the initial proposal.
+    epsilon : float, optional
+      Small constant added to the diagonal of the running
+      covariance, so that the proposal is nondegenerate.
+    """
+    self.n_adapt = n_adapt
+    self.n_initial = n_initial
+    self.initial_scale = initial_scale
+    self.epsilon = epsilon
+
+    self.shapes = [qz.get_event_shape().as_list()
+                   for qz in six.itervalues(self.latent_vars)]
+    self.dim = int(np.sum([np.prod(shape, dtype=np.int32)
+                           for shape in self.shapes]))
+    self.n_samples = tf.Variable(0.0, trainable=False)
+    self.sample_mean = tf.Variable(tf.zeros([self.dim]), trainable=False)
+    self._m2 = tf.Variable(tf.zeros([self.dim, self.dim]), trainable=False)
+    self.sample_cov = self._m2 / tf.maximum(self.n_samples - 1.0, 1.0)
+    return super(AdaptiveMetropolisHastings, self).initialize(*args, **kwargs)
+
+  def build_update(self):
+    """
+    Draw sample from a multivariate normal centered at the last
+    sample. Then accept or reject the sample based on the ratio,
+
+    ratio = log p(x, znew) - log p(x, zold),
+
+    where log p(x, zold) is cached from the previous iteration if the
+    data is the same across iterations (see
+    ``MetropolisHastings.build_update``). While
+    adapting, the running mean and covariance of the chain are updated
+    with the new sample.
+    """
+    keys = list(six.iterkeys(self.latent_vars))
+    old_sample = self._read_sample()
+    old_flat = tf.concat(0, [tf.reshape(old_sample[z], [-1]) for z in keys])
+
+    # Draw proposed sample.
+    eye = tf.diag(tf.ones([self.dim]))
+    scale = 2.38 ** 2 / self.dim
+    chol = tf.cond(self.n_samples < self.n_initial,
+                   lambda: self.initial_scale * eye,
+                   lambda: tf.cholesky(
+                       scale * (self.sample_cov + self.epsilon * eye)))
+    eps = tf.random_normal([self.dim, 1])
+    new_flat = old_flat + tf.reshape(tf.matmul(chol, eps), [-1])
+    new_sample = self._unflatten(new_flat, keys)
+
+    # Calculate acceptance ratio. The proposal is symmetric.
+    new_log_joint = self.log_joint(new_sample)
+    if self._fixed_data():
+      old_log_joint = tf.cond(tf.equal(self.t, 0),
+                              lambda: self.log_joint(old_sample),
+                              lambda: tf.identity(self.current_log_joint))
+    else:
+      old_log_joint = self.log_joint(old_sample)
+
+    ratio = new_log_joint - old_log_joint
+
+    # Accept or reject sample.
+    u = tf.random_uniform([])
+    accept = tf.log(u) < ratio
+    sample_flat = tf.select(accept, new_flat, old_flat)
+    sample = self._unflatten(sample_flat, keys)
+
+    # Update Empirical random variables.
+    assign_ops = self._write_sample(sample)
+
+    # Update log joint of the current state.
+    assign_ops.append(self.current_log_joint.assign(
+        tf.select(accept, new_log_joint, old_log_joint)))
+
+    # Update running mean and covariance (if adapting) with Welford's
+    # algorithm.
+    adapt = tf.cast(self.t < self.n_adapt, tf.float32)
+    delta = sample_flat - self.sample_mean
+    mean_new = self.sample_mean + adapt * delta / (self.n_samples + 1.0)
+    m2_new = self._m2 + adapt * tf.matmul(
+        tf.expand_dims(delta, 1), tf.expand_dims(sample_flat - mean_new, 0))
+    assign_ops.append(self.sample_mean.assign(mean_new))
+    assign_ops.append(self._m2.assign(m2_new))
+    with tf.control_dependencies([mean_new, m2_new]):
+      assign_ops.append(self.n_samples.assign_add(adapt))
+
+    # Increment n_accept (if accepted).
+    assign_ops.append(self.n_accept.assign_add(tf.select(accept, 1, 0)))
+    return tf.group(*assign_ops)
+
+  def _unflatten(self, flat, keys):
+    """Split a vector of all latent variables into a dictionary."""
+    sample = {}
+    start = 0
+    for z, shape in zip(keys, self.shapes):
+      size = int(np.prod(shape, dtype=np.int32))
+      sample[z] = tf.reshape(tf.slice(flat, [start], [size]), shape)
+      start += size
+
+    return sample
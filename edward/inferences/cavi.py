@@ -0,0 +1,351 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import six
+import tensorflow as tf
+
+from edward.inferences.conjugacy import complete_conditional, is_conjugate
+from edward.inferences.inference import Inference
+from edward.inferences.variational_inference import VariationalInference
+from edward.models import Bernoulli, Beta, Dirichlet, Gamma, InverseGamma, \
+    MultivariateNormalFull, Normal, RandomVariable
+from edward.util import copy, get_children
+
+
+class CAVI(VariationalInference):
+  """Coordinate ascent variational inference (Bishop, 2006; Blei et
+  al., 2017) for conditionally conjugate models.
+
+  Each variational factor q(z_i) is set in turn to its optimum given
+  the others,
+
+  .. math::
+
+    q(z_i) \propto \exp E_{q(z_{-i})} [ \log p(z_i | x, z_{-i}) ].
+
+  For a latent variable conjugate to its children, this is in the
+  family of its complete conditional, with the expected natural
+  parameters. They are found in the graph with
+  ``complete_conditional`` applied to the expected log density of the
+  Markov blanket, so no conjugate pairs need to be written down.
+  """
+  def __init__(self, latent_vars, data=None, model_wrapper=None):
+    """
+    Examples
+    --------
+    >>> p = Beta(a=1.0, b=1.0)
+    >>> x = Bernoulli(p=tf.ones(10) * p)
+    >>>
+    >>> qp = Beta(a=tf.Variable(1.0), b=tf.Variable(1.0))
+    >>> data = {x: np.array([0, 1, 0, 0, 0, 0, 0, 0, 0, 1])}
+    >>> inference = ed.CAVI({p: qp}, data)
+
+    Notes
+    -----
+    Each latent variable must be conjugate to its children, which is
+    checked with ``is_conjugate``. Its variational factor must be of
+    the family of its complete conditional, i.e., its own family, and
+    ``Normal`` or ``MultivariateNormalFull`` for ``Normal`` latent
+    variables. The parameters of each variational factor must be
+    ``tf.Variable``s; the logits or probabilities for ``Bernoulli``,
+    and the logits for ``Categorical``.
+    """
+    if model_wrapper is not None:
+      raise NotImplementedError("CAVI is not supported for model "
+                                "wrappers.")
+
+    super(CAVI, self).__init__(latent_vars, data, model_wrapper)
+
+  def initialize(self, n_samples=1, *args, **kwargs):
+    """Initialize inference algorithm.
+
+    Parameters
+    ----------
+    n_samples : int, optional
+      Number of samples from the other variational factors to
+      estimate the expected log density of each latent variable's
+      Markov blanket. The expected natural parameters are linear in
+      it, so their estimates are unbiased; they are exact for one
+      sample if the Markov blanket has no other latent variables.
+    """
+    self.n_samples = n_samples
+    self.scope_iter = 0  # a convenient counter for log joint calculations
+    rvs = list(six.iterkeys(self.latent_vars)) + \
+        [x for x in six.iterkeys(self.data) if isinstance(x, RandomVariable)]
+    self.children = {z: get_children(z, rvs)
+                     for z in six.iterkeys(self.latent_vars)}
+    for z, qz in six.iteritems(self.latent_vars):
+      if not is_conjugate(z, self.children[z]):
+        raise ValueError("Latent variable is not conjugate to its "
+                         "children: " + str(z))
+
+      if isinstance(z, Normal):
+        families = (Normal, MultivariateNormalFull)
+      else:
+        families = type(z)
+
+      if not isinstance(qz, families):
+        raise TypeError("Variational factor must be of the family of the "
+                        "complete conditional: " + str(qz))
+
+    # There is no optimizer, so skip ``VariationalInference``.
+    Inference.initialize(self, *args, **kwargs)
+    self.train = self.build_update()
+
+  def build_update(self):
+    """
+    Sweep through the latent variables, setting each variational
+    factor to the complete conditional under the expected log density
+    of its Markov blanket, given the latest factors of the others.
+    The negative ELBO of the updated factors is estimated with
+    ``n_samples`` samples and tracked in ``loss``.
+
+    Notes
+    -----
+    The updates assume each variational factor is directly
+    parameterized by tf.Variables().
+    """
+    qs = self.latent_vars.copy()
+    samples = {z: self._sample_n(z, qz)
+               for z, qz in six.iteritems(self.latent_vars)}
+    params = {}
+    for z in self._update_order():
+      cond = complete_conditional(z, self._log_prob_fn(z, samples))
+      params[z] = self._params(z, cond)
+      rho = self._step_size(z)
+      if rho is not None:
+        params[z] = self._natural_step(z, params[z], rho)
+
+      qs[z] = type(self.latent_vars[z])(**params[z])
+      samples[z] = self._sample_n(z, qs[z])
+
+    self.loss = -self._elbo(qs, samples)
+
+    # Update variational parameters.
+    variables = {x.name: x for x in
+                 tf.get_default_graph().get_collection(tf.GraphKeys.VARIABLES)}
+    assign_ops = []
+    for z, qz in six.iteritems(self.latent_vars):
+      for name, value in six.iteritems(params[z]):
+        param = getattr(qz, name)
+        variable = _get_variable(param, variables)
+        if variable is None and isinstance(qz, Bernoulli):
+          param = qz.p
+          variable = _get_variable(param, variables)
+          value = tf.sigmoid(value)
+
+        if variable is None:
+          raise TypeError("Variational factor must be directly "
+                          "parameterized by tf.Variables: " + str(qz))
+
+        assign_ops.append(variable.assign(
+            tf.reshape(value, tf.shape(param))))
+
+    return tf.group(*assign_ops)
+
+  def _elbo(self, qs, samples):
+    """Monte Carlo estimate of the ELBO with samples of the
+    variational factors."""
+    elbo = 0.0
+    for s in range(self.n_samples):
+      self.scope_iter += 1
+      z_sample = {z: sample[s] for z, sample in six.iteritems(samples)}
+      for z, qz in six.iteritems(qs):
+        z_copy = copy(z, z_sample, scope='prior' + str(self.scope_iter))
+        elbo += self.scale.get(z, 1.0) * \
+            tf.reduce_sum(z_copy.log_prob(z_sample[z]))
+        elbo -= self.scale.get(z, 1.0) * tf.reduce_sum(qz.log_prob(
+            tf.reshape(z_sample[z], tf.shape(qz.value()))))
+
+      for x, obs in six.iteritems(self.data):
+        if isinstance(x, RandomVariable):
+          x_z = copy(x, z_sample, scope='likelihood' + str(self.scope_iter))
+          elbo += self.scale.get(x, 1.0) * tf.reduce_sum(x_z.log_prob(obs))
+
+    return elbo / self.n_samples
+
+  def _log_prob_fn(self, z, samples):
+    """Return function mapping a value of ``z`` to the log density
+    terms of its Markov blanket, averaged over samples of the other
+    variational factors: its log prior and the log likelihood of its
+    children."""
+    def log_prob(value):
+      terms = []
+      for s in range(self.n_samples):
+        self.scope_iter += 1
+        scope = 'conditional' + str(self.scope_iter)
+        z_sample = {rv: sample[s] for rv, sample in six.iteritems(samples)}
+        z_sample[z] = value
+        for rv in [z] + self.children[z]:
+          rv_copy = copy(rv, z_sample, scope=scope)
+          if rv in self.data:
+            term = rv_copy.log_prob(self.data[rv])
+          else:
+            term = rv_copy.log_prob(z_sample[rv])
+
+          terms.append(self._scale(z, rv) / self.n_samples * term)
+
+      return terms
+
+    return log_prob
+
+  def _natural_step(self, z, params, rho):
+    """Move the natural parameters of the variational factor of ``z``
+    toward those of ``params`` by ``rho``, i.e., a natural gradient
+    step of size ``rho`` (Hoffman et al., 2013)."""
+    qz = self.latent_vars[z]
+    if isinstance(qz, Normal):
+      prec_old = 1.0 / tf.square(qz.sigma)
+      prec_new = 1.0 / tf.square(params['sigma'])
+      prec = (1.0 - rho) * prec_old + rho * prec_new
+      mu = ((1.0 - rho) * prec_old * qz.mu +
+            rho * prec_new * params['mu']) / prec
+      return {'mu': mu, 'sigma': tf.rsqrt(prec)}
+    elif isinstance(qz, MultivariateNormalFull):
+      prec_old = tf.matrix_inverse(qz.sigma)
+      prec_new = tf.matrix_inverse(params['sigma'])
+      cov = tf.matrix_inverse((1.0 - rho) * prec_old + rho * prec_new)
+      eta = (1.0 - rho) * tf.matmul(prec_old, tf.expand_dims(qz.mu, 1)) + \
+          rho * tf.matmul(prec_new, tf.expand_dims(params['mu'], 1))
+      return {'mu': tf.squeeze(tf.matmul(cov, eta), [1]), 'sigma': cov}
+    else:
+      # The natural parameters are affine in the parameters.
+      return {name: (1.0 - rho) * getattr(qz, name) + rho * value
+              for name, value in six.iteritems(params)}
+
+  def _params(self, z, cond):
+    """Parameters of the variational factor of ``z`` at the complete
+    conditional ``cond``."""
+    qz = self.latent_vars[z]
+    if isinstance(cond, MultivariateNormalFull):
+      if isinstance(qz, Normal):
+        # The optimal fully factorized normal has the conditional
+        # means and the inverse diagonal of the precision.
+        shape = tf.shape(qz.mu)
+        prec = tf.diag_part(tf.matrix_inverse(cond.sigma))
+        return {'mu': tf.reshape(cond.mu, shape),
+                'sigma': tf.reshape(tf.rsqrt(prec), shape)}
+      else:
+        return {'mu': cond.mu, 'sigma': cond.sigma}
+    elif isinstance(cond, Beta):
+      return {'a': cond.a, 'b': cond.b}
+    elif isinstance(cond, (Gamma, InverseGamma)):
+      return {'alpha': cond.alpha, 'beta': cond.beta}
+    elif isinstance(cond, Dirichlet):
+      return {'alpha': cond.alpha}
+    else:
+      return {'logits': cond.logits}
+
+  def _scale(self, z, rv):
+    """Scale of the log density of ``rv`` in the complete conditional
+    of ``z``."""
+    return self.scale.get(rv, 1.0)
+
+  def _step_size(self, z):
+    """Step size of the natural gradient step of the variational factor
+    of ``z``, or None to set it to its optimum."""
+    return None
+
+  def _update_order(self):
+    """Latent variables in the order their factors are updated."""
+    return list(six.iterkeys(self.latent_vars))
+
+  def _sample_n(self, z, qz):
+    """Draw ``n_samples`` samples of ``z`` from its variational
+    factor, in the shape of ``z``."""
+    sample = qz.sample_n(self.n_samples)
+    return tf.reshape(sample, tf.concat(0, [[self.n_samples],
+                                            tf.shape(z.value())]))
+
+
+class StochasticCAVI(CAVI):
+  """Stochastic variational inference (Hoffman et al., 2013) for
+  conditionally conjugate models.
+
+  At each iteration, the expected natural parameters of each global
+  variational factor are computed as in ``CAVI``, with the
+  log-likelihood of a minibatch of data scaled to the full data.
+  The factor then takes a natural gradient step of size
+  :math:`\\rho_t = (t + \\tau)^{-\\kappa}`, i.e., its natural
+  parameters move toward them by :math:`\\rho_t`. Local variational
+  factors, for latent variables of the minibatch, are set to their
+  optimum given the global factors.
+  """
+  def initialize(self, tau=1.0, kappa=0.7, local_vars=None, *args,
+                 **kwargs):
+    """
+    Parameters
+    ----------
+    tau : float, optional
+      Delay of the step size schedule, positive. It down-weights
+      early iterations.
+    kappa : float, optional
+      Forgetting rate of the step size schedule, in (0.5, 1].
+    local_vars : list of RandomVariable, optional
+      Latent variables local to the minibatch. Their variational
+      factors are updated first, in closed form, and only depend on
+      the minibatch; their parameters must be fed or re-initialized
+      with it. Default is no local variables.
+
+    Notes
+    -----
+    If ``n_minibatch`` is specified and ``scale`` is not, the log
+    densities of each observed variable and local latent variable are
+    scaled by the ratio of data size to minibatch size, so that the
+    expected natural parameters of global factors are unbiased
+    estimates of the full data's. The complete conditionals of local
+    latent variables are not scaled.
+    """
+    if tau <= 0:
+      raise ValueError("tau must be positive.")
+
+    if local_vars is None:
+      local_vars = []
+
+    self.tau = tau
+    self.kappa = kappa
+    self.local_vars = local_vars
+
+    n_minibatch = kwargs.get('n_minibatch', None)
+    if n_minibatch is not None and kwargs.get('scale', None) is None:
+      n_data = [obs.get_shape()[0].value for x, obs in
+                six.iteritems(self.data) if isinstance(x, RandomVariable)]
+      scale = float(n_data[0]) / n_minibatch
+      kwargs['scale'] = {rv: scale for rv in
+                         list(six.iterkeys(self.data)) + local_vars
+                         if isinstance(rv, RandomVariable)}
+
+    return super(StochasticCAVI, self).initialize(*args, **kwargs)
+
+  def _scale(self, z, rv):
+    if z in self.local_vars:
+      # Scaling every term would temper the conditional.
+      return 1.0
+
+    return super(StochasticCAVI, self)._scale(z, rv)
+
+  def _step_size(self, z):
+    if z in self.local_vars:
+      return None
+
+    t = tf.cast(self.t, tf.float32)
+    return tf.pow(t + self.tau, -self.kappa)
+
+  def _update_order(self):
+    # Update local variables before global variables.
+    return self.local_vars + \
+        [z for z in six.iterkeys(self.latent_vars)
+         if z not in self.local_vars]
+
+
+def _get_variable(tensor, variables):
+  """Variable which ``tensor`` reads, possibly through identity ops,
+  or None if there is none."""
+  while tensor.name not in variables:
+    if tensor.op.type != 'Identity':
+      return None
+
+    tensor = tensor.op.inputs[0]
+
+  return variables[tensor.name]
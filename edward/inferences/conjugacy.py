@@ -0,0 +1,361 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import six
+import tensorflow as tf
+
+from edward.models import Bernoulli, Beta, Categorical, Dirichlet, Gamma, \
+    InverseGamma, MultivariateNormalFull, Normal, RandomVariable
+from edward.util import hessian
+
+# Families of children for which each family of random variable is a
+# conjugate prior, with the parameters of the child through which it
+# may depend on the random variable. Each parameter is bound to the
+# operation it must apply to the random variable, if any, and to
+# whether it may scale the result by constants; e.g., the standard
+# deviation of a Normal child is ``c * tf.rsqrt(z)`` for a Gamma
+# prior on its precision ``z``. The mean of a Normal child must be
+# linear in a Normal random variable.
+_CONJUGATE_CHILDREN = {
+    'Beta': {'Bernoulli': {'p': (None, False)},
+             'Binomial': {'p': (None, False)}},
+    'Dirichlet': {'Categorical': {'p': (None, False),
+                                  'logits': ('Log', False)},
+                  'Multinomial': {'p': (None, False),
+                                  'logits': ('Log', False)}},
+    'Gamma': {'Exponential': {'lam': (None, True)},
+              'Gamma': {'beta': (None, True)},
+              'Normal': {'sigma': ('Rsqrt', True)},
+              'Poisson': {'lam': (None, True)}},
+    'InverseGamma': {'Normal': {'sigma': ('Sqrt', True)}},
+    'Normal': {'Normal': {'mu': None}},
+}
+
+# Operations which only reshape or broadcast their input.
+_SHAPE_OPS = ['ExpandDims', 'Gather', 'Identity', 'Pack', 'Reshape', 'Slice',
+              'Squeeze', 'StridedSlice', 'Tile', 'Transpose']
+
+# Operations through which the mean of a Normal child is linear in a
+# Normal random variable, if only one of their inputs depends on it.
+_LINEAR_OPS = ['Add', 'AddN', 'BatchMatMul', 'Cast', 'Concat', 'ConcatV2',
+               'ExpandDims', 'Gather', 'Identity', 'MatMul', 'Mul', 'Neg',
+               'Pack', 'Reshape', 'Slice', 'Squeeze', 'StridedSlice', 'Sub',
+               'Sum', 'Tile', 'Transpose']
+
+# Elementwise operations, through which each element of a child's
+# parameter depends on at most one element of a discrete random
+# variable.
+_ELEMENTWISE_OPS = ['Abs', 'Add', 'Cast', 'Div', 'Equal', 'Exp', 'Gather',
+                    'Greater', 'Identity', 'Less', 'Log', 'Maximum',
+                    'Minimum', 'Mul', 'Neg', 'NotEqual', 'OneHot', 'Pow',
+                    'RealDiv', 'Select', 'Sigmoid', 'Softplus', 'Sqrt',
+                    'Square', 'Sub', 'Tanh']
+
+
+def is_conjugate(rv, children):
+  """Check whether a random variable is a conjugate prior for its
+  children.
+
+  The check is on the families of the random variables, on the
+  parameters through which each child depends on ``rv``, and on the
+  operations on the paths from ``rv`` to them: the success
+  probability of Bernoulli and Binomial, as ``rv`` itself; the
+  probabilities of Categorical and Multinomial, as ``rv`` itself, or
+  their logits, as ``tf.log(rv)``; the rate of Exponential, Gamma,
+  and Poisson, as ``rv`` times a constant; the standard deviation of
+  Normal, as a constant times ``tf.rsqrt(rv)`` for Gamma and
+  ``tf.sqrt(rv)`` for InverseGamma; and the mean of Normal (for
+  Normal), through linear operations only. Reshaping, broadcasting,
+  and multiplying by ones are allowed on all paths.
+
+  Discrete random variables are conjugate to any children, as their
+  complete conditional is found by enumeration, if the children's
+  parameters depend on them through elementwise operations only, so
+  that their elements are conditionally independent.
+
+  Parameters
+  ----------
+  rv : RandomVariable
+    Random variable with a prior.
+  children : list of RandomVariable
+    Random variables whose distribution depends on ``rv``.
+
+  Returns
+  -------
+  bool
+    Whether the complete conditional of ``rv`` is available in
+    closed form with ``complete_conditional``.
+  """
+  value = rv.value()
+  if isinstance(rv, (Bernoulli, Categorical)):
+    return all(_depends_through(param, value, _ELEMENTWISE_OPS)
+               for child in children
+               for param in six.itervalues(_get_params(child, value)))
+
+  name = type(rv).__name__
+  if name not in _CONJUGATE_CHILDREN:
+    return False
+
+  for child in children:
+    allowed = _CONJUGATE_CHILDREN[name].get(type(child).__name__, {})
+    params = _get_params(child, value)
+    if not params or any(key not in allowed for key in params):
+      return False
+
+    for key, param in six.iteritems(params):
+      if name == 'Normal':
+        if not _depends_through(param, value, _LINEAR_OPS, linear=True):
+          return False
+      elif not _depends_through_transform(param, value, *allowed[key]):
+        return False
+
+  return True
+
+
+def _get_params(rv, value):
+  """Parameters of ``rv`` which depend on ``value``, keyed by name."""
+  params = {}
+  for key, param in six.iteritems(rv._kwargs):
+    if isinstance(param, RandomVariable):
+      param = param.value()
+
+    if isinstance(param, tf.Tensor) and _get_path_ops(param, value):
+      params[key] = param
+
+  return params
+
+
+def _get_path_ops(tensor, value):
+  """Operations on the paths from ``value`` to ``tensor``, as a dict
+  binding each to the indices of its inputs which depend on
+  ``value``."""
+  depends = {value: True}
+  path_ops = {}
+
+  def _visit(t):
+    if t not in depends:
+      depends[t] = False
+      indices = [i for i, x in enumerate(t.op.inputs) if _visit(x)]
+      if indices:
+        depends[t] = True
+        path_ops[t.op] = indices
+
+    return depends[t]
+
+  _visit(tensor)
+  return path_ops
+
+
+def _depends_through(tensor, value, op_types, linear=False):
+  """Whether ``tensor`` depends on ``value`` only through operations
+  of the given types, and, for gathers, as indices if ``value`` is
+  discrete and as parameters otherwise. If ``linear``, products must
+  have only one input depending on ``value``."""
+  index = 1 if value.dtype.is_integer else 0
+  for op, indices in six.iteritems(_get_path_ops(tensor, value)):
+    if op.type not in op_types:
+      return False
+
+    if op.type == 'Gather':
+      if indices != [index]:
+        return False
+    elif (linear and op.type in ['Mul', 'MatMul', 'BatchMatMul'] and
+          len(indices) > 1):
+      return False
+
+  return True
+
+
+def _depends_through_transform(tensor, value, transform, scaled):
+  """Whether ``tensor`` is the operation of type ``transform``, if
+  any, applied to ``value``, up to reshaping and broadcasting, and,
+  if ``scaled``, to multiplying or dividing by tensors which do not
+  depend on ``value``."""
+  path_ops = _get_path_ops(tensor, value)
+  if transform is not None:
+    transform_ops = [op for op in path_ops if op.type == transform]
+    if len(transform_ops) != 1:
+      return False
+
+    op = transform_ops[0]
+    inner_ops = _get_path_ops(op.inputs[0], value)
+    outer_ops = _get_path_ops(tensor, op.outputs[0])
+    # Every path from ``value`` must go through the transform.
+    if set(path_ops) != set(inner_ops) | set(outer_ops) | set([op]):
+      return False
+
+    if not _is_scaled(inner_ops, False):
+      return False
+
+    path_ops = dict((op, path_ops[op]) for op in outer_ops)
+
+  return _is_scaled(path_ops, scaled)
+
+
+def _is_scaled(path_ops, scaled):
+  """Whether the operations on the paths only reshape, broadcast,
+  and, if ``scaled``, multiply or divide by constants."""
+  for op, indices in six.iteritems(path_ops):
+    if op.type in _SHAPE_OPS:
+      if op.type == 'Gather' and indices != [0]:
+        return False
+    elif op.type in ['Mul', 'Div', 'RealDiv']:
+      if len(indices) > 1 or (op.type != 'Mul' and indices != [0]):
+        return False
+
+      if not scaled and not _is_ones(op.inputs[1 - indices[0]]):
+        return False
+    else:
+      return False
+
+  return True
+
+
+def _is_ones(tensor):
+  """Whether ``tensor`` is statically a tensor of ones, as used for
+  broadcasting."""
+  if tensor.op.type == 'Fill':
+    tensor = tensor.op.inputs[1]
+
+  value = tf.contrib.util.constant_value(tensor)
+  return value is not None and bool(np.all(value == 1))
+
+
+def complete_conditional(rv, log_prob):
+  """Complete conditional distribution of a random variable given its
+  Markov blanket, for conjugate models.
+
+  The log density of the complete conditional is linear in the
+  sufficient statistics of ``rv``'s family, with coefficients given
+  by its natural parameters. The coefficients are recovered in the
+  graph from derivatives of ``log_prob`` at fixed points, so no
+  conjugate pairs need to be written down. Discrete random variables
+  are enumerated over their support instead. Their elements are
+  assumed to be conditionally independent, and each term of
+  ``log_prob`` is summed over its dimensions beyond the rank of
+  ``rv``.
+
+  Parameters
+  ----------
+  rv : RandomVariable
+    Random variable whose prior family is one of Bernoulli, Beta,
+    Categorical, Dirichlet, Gamma, InverseGamma, or Normal.
+  log_prob : function
+    Function mapping a value of ``rv`` to a list of log density
+    terms that depend on it, e.g., the log prior of ``rv`` and the
+    log likelihood of its children, up to constants. It is called
+    once for each point at which the terms are evaluated.
+
+  Returns
+  -------
+  RandomVariable
+    Complete conditional of ``rv``. It is of the same family as
+    ``rv``, except for Normal, whose complete conditional is a
+    MultivariateNormalFull over its flattened values.
+
+  Raises
+  ------
+  NotImplementedError
+    If ``rv``'s family is not supported.
+
+  Examples
+  --------
+  >>> p = Beta(a=1.0, b=1.0)
+  >>> x = Bernoulli(p=tf.ones(10) * p)
+  >>> x_data = tf.constant([0, 1, 0, 0, 0, 0, 0, 0, 0, 1])
+  >>> def log_prob(value):
+  ...   scope = 'conditional/' + value.op.name
+  ...   p_copy = ed.copy(p, {p: value}, scope=scope)
+  ...   x_copy = ed.copy(x, {p: value}, scope=scope)
+  ...   return [p_copy.log_prob(value), x_copy.log_prob(x_data)]
+  >>>
+  >>> # Beta(a=3.0, b=9.0)
+  >>> p_cond = complete_conditional(p, log_prob)
+  """
+  value = rv.value()
+  if isinstance(rv, (Bernoulli, Categorical)):
+    if isinstance(rv, Bernoulli):
+      n_values = 2
+    else:
+      n_values = rv.logits.get_shape()[-1].value
+
+    rank = len(value.get_shape())
+    logits = []
+    for k in range(n_values):
+      terms = log_prob(k * tf.ones_like(value))
+      logit = 0.0
+      for term in terms:
+        term_rank = len(term.get_shape())
+        if term_rank > rank:
+          term = tf.reduce_sum(term, list(range(rank, term_rank)))
+
+        logit += term
+
+      logits.append(logit * tf.ones(tf.shape(value)))
+
+    if isinstance(rv, Bernoulli):
+      return Bernoulli(logits=logits[1] - logits[0])
+    else:
+      return Categorical(logits=tf.pack(logits, rank))
+
+  def _grad(point):
+    point = tf.convert_to_tensor(point)
+    return tf.gradients(tf.add_n([tf.reduce_sum(term)
+                                  for term in log_prob(point)]),
+                        [point])[0]
+
+  ones = tf.ones_like(value)
+  if isinstance(rv, Beta):
+    # d/dz [A log z + B log(1 - z)] = A / z - B / (1 - z).
+    g1 = _grad(0.25 * ones)
+    g2 = _grad(0.75 * ones)
+    a = 1.0 + 3.0 * (3.0 * g1 - g2) / 32.0
+    b = 1.0 + 3.0 * (g1 - 3.0 * g2) / 32.0
+    return Beta(a=a, b=b)
+  elif isinstance(rv, Gamma):
+    # d/dz [A log z - beta z] = A / z - beta.
+    g1 = _grad(ones)
+    g2 = _grad(2.0 * ones)
+    shape = 2.0 * (g1 - g2)
+    return Gamma(alpha=1.0 + shape, beta=shape - g1)
+  elif isinstance(rv, InverseGamma):
+    # d/dz [-C log z - beta / z] = -C / z + beta / z^2.
+    g1 = _grad(ones)
+    g2 = _grad(2.0 * ones)
+    shape = g1 - 4.0 * g2
+    return InverseGamma(alpha=shape - 1.0, beta=g1 + shape)
+  elif isinstance(rv, Dirichlet):
+    # z * d/dz [A log z - n log sum(z)] = A - n z / sum(z). Two
+    # points on the simplex identify the normalization term n, which
+    # is nonzero if children normalize their probabilities.
+    n_values = value.get_shape()[-1].value
+    uniform = ones / n_values
+    point = tf.constant([0.5 / n_values] +
+                        [(1.0 - 0.5 / n_values) / (n_values - 1)] *
+                        (n_values - 1))
+    point *= ones
+    h1 = uniform * _grad(uniform)
+    h2 = point * _grad(point)
+    n = -2.0 * n_values * (h1 - h2)
+    rank = len(value.get_shape())
+    n = tf.slice(n, tf.zeros([rank], dtype=tf.int32),
+                 [-1] * (rank - 1) + [1])
+    return Dirichlet(alpha=1.0 + h1 + n / n_values)
+  elif isinstance(rv, Normal):
+    # log p = -0.5 z^T P z + b^T z, where b is the gradient at zero
+    # and P is the negative Hessian.
+    point = tf.zeros_like(value)
+    y = tf.add_n([tf.reduce_sum(term) for term in log_prob(point)])
+    b = tf.reshape(tf.gradients(y, [point])[0], [-1])
+    precision = -hessian(y, [point])
+    chol = tf.cholesky(precision)
+    chol_inv = tf.matrix_triangular_solve(
+        chol, tf.diag(tf.ones_like(b)))
+    cov = tf.matmul(chol_inv, chol_inv, transpose_a=True)
+    mu = tf.reshape(tf.matmul(cov, tf.expand_dims(b, 1)), [-1])
+    return MultivariateNormalFull(mu=mu, sigma=cov)
+  else:
+    raise NotImplementedError("Complete conditional is not supported for "
+                              "random variable: " + str(rv))
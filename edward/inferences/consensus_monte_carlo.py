@@ -0,0 +1,268 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import multiprocessing
+import numpy as np
+import six
+import tensorflow as tf
+
+from edward.inferences.elliptical_slice_sampling import \
+    EllipticalSliceSampling
+from edward.inferences.gibbs import Gibbs
+from edward.inferences.parallel_tempering import ParallelTempering
+from edward.inferences.subsampled_metropolis_hastings import \
+    SubsampledMetropolisHastings
+from edward.util import get_session
+
+# Inferences that do not scale the prior's log density by ``scale``,
+# so they cannot sample subposteriors.
+_UNSCALED_INFERENCES = (EllipticalSliceSampling, Gibbs, ParallelTempering,
+                        SubsampledMetropolisHastings)
+
+
+class ConsensusMonteCarlo(object):
+  """Consensus Monte Carlo (Scott et al., 2016), and semiparametric
+  combination of subposteriors (Neiswanger et al., 2014).
+
+  The data is split into shards. Each shard defines a subposterior,
+  whose likelihood is that of the shard and whose prior is the prior
+  raised to the power 1/K for K shards, so that the product of
+  subposteriors is the posterior. A Monte Carlo chain is run for each
+  subposterior independently, in a separate process, and their
+  samples are combined.
+
+  Each process builds its own model and inference from a function,
+  since TensorFlow graphs cannot be shared across processes. The
+  processes are spawned rather than forked, as forking a process
+  whose TensorFlow runtime has started threads can deadlock; scripts
+  must then guard their entry point with
+  ``if __name__ == '__main__':``. The prior is tempered through the
+  ``scale`` argument of inference, so the inference must evaluate
+  the model's log density itself, i.e., without a model wrapper, and
+  must scale it. ``EllipticalSliceSampling``, ``Gibbs``,
+  ``ParallelTempering``, and ``SubsampledMetropolisHastings`` do not.
+  """
+  def __init__(self, build_fn, data, n_shards, seed=None):
+    """
+    Parameters
+    ----------
+    build_fn : function
+      Function mapping a data shard to a ``MonteCarlo`` inference. It
+      builds the model, the Empirical random variables, and the
+      inference in the default graph. It must be picklable, e.g.,
+      defined at the top level of a module. The latent variables'
+      names must be the same in all shards.
+    data : dict of str to np.ndarray
+      Data, split along the outer dimension of each array into
+      ``n_shards`` shards of equal size (up to one data point).
+    n_shards : int
+      Number of shards.
+    seed : int, optional
+      Seed for NumPy and TensorFlow; shard k uses ``seed + k``.
+
+    Examples
+    --------
+    >>> def build(data):
+    ...   w = Normal(mu=tf.zeros(D), sigma=tf.ones(D), name='w')
+    ...   y = Normal(mu=ed.dot(data['X'], w), sigma=tf.ones(len(data['y'])))
+    ...   qw = Empirical(tf.Variable(tf.zeros([5000, D])))
+    ...   return ed.HMC({w: qw}, data={y: data['y']})
+    >>>
+    >>> consensus = ed.ConsensusMonteCarlo(build, {'X': X, 'y': y}, 8)
+    >>> samples = consensus.run(n_processes=8, step_size=0.01)
+    >>> samples['w'].shape  # (5000, D)
+    """
+    if n_shards < 1:
+      raise ValueError("n_shards must be positive.")
+
+    self.build_fn = build_fn
+    self.data = data
+    self.n_shards = n_shards
+    self.seed = seed
+
+  def run(self, n_processes=None, combine='consensus', n_samples=None,
+          *args, **kwargs):
+    """Run a chain for each subposterior and combine their samples.
+
+    Parameters
+    ----------
+    n_processes : int, optional
+      Number of processes running chains in parallel. Default is the
+      number of CPUs.
+    combine : str, optional
+      Method to combine samples of subposteriors, one of
+
+      + 'consensus': weighted averages of the s-th samples of all
+        subposteriors, with weights the inverse of each
+        subposterior's sample covariance (Scott et al., 2016). It is
+        exact for Gaussian subposteriors.
+      + 'semiparametric': samples from the product of semiparametric
+        density estimates of the subposteriors, i.e., kernel density
+        estimates corrected by Gaussian fits, drawn with an
+        independent Metropolis-within-Gibbs sampler (Neiswanger et
+        al., 2014). It handles non-Gaussian subposteriors.
+    n_samples : int, optional
+      Number of combined samples. Default is the minimum number of
+      samples of the subposteriors.
+    *args
+      Passed into the ``run`` method of each inference.
+    **kwargs
+      Passed into the ``run`` method of each inference, except
+      ``scale``, which is set to 1/K for the priors of the latent
+      variables.
+
+    Returns
+    -------
+    dict of str to np.ndarray
+      Combined samples of each latent variable, keyed by its name.
+      The samples of each subposterior are in ``subposteriors``.
+    """
+    if combine not in ['consensus', 'semiparametric']:
+      raise ValueError("combine must be one of 'consensus' and "
+                       "'semiparametric'.")
+
+    shards = []
+    for k in range(self.n_shards):
+      shard = {key: np.array_split(value, self.n_shards)[k]
+               for key, value in six.iteritems(self.data)}
+      seed = None if self.seed is None else self.seed + k
+      shards.append((self.build_fn, shard, self.n_shards, seed, args, kwargs))
+
+    # A new process for each shard gives each chain its own graph and
+    # session.
+    if hasattr(multiprocessing, 'get_context'):
+      context = multiprocessing.get_context('spawn')
+    else:  # Python 2 only forks.
+      context = multiprocessing
+
+    pool = context.Pool(n_processes, maxtasksperchild=1)
+    try:
+      self.subposteriors = pool.map(_run_shard, shards)
+    finally:
+      pool.close()
+      pool.join()
+
+    names = sorted(six.iterkeys(self.subposteriors[0]))
+    shapes = [self.subposteriors[0][name].shape[1:] for name in names]
+    n_draws = min(sub[name].shape[0] for sub in self.subposteriors
+                  for name in names)
+    if n_samples is None:
+      n_samples = n_draws
+
+    # Flatten all latent variables of each subposterior, with shape
+    # [n_draws, d].
+    thetas = [np.concatenate([sub[name][:n_draws].reshape([n_draws, -1])
+                              for name in names], 1)
+              for sub in self.subposteriors]
+    if combine == 'consensus':
+      theta = _consensus(thetas, n_samples)
+    else:
+      theta = _semiparametric(thetas, n_samples)
+
+    samples = {}
+    start = 0
+    for name, shape in zip(names, shapes):
+      size = int(np.prod(shape))
+      samples[name] = theta[:, start:start + size].reshape(
+          (n_samples,) + shape)
+      start += size
+
+    return samples
+
+
+def _consensus(thetas, n_samples):
+  """Average the s-th samples of subposteriors, weighted by their
+  inverse sample covariances."""
+  n_draws = thetas[0].shape[0]
+  weights = [np.linalg.inv(np.atleast_2d(np.cov(theta, rowvar=False)))
+             for theta in thetas]
+  weighted = sum(np.dot(theta, weight)
+                 for theta, weight in zip(thetas, weights))
+  theta = np.linalg.solve(sum(weights), weighted.T).T
+  idx = np.arange(n_samples) % n_draws
+  return theta[idx]
+
+
+def _semiparametric(thetas, n_samples):
+  """Independent Metropolis-within-Gibbs sampler over indices of
+  subposterior samples, targeting the product of semiparametric
+  density estimates (Neiswanger et al., 2014, Algorithm 1)."""
+  n_shards = len(thetas)
+  n_draws, d = thetas[0].shape
+
+  # Gaussian fit of each subposterior, and their product.
+  means = [np.mean(theta, 0) for theta in thetas]
+  precs = [np.linalg.inv(np.atleast_2d(np.cov(theta, rowvar=False)))
+           for theta in thetas]
+  prec_prod = sum(precs)
+  cov_prod = np.linalg.inv(prec_prod)
+  mean_prod = np.dot(cov_prod, sum(np.dot(prec, mean)
+                                   for prec, mean in zip(precs, means)))
+
+  def _log_normal(x, mean, prec):
+    diff = x - mean
+    return 0.5 * np.linalg.slogdet(prec)[1] - \
+        0.5 * np.dot(diff, np.dot(prec, diff))
+
+  def _log_weight(idx, h):
+    # Product of Gaussian kernels at the chosen samples, times the
+    # ratio of the product of Gaussian fits to the Gaussian fits.
+    points = np.array([theta[i] for theta, i in zip(thetas, idx)])
+    center = np.mean(points, 0)
+    log_w = -0.5 * np.sum(np.square(points - center)) / h ** 2
+    cov = cov_prod + h ** 2 / n_shards * np.eye(d)
+    log_w += _log_normal(center, mean_prod, np.linalg.inv(cov))
+    log_w -= sum(_log_normal(point, mean, prec)
+                 for point, mean, prec in zip(points, means, precs))
+    return log_w, center
+
+  idx = np.random.randint(n_draws, size=n_shards)
+  samples = np.empty([n_samples, d])
+  for s in range(n_samples):
+    h = (s + 1.0) ** (-1.0 / (4.0 + d))
+    log_w, center = _log_weight(idx, h)
+    for k in range(n_shards):
+      new_idx = idx.copy()
+      new_idx[k] = np.random.randint(n_draws)
+      new_log_w, new_center = _log_weight(new_idx, h)
+      if np.log(np.random.rand()) < new_log_w - log_w:
+        idx, log_w, center = new_idx, new_log_w, new_center
+
+    # Draw from the product of the Gaussian kernels and the Gaussian
+    # fit.
+    cov = np.linalg.inv(n_shards / h ** 2 * np.eye(d) + prec_prod)
+    mean = np.dot(cov, n_shards / h ** 2 * center +
+                  np.dot(prec_prod, mean_prod))
+    samples[s] = np.random.multivariate_normal(mean, cov)
+
+  return samples
+
+
+def _run_shard(args):
+  """Run a chain for one subposterior in the default graph, and return
+  its samples keyed by latent variable name."""
+  build_fn, data, n_shards, seed, run_args, run_kwargs = args
+  if seed is not None:
+    np.random.seed(seed)
+    tf.set_random_seed(seed)
+
+  inference = build_fn(data)
+  if inference.model_wrapper is not None or \
+     isinstance(inference, _UNSCALED_INFERENCES):
+    raise NotImplementedError(
+        "{} does not temper the prior through scale, so it cannot "
+        "sample subposteriors.".format(type(inference).__name__))
+
+  run_kwargs = run_kwargs.copy()
+  run_kwargs['scale'] = {z: 1.0 / n_shards
+                         for z in six.iterkeys(inference.latent_vars)}
+  inference.run(*run_args, **run_kwargs)
+
+  sess = get_session()
+  samples = {}
+  for z, qz in six.iteritems(inference.latent_vars):
+    name = z if isinstance(z, six.string_types) else z.name
+    samples[name] = sess.run(qz.gather(tf.range(qz.n_filled)))
+
+  return samples
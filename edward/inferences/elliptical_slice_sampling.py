@@ -0,0 +1,157 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import six
+import tensorflow as tf
+
+from edward.inferences.monte_carlo import MonteCarlo
+from edward.models import MultivariateNormalCholesky, MultivariateNormalDiag, \
+    MultivariateNormalFull, Normal, RandomVariable
+from edward.util import copy, get_parents
+
+
+class EllipticalSliceSampling(MonteCarlo):
+  """Elliptical slice sampling (Murray et al., 2010).
+
+  It samples latent variables with Gaussian priors. Each iteration
+  draws an auxiliary variable from the prior, which defines an
+  ellipse through the current state, and slice samples along the
+  ellipse with a shrinking bracket of angles. Every iteration moves
+  the state, and there are no tuning parameters.
+
+  Each latent variable is updated in turn, with the others fixed.
+  Its prior must be ``Normal``, or a multivariate normal over one
+  vector.
+  """
+  def __init__(self, latent_vars, data=None, model_wrapper=None):
+    """
+    Examples
+    --------
+    >>> K = multivariate_rbf_matrix(X)  # covariance of GP prior
+    >>> f = MultivariateNormalFull(mu=tf.zeros(N), sigma=K)
+    >>> y = Bernoulli(logits=f)
+    >>>
+    >>> qf = Empirical(tf.Variable(tf.zeros([500, N])))
+    >>> inference = ed.EllipticalSliceSampling({f: qf}, data={y: y_train})
+    """
+    if model_wrapper is not None:
+      raise NotImplementedError("EllipticalSliceSampling is not supported "
+                                "for model wrappers.")
+
+    super(EllipticalSliceSampling, self).__init__(
+        latent_vars, data, model_wrapper)
+
+  def initialize(self, *args, **kwargs):
+    """Initialize inference algorithm.
+
+    Notes
+    -----
+    If the prior of a latent variable does not depend on other latent
+    variables, the Cholesky factor of its covariance is computed once
+    and cached in a variable. Otherwise it is computed from the
+    current state at each iteration.
+    """
+    self.scope_iter = 0  # a convenient counter for log joint calculations
+    self.chol = {}
+    for z in six.iterkeys(self.latent_vars):
+      if not isinstance(z, (Normal, MultivariateNormalCholesky,
+                            MultivariateNormalDiag, MultivariateNormalFull)):
+        raise TypeError("Elliptical slice sampling requires Gaussian "
+                        "priors: " + str(z))
+
+      if not isinstance(z, Normal) and len(z.get_batch_shape()) > 0:
+        raise NotImplementedError("Multivariate normal priors must be "
+                                  "over one vector: " + str(z))
+
+      if not isinstance(z, Normal) and \
+         not any(parent in self.latent_vars for parent in get_parents(z)):
+        self.chol[z] = tf.Variable(tf.cholesky(z.sigma), trainable=False)
+
+    return super(EllipticalSliceSampling, self).initialize(*args, **kwargs)
+
+  def build_update(self):
+    """
+    For each latent variable f with prior N(mu, L L^T) in turn, draw
+    nu ~ N(mu, L L^T) and a log-likelihood threshold
+    log y = log L(f) + log u, u ~ Uniform(0, 1), where L(f) is the
+    joint density without the prior of f. Then propose
+
+    f' = (f - mu) cos(theta) + (nu - mu) sin(theta) + mu,
+
+    with theta drawn uniformly from a bracket that starts as
+    [0, 2 pi] and shrinks toward theta = 0 after each proposal with
+    log L(f') <= log y. The bracket shrinks in a ``tf.while_loop``,
+    and the first proposal above the threshold is the next state.
+    """
+    old_sample = self._read_sample()
+    sample = old_sample.copy()
+    for z in six.iterkeys(self.latent_vars):
+      # Draw the ellipse from the prior, given the current state of
+      # the other latent variables.
+      self.scope_iter += 1
+      z_prior = copy(z, sample, scope='ellipse' + str(self.scope_iter))
+      mu = z_prior.mu * tf.ones_like(sample[z])
+      eps = tf.random_normal(tf.shape(sample[z]))
+      if isinstance(z, Normal):
+        nu = z_prior.sigma * eps
+      else:
+        chol = self.chol.get(z, None)
+        if chol is None:
+          chol = tf.cholesky(z_prior.sigma)
+
+        nu = tf.squeeze(tf.matmul(chol, tf.expand_dims(eps, 1)), [1])
+
+      f = sample[z] - mu
+      log_y = self._log_lik(z, sample) + tf.log(tf.random_uniform([]))
+
+      def _proposal(theta, f=f, nu=nu, mu=mu, z=z):
+        z_sample = sample.copy()
+        z_sample[z] = f * tf.cos(theta) + nu * tf.sin(theta) + mu
+        return z_sample[z], self._log_lik(z, z_sample)
+
+      def _cond(theta, theta_min, theta_max, f_new, log_lik, log_y=log_y):
+        return log_lik <= log_y
+
+      def _body(theta, theta_min, theta_max, f_new, log_lik,
+                _proposal=_proposal):
+        # Shrink the bracket toward the current state at theta = 0.
+        theta_min = tf.select(theta < 0.0, theta, theta_min)
+        theta_max = tf.select(theta < 0.0, theta_max, theta)
+        theta = tf.random_uniform([], theta_min, theta_max)
+        f_new, log_lik = _proposal(theta)
+        return theta, theta_min, theta_max, f_new, log_lik
+
+      theta = tf.random_uniform([], 0.0, 2.0 * np.pi)
+      f_new, log_lik = _proposal(theta)
+      _, _, _, f_new, _ = tf.while_loop(
+          _cond, _body,
+          [theta, theta - 2.0 * np.pi, theta, f_new, log_lik])
+      sample[z] = f_new
+
+    # Update Empirical random variables.
+    assign_ops = self._write_sample(sample)
+
+    # Increment n_accept.
+    assign_ops.append(self.n_accept.assign_add(1))
+    return tf.group(*assign_ops)
+
+  def _log_lik(self, z, z_sample):
+    """Log joint density without the prior of ``z``, i.e., the
+    log-likelihood of ``z`` in its elliptical slice sampling update."""
+    self.scope_iter += 1
+    log_lik = 0.0
+    for z_other, sample in six.iteritems(z_sample):
+      if z_other is not z:
+        z_copy = copy(z_other, z_sample,
+                      scope='prior' + str(self.scope_iter))
+        log_lik += self.scale.get(z_other, 1.0) * \
+            tf.reduce_sum(z_copy.log_prob(sample))
+
+    for x, obs in six.iteritems(self.data):
+      if isinstance(x, RandomVariable):
+        x_z = copy(x, z_sample, scope='likelihood' + str(self.scope_iter))
+        log_lik += self.scale.get(x, 1.0) * tf.reduce_sum(x_z.log_prob(obs))
+
+    return log_lik
@@ -0,0 +1,256 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import six
+import tensorflow as tf
+
+from edward.inferences.monte_carlo import MonteCarlo
+from edward.util import get_session
+
+
+class EnsembleSampler(MonteCarlo):
+  """Affine-invariant ensemble sampler with stretch moves (Goodman and
+  Weare, 2010; Foreman-Mackey et al., 2013).
+
+  An ensemble of walkers is split into two halves. Each walker of one
+  half proposes a move along the line to a random walker of the other
+  half, and the halves take turns. The moves are invariant to affine
+  transformations of the latent space, so they need no tuning to the
+  scale or correlations of the posterior, and they need no gradients.
+  It suits model wrappers, whose log density is not differentiable in
+  the graph.
+
+  The log densities of the walkers of a half are evaluated in a
+  ``tf.while_loop`` over walkers, as the model's graph does not
+  broadcast over walkers in general. A model wrapper whose
+  ``log_prob`` takes a batch of walkers can evaluate them in one call,
+  with ``vectorized``.
+
+  The state of all walkers is stored at each iteration, so iteration t
+  updates rows ``t * n_walkers`` to ``(t + 1) * n_walkers - 1`` of
+  each Empirical random variable.
+  """
+  def __init__(self, latent_vars, data=None, model_wrapper=None):
+    """
+    Examples
+    --------
+    >>> z = Normal(mu=0.0, sigma=1.0)
+    >>> x = Normal(mu=tf.ones(10) * z, sigma=1.0)
+    >>>
+    >>> qz = Empirical(tf.Variable(tf.zeros([5000])))
+    >>> data = {x: np.array([0.0] * 10, dtype=np.float32)}
+    >>> inference = ed.EnsembleSampler({z: qz}, data)
+    >>> inference.run(n_walkers=10)
+    """
+    super(EnsembleSampler, self).__init__(latent_vars, data, model_wrapper)
+
+  def initialize(self, n_walkers=None, a=2.0, init_scale=0.01,
+                 vectorized=False, *args, **kwargs):
+    """
+    Parameters
+    ----------
+    n_walkers : int, optional
+      Number of walkers. Default is twice the number of latent
+      dimensions, and at least 4.
+    a : float, optional
+      Scale of stretch moves, greater than 1. A walker moves along the
+      line to its partner by a stretch factor in [1/a, a].
+    init_scale : float, optional
+      Standard deviation of the Gaussian jitter around the first
+      ``n_walkers`` rows of the Empirical random variables, from which
+      the walkers start.
+    vectorized : bool, optional
+      Whether the model wrapper's ``log_prob`` takes the latent
+      variables of all walkers of a half, stacked along the outer
+      dimension, and returns the vector of their log joint
+      densities, e.g., with a vectorized model or a process pool.
+      Each half-step then makes one call. It is only supported for
+      model wrappers.
+
+    Notes
+    -----
+    The number of iterations is the minimum of all Empirical sizes
+    divided by the number of walkers.
+    """
+    dim = int(np.sum([qz.get_event_shape().num_elements()
+                      for qz in six.itervalues(self.latent_vars)]))
+    if n_walkers is None:
+      n_walkers = max(2 * dim, 4)
+
+    if n_walkers < 4:
+      raise ValueError("n_walkers must be at least 4.")
+
+    if a <= 1.0:
+      raise ValueError("a must be greater than 1.")
+
+    if vectorized and self.model_wrapper is None:
+      raise NotImplementedError("vectorized is only supported for model "
+                                "wrappers.")
+
+    self.n_walkers = n_walkers
+    self.a = a
+    self.init_scale = init_scale
+    self.vectorized = vectorized
+    self.dim = dim
+    self.scope_iter = 0  # a convenient counter for log joint calculations
+
+    self.walkers = {
+        z: tf.Variable(tf.zeros([n_walkers] + qz.get_event_shape().as_list()),
+                       trainable=False)
+        for z, qz in six.iteritems(self.latent_vars)}
+    self.log_probs = tf.Variable(tf.zeros([n_walkers]), trainable=False)
+    self._initialized_walkers = False
+    self.initialize_walkers = self._build_initialize_walkers()
+
+    super(EnsembleSampler, self).initialize(*args, **kwargs)
+    if not self.ring_buffer:
+      self.n_iter = self.n_iter // n_walkers
+      if kwargs.get('n_print', None) is None:
+        self.n_print = int(self.n_iter / 10)
+
+  def update(self, feed_dict=None):
+    """Run one iteration of stretch moves over all walkers.
+
+    Returns
+    -------
+    dict
+      Dictionary of algorithm-specific information. In this case, the
+      fraction of accepted stretch moves so far.
+    """
+    if not self._initialized_walkers:
+      if feed_dict is None:
+        feed_dict = {}
+
+      for key, value in six.iteritems(self.data):
+        if isinstance(key, tf.Tensor):
+          feed_dict[key] = value
+
+      get_session().run(self.initialize_walkers, feed_dict)
+      self._initialized_walkers = True
+
+    info_dict = super(EnsembleSampler, self).update(feed_dict)
+    info_dict['accept_rate'] /= self.n_walkers
+    return info_dict
+
+  def build_update(self):
+    """
+    Update each half of the ensemble in turn. A walker X_j proposes
+
+    Y = X_c + Z (X_j - X_c),
+
+    where X_c is a random walker of the other half and Z has density
+    g(Z) proportional to 1 / sqrt(Z) on [1/a, a]. It accepts with
+    probability
+
+    min(1, Z^(d - 1) p(x, Y) / p(x, X_j)),
+
+    where d is the number of latent dimensions. The log densities of
+    all proposals of a half are computed together, in a
+    ``tf.while_loop`` or in one call of a vectorized model wrapper.
+    """
+    keys = list(six.iterkeys(self.latent_vars))
+    n_first = self.n_walkers // 2
+    sizes = [n_first, self.n_walkers - n_first]
+    halves = [{z: self.walkers[z][:n_first] for z in keys},
+              {z: self.walkers[z][n_first:] for z in keys}]
+    half_log_probs = [self.log_probs[:n_first], self.log_probs[n_first:]]
+    n_accept = 0
+    for k in range(2):
+      n_active = sizes[k]
+      n_other = sizes[1 - k]
+      active = halves[k]
+      other = halves[1 - k]
+
+      # Draw partners and stretch factors.
+      partner = tf.cast(tf.floor(tf.random_uniform([n_active]) * n_other),
+                        tf.int32)
+      partner = tf.minimum(partner, n_other - 1)
+      stretch = tf.square((self.a - 1.0) * tf.random_uniform([n_active]) +
+                          1.0) / self.a
+      proposal = {}
+      for z in keys:
+        rank = len(active[z].get_shape())
+        stretch_z = tf.reshape(stretch, [n_active] + [1] * (rank - 1))
+        partner_z = tf.gather(other[z], partner)
+        proposal[z] = partner_z + stretch_z * (active[z] - partner_z)
+
+      proposal_log_probs = self._log_densities(proposal, n_active)
+      ratio = (self.dim - 1.0) * tf.log(stretch) + \
+          proposal_log_probs - half_log_probs[k]
+      accept = tf.log(tf.random_uniform([n_active])) < ratio
+      halves[k] = {z: tf.select(accept, proposal[z], active[z])
+                   for z in keys}
+      half_log_probs[k] = tf.select(accept, proposal_log_probs,
+                                    half_log_probs[k])
+      n_accept += tf.reduce_sum(tf.cast(accept, tf.int32))
+
+    sample = {z: tf.concat(0, [halves[0][z], halves[1][z]]) for z in keys}
+    assign_ops = [self.walkers[z].assign(sample[z]) for z in keys]
+    assign_ops.append(self.log_probs.assign(
+        tf.concat(0, [half_log_probs[0], half_log_probs[1]])))
+
+    # Update Empirical random variables.
+    assign_ops.extend(self._write_sample(
+        sample,
+        tf.range(self.t * self.n_walkers, (self.t + 1) * self.n_walkers)))
+
+    # Increment n_accept.
+    assign_ops.append(self.n_accept.assign_add(n_accept))
+    return tf.group(*assign_ops)
+
+  def _build_initialize_walkers(self):
+    """Build op that starts the walkers from a ball around the first
+    rows of the Empirical random variables."""
+    sample = {}
+    assign_ops = []
+    for z, qz in six.iteritems(self.latent_vars):
+      walkers = qz.gather(tf.range(self.n_walkers))
+      sample[z] = walkers + \
+          self.init_scale * tf.random_normal(tf.shape(walkers))
+      assign_ops.append(self.walkers[z].assign(sample[z]))
+
+    assign_ops.append(self.log_probs.assign(
+        self._log_densities(sample, self.n_walkers)))
+    return tf.group(*assign_ops)
+
+  def _filled_samples(self, qz, n_written=None):
+    if n_written is None:
+      n_written = self.t * self.n_walkers
+
+    return super(EnsembleSampler, self)._filled_samples(qz, n_written)
+
+  def _log_densities(self, walkers, n_walkers):
+    """Log joint density of each walker, evaluated in a
+    ``tf.while_loop`` over walkers, or in one call if ``vectorized``.
+
+    Parameters
+    ----------
+    walkers : dict
+      Latent variable keys to samples of all walkers, with the walkers
+      along the outer dimension.
+    n_walkers : int
+      Number of walkers.
+
+    Returns
+    -------
+    tf.Tensor
+      Vector of log joint densities, of shape ``[n_walkers]``.
+    """
+    if self.vectorized:
+      log_probs = self.model_wrapper.log_prob(self.data, walkers)
+      return tf.reshape(tf.cast(log_probs, tf.float32), [n_walkers])
+
+    def _cond(i, *args):
+      return i < n_walkers
+
+    def _body(i, ta):
+      z_sample = {z: tf.gather(walker, i)
+                  for z, walker in six.iteritems(walkers)}
+      return i + 1, ta.write(i, self.log_joint(z_sample))
+
+    _, ta = tf.while_loop(
+        _cond, _body,
+        [tf.constant(0), tf.TensorArray(dtype=tf.float32, size=n_walkers)])
+    return ta.pack()
@@ -0,0 +1,94 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import six
+import tensorflow as tf
+
+from edward.inferences.conjugacy import complete_conditional, is_conjugate
+from edward.inferences.monte_carlo import MonteCarlo
+from edward.models import RandomVariable
+from edward.util import copy, get_children
+
+
+class Gibbs(MonteCarlo):
+  """Gibbs sampling (Geman and Geman, 1984) for conditionally
+  conjugate models.
+  """
+  def __init__(self, latent_vars, data=None, model_wrapper=None):
+    """
+    Examples
+    --------
+    >>> p = Beta(a=1.0, b=1.0)
+    >>> x = Bernoulli(p=tf.ones(10) * p)
+    >>>
+    >>> qp = Empirical(tf.Variable(tf.zeros([500])))
+    >>> data = {x: np.array([0, 1, 0, 0, 0, 0, 0, 0, 0, 1])}
+    >>> inference = ed.Gibbs({p: qp}, data)
+
+    Notes
+    -----
+    Each latent variable must be conjugate to its children, which is
+    checked with ``is_conjugate``. Its complete conditional is then
+    derived and sampled from exactly in the graph, so every sample is
+    accepted.
+    """
+    if model_wrapper is not None:
+      raise NotImplementedError("Gibbs is not supported for model "
+                                "wrappers.")
+
+    super(Gibbs, self).__init__(latent_vars, data, model_wrapper)
+
+  def initialize(self, *args, **kwargs):
+    self.scope_iter = 0  # a convenient counter for log joint calculations
+    rvs = list(six.iterkeys(self.latent_vars)) + \
+        [x for x in six.iterkeys(self.data) if isinstance(x, RandomVariable)]
+    self.children = {z: get_children(z, rvs)
+                     for z in six.iterkeys(self.latent_vars)}
+    for z, children in six.iteritems(self.children):
+      if not is_conjugate(z, children):
+        raise ValueError("Latent variable is not conjugate to its "
+                         "children: " + str(z))
+
+    return super(Gibbs, self).initialize(*args, **kwargs)
+
+  def build_update(self):
+    """
+    Sweep through the latent variables, drawing each from its
+    complete conditional given the latest values of the others.
+    """
+    old_sample = self._read_sample()
+
+    sample = old_sample.copy()
+    for z in six.iterkeys(self.latent_vars):
+      cond = complete_conditional(z, self._log_prob_fn(z, sample))
+      sample[z] = tf.reshape(cond.value(), tf.shape(old_sample[z]))
+
+    # Update Empirical random variables.
+    assign_ops = self._write_sample(sample)
+
+    # Every sample is accepted.
+    assign_ops.append(self.n_accept.assign_add(1))
+    return tf.group(*assign_ops)
+
+  def _log_prob_fn(self, z, z_sample):
+    """Return function mapping a value of ``z`` to the log density
+    terms of its Markov blanket: its log prior and the log likelihood
+    of its children, given the other values in ``z_sample``."""
+    def log_prob(value):
+      self.scope_iter += 1
+      scope = 'conditional' + str(self.scope_iter)
+      z_sample_new = z_sample.copy()
+      z_sample_new[z] = value
+
+      terms = []
+      for rv in [z] + self.children[z]:
+        rv_copy = copy(rv, z_sample_new, scope=scope)
+        if rv in self.data:
+          terms.append(rv_copy.log_prob(self.data[rv]))
+        else:
+          terms.append(rv_copy.log_prob(z_sample_new[rv]))
+
+      return terms
+
+    return log_prob
@@ -6,8 +6,8 @@ import six
 import tensorflow as tf
 
 from edward.inferences.monte_carlo import MonteCarlo
-from edward.models import Normal, RandomVariable, Uniform
-from edward.util import copy
+from edward.models import Normal, Uniform
+from edward.util import get_session
 
 
 class HMC(MonteCarlo):
@@ -27,50 +27,155 @@ class HMC(MonteCarlo):
     """
     super(HMC, self).__init__(latent_vars, data, model_wrapper)
 
-  def initialize(self, step_size=0.25, n_steps=2, *args, **kwargs):
+  def initialize(self, step_size=0.25, n_steps=2, n_warmup=0,
+                 target_accept=0.8, mass_matrix='diagonal', *args, **kwargs):
     """
     Parameters
     ----------
     step_size : float, optional
-      Step size of numerical integrator.
+      Step size of numerical integrator. With warm-up, it is the
+      initial step size for adaptation.
     n_steps : int, optional
       Number of steps of numerical integrator.
+    n_warmup : int, optional
+      Number of warm-up iterations, run before the first update.
+      During warm-up, the step size is adapted by dual averaging
+      (Hoffman and Gelman, 2014) and the mass matrix is estimated
+      from warm-up draws in windows of doubling size, following Stan.
+      With fewer than 20 warm-up iterations, only the step size is
+      adapted, as the windows would leave no terminal buffer to
+      adapt it to the final mass matrix. Warm-up draws are not
+      stored in the Empirical random variables; sampling starts from
+      the last one.
+    target_accept : float, optional
+      Target acceptance probability of step size adaptation.
+    mass_matrix : str, optional
+      Form of the mass matrix adapted during warm-up, one of
+      'diagonal' and 'dense', per latent variable. If None, the mass
+      matrix is fixed to the identity.
     """
-    self.step_size = step_size
+    if mass_matrix not in [None, 'diagonal', 'dense']:
+      raise ValueError("mass_matrix must be one of None, 'diagonal', "
+                       "and 'dense'.")
+
+    self.step_size = tf.Variable(step_size, trainable=False,
+                                 dtype=tf.float32)
     self.n_steps = n_steps
+    self.n_warmup = n_warmup
+    self.target_accept = target_accept
+    self.mass_matrix = mass_matrix
     self.scope_iter = 0  # a convenient counter for log joint calculations
+
+    # Inverse mass matrix of each latent variable, over its flattened
+    # event shape. A dense matrix also stores its Cholesky factor.
+    self.inv_mass = {}
+    self._inv_mass_chol = {}
+    if mass_matrix is not None:
+      for z, qz in six.iteritems(self.latent_vars):
+        dim = qz.get_event_shape().num_elements()
+        if mass_matrix == 'diagonal':
+          self.inv_mass[z] = tf.Variable(tf.ones([dim]), trainable=False)
+        else:
+          self.inv_mass[z] = tf.Variable(tf.diag(tf.ones([dim])),
+                                         trainable=False)
+          self._inv_mass_chol[z] = tf.Variable(tf.diag(tf.ones([dim])),
+                                               trainable=False)
+
+    self._warmed_up = n_warmup == 0
     return super(HMC, self).initialize(*args, **kwargs)
 
+  def update(self, feed_dict=None):
+    """Run one iteration of sampling, preceded by warm-up on the
+    first call.
+
+    Parameters
+    ----------
+    feed_dict : dict, optional
+      Feed dictionary for a TensorFlow session run. It is used to feed
+      placeholders that are not fed during initialization.
+
+    Returns
+    -------
+    dict
+      Dictionary of algorithm-specific information.
+    """
+    if not self._warmed_up:
+      self.warmup(feed_dict)
+
+    return super(HMC, self).update(feed_dict)
+
+  def warmup(self, feed_dict=None):
+    """Run ``n_warmup`` iterations of warm-up.
+
+    The step size is adapted at every iteration. The mass matrix is
+    estimated in slow windows between an initial and a terminal
+    buffer of fast iterations; at the end of each window, it is set
+    to the regularized sample covariance of the window's draws, and
+    step size adaptation restarts. After warm-up, the step size is
+    fixed to its averaged value.
+
+    Parameters
+    ----------
+    feed_dict : dict, optional
+      Feed dictionary for a TensorFlow session run. It is used to feed
+      placeholders that are not fed during initialization.
+    """
+    if feed_dict is None:
+      feed_dict = {}
+
+    for key, value in six.iteritems(self.data):
+      if isinstance(key, tf.Tensor):
+        feed_dict[key] = value
+
+    sess = get_session()
+    if self.mass_matrix is not None:
+      start, window_ends = _adaptation_windows(self.n_warmup)
+    else:
+      start, window_ends = 0, []
+
+    for i in range(self.n_warmup):
+      if window_ends and start <= i < window_ends[-1]:
+        sess.run(self._warmup_collect, feed_dict)
+      else:
+        sess.run(self._warmup, feed_dict)
+
+      if i + 1 in window_ends:
+        sess.run(self._end_window, feed_dict)
+
+    sess.run(self._end_warmup)
+    self._warmed_up = True
+
   def build_update(self):
     """
     Simulate Hamiltonian dynamics using a numerical integrator.
     Correct for the integrator's discretization error using an
     acceptance ratio.
+
+    The same transition also builds the warm-up ops, which write
+    their draw to the first row of the Empirical random variables
+    and adapt the step size and mass matrix.
     """
-    old_sample = {z: tf.gather(qz.params, tf.maximum(self.t - 1, 0))
-                  for z, qz in six.iteritems(self.latent_vars)}
+    old_sample = self._read_sample()
 
     # Sample momentum.
     old_r_sample = {}
     for z, qz in six.iteritems(self.latent_vars):
       event_shape = qz.get_event_shape()
       normal = Normal(mu=tf.zeros(event_shape), sigma=tf.ones(event_shape))
-      old_r_sample[z] = normal.sample()
+      old_r_sample[z] = self._momentum(z, normal.sample())
 
     # Simulate Hamiltonian dynamics.
-    new_sample = old_sample
-    new_r_sample = old_r_sample
-    for _ in range(self.n_steps):
-      new_sample, new_r_sample = leapfrog(old_sample, old_r_sample,
-                                          self.step_size, self.log_joint)
+    new_sample, new_r_sample, new_log_joint, old_log_joint = leapfrog(
+        old_sample, old_r_sample, self.step_size, self.log_joint, self.n_steps,
+        self._velocity)
 
     # Calculate acceptance ratio.
-    ratio = tf.reduce_sum([0.5 * tf.square(r)
-                           for r in six.itervalues(old_r_sample)])
-    ratio -= tf.reduce_sum([0.5 * tf.square(r)
-                            for r in six.itervalues(new_r_sample)])
-    ratio += self.log_joint(new_sample)
-    ratio -= self.log_joint(old_sample)
+    ratio = tf.reduce_sum([self._kinetic(z, r)
+                           for z, r in six.iteritems(old_r_sample)])
+    ratio -= tf.reduce_sum([self._kinetic(z, r)
+                            for z, r in six.iteritems(new_r_sample)])
+    ratio += new_log_joint
+    ratio -= old_log_joint
 
     # Accept or reject sample.
     u = Uniform().sample()
@@ -85,58 +190,240 @@ class HMC(MonteCarlo):
               zip(six.iterkeys(new_sample), sample_values)}
 
     # Update Empirical random variables.
-    assign_ops = []
-    variables = {x.name: x for x in
-                 tf.get_default_graph().get_collection(tf.GraphKeys.VARIABLES)}
-    for z, qz in six.iteritems(self.latent_vars):
-      variable = variables[qz.params.op.inputs[0].op.inputs[0].name]
-      assign_ops.append(tf.scatter_update(variable, self.t, sample[z]))
+    assign_ops = self._write_sample(sample)
+    warmup_ops = self._write_sample(sample, 0)
+
+    accept_prob = tf.select(tf.is_nan(ratio), 0.0,
+                            tf.minimum(1.0, tf.exp(ratio)))
+    self._build_warmup(warmup_ops, sample, accept_prob)
 
     # Increment n_accept (if accepted).
     assign_ops.append(self.n_accept.assign_add(tf.select(accept, 1, 0)))
     return tf.group(*assign_ops)
 
-  def log_joint(self, z_sample):
-    """
-    Utility function to calculate model's log joint density,
-    log p(x, z), for inputs z (and fixed data x).
+  def _build_warmup(self, warmup_ops, sample, accept_prob,
+                    t0=10.0, gamma=0.05, kappa=0.75):
+    """Build the warm-up ops from a transition of the sampler.
 
-    Parameters
-    ----------
-    z_sample : dict
-      Latent variable keys to samples.
+    The step size is adapted with the dual averaging scheme of
+    Hoffman and Gelman (2014, Algorithm 5), and draws are accumulated
+    into running means and (co)variances with Welford's algorithm.
     """
-    if self.model_wrapper is None:
-      self.scope_iter += 1
-
-      log_joint = 0.0
-      for z, sample in six.iteritems(z_sample):
-        z = copy(z, z_sample, scope='prior' + str(self.scope_iter))
-        log_joint += tf.reduce_sum(z.log_prob(sample))
-
-      for x, obs in six.iteritems(self.data):
-        if isinstance(x, RandomVariable):
-          x_z = copy(x, z_sample, scope='likelihood' + str(self.scope_iter))
-          log_joint += tf.reduce_sum(x_z.log_prob(obs))
+    step_size = self.step_size.initialized_value()
+    self._mu = tf.Variable(tf.log(10.0 * step_size), trainable=False)
+    self._h_bar = tf.Variable(0.0, trainable=False)
+    self._log_step_size_bar = tf.Variable(0.0, trainable=False)
+    self._adapt_t = tf.Variable(0.0, trainable=False)
+
+    m = self._adapt_t + 1.0
+    w = 1.0 / (m + t0)
+    h_bar = (1.0 - w) * self._h_bar + w * (self.target_accept - accept_prob)
+    log_step_size = self._mu - tf.sqrt(m) / gamma * h_bar
+    eta = tf.pow(m, -kappa)
+    log_step_size_bar = eta * log_step_size + \
+        (1.0 - eta) * self._log_step_size_bar
+    with tf.control_dependencies(warmup_ops):
+      warmup_ops = warmup_ops + [
+          self._h_bar.assign(h_bar),
+          self.step_size.assign(tf.exp(log_step_size)),
+          self._log_step_size_bar.assign(log_step_size_bar),
+          self._adapt_t.assign(m)]
+
+    self._warmup = tf.group(*warmup_ops)
+    self._end_warmup = self.step_size.assign(
+        tf.exp(self._log_step_size_bar))
+
+    # Collect draws within a window and set the inverse mass matrix
+    # at its end, restarting step size adaptation.
+    self._n_window = tf.Variable(0.0, trainable=False)
+    collect_ops = []
+    end_window_values = []
+    n = self._n_window
+    for z, inv_mass in six.iteritems(self.inv_mass):
+      shape = inv_mass.get_shape().as_list()
+      mean = tf.Variable(tf.zeros(shape[:1]), trainable=False)
+      m2 = tf.Variable(tf.zeros(shape), trainable=False)
+      x = tf.reshape(sample[z], [-1])
+      delta = x - mean
+      mean_new = mean + delta / (n + 1.0)
+      if self.mass_matrix == 'diagonal':
+        m2_new = m2 + delta * (x - mean_new)
+        prior = 1e-3
+      else:
+        m2_new = m2 + tf.matmul(tf.expand_dims(delta, 1),
+                                tf.expand_dims(x - mean_new, 0))
+        prior = 1e-3 * tf.diag(tf.ones_like(mean))
+
+      collect_ops += [mean.assign(mean_new), m2.assign(m2_new)]
+
+      # Regularize the sample covariance toward a small multiple of
+      # the identity, as in Stan.
+      cov = m2 / tf.maximum(n - 1.0, 1.0)
+      inv_mass_new = n / (n + 5.0) * cov + 5.0 / (n + 5.0) * prior
+      end_window_values.append((inv_mass, inv_mass_new))
+      if self.mass_matrix == 'dense':
+        end_window_values.append((self._inv_mass_chol[z],
+                                  tf.cholesky(inv_mass_new)))
+
+      end_window_values += [(mean, tf.zeros_like(mean)),
+                            (m2, tf.zeros_like(m2))]
+
+    with tf.control_dependencies(collect_ops):
+      collect_ops.append(self._n_window.assign_add(1.0))
+
+    self._warmup_collect = tf.group(self._warmup, *collect_ops)
+
+    end_window_values += [
+        (self._n_window, 0.0),
+        (self._mu, tf.log(10.0 * self.step_size)),
+        (self._h_bar, 0.0),
+        (self._log_step_size_bar, 0.0),
+        (self._adapt_t, 0.0)]
+    values = [tf.convert_to_tensor(value) for _, value in end_window_values]
+    with tf.control_dependencies(values):
+      self._end_window = tf.group(*[
+          variable.assign(value) for (variable, _), value in
+          zip(end_window_values, values)])
+
+  def _momentum(self, z, eps):
+    """Transform standard normal noise to a momentum with covariance
+    equal to the mass matrix."""
+    if z not in self.inv_mass:
+      return eps
+
+    flat = tf.reshape(eps, [-1])
+    if self.mass_matrix == 'diagonal':
+      r = flat * tf.rsqrt(self.inv_mass[z])
     else:
-      x = self.data
-      log_joint = self.model_wrapper.log_prob(x, z_sample)
+      r = tf.matrix_triangular_solve(
+          self._inv_mass_chol[z], tf.expand_dims(flat, 1), adjoint=True)
+
+    return tf.reshape(r, tf.shape(eps))
+
+  def _velocity(self, z, r):
+    """Product of the inverse mass matrix and momentum."""
+    if z not in self.inv_mass:
+      return r
+
+    flat = tf.reshape(r, [-1])
+    if self.mass_matrix == 'diagonal':
+      v = self.inv_mass[z] * flat
+    else:
+      v = tf.matmul(self.inv_mass[z], tf.expand_dims(flat, 1))
+
+    return tf.reshape(v, tf.shape(r))
+
+  def _kinetic(self, z, r):
+    return 0.5 * tf.reduce_sum(r * self._velocity(z, r))
 
-    return log_joint
 
+def leapfrog(z_old, r_old, step_size, log_joint, n_steps, velocity=None):
+  """Simulate Hamiltonian dynamics with the leapfrog integrator.
+
+  The integrator runs as a ``tf.while_loop``, so the graph size does
+  not grow with ``n_steps``. The log joint and its gradient are built
+  once inside the loop body, and the gradient at the end of each step
+  is carried over to the next, so each step costs one gradient
+  evaluation.
+
+  Parameters
+  ----------
+  z_old : dict
+    Latent variable keys to their current position.
+  r_old : dict
+    Latent variable keys to their current momentum.
+  step_size : float or tf.Tensor
+    Step size of numerical integrator.
+  log_joint : function
+    Function mapping a dictionary of latent variable keys to samples
+    to the model's log joint density.
+  n_steps : int or tf.Tensor
+    Number of steps of numerical integrator.
+  velocity : function, optional
+    Function mapping a latent variable key and its momentum to the
+    rate of change of its position, i.e., the product of the inverse
+    mass matrix and momentum. Default is an identity mass matrix.
+
+  Returns
+  -------
+  tuple
+    The new position and momentum (as dictionaries), the log joint
+    at the new position, and the log joint at the old position.
+  """
+  keys = list(six.iterkeys(z_old))
+  n_vars = len(keys)
+  if velocity is None:
+    def velocity(key, r):
+      return r
+
+  def _log_joint_and_grad(z_list):
+    value = tf.convert_to_tensor(log_joint(dict(zip(keys, z_list))))
+    grads = tf.gradients(value, z_list)
+    grads = [tf.zeros_like(z) if grad is None else grad
+             for z, grad in zip(z_list, grads)]
+    return value, grads
+
+  def _cond(i, *args):
+    return i < n_steps
+
+  def _body(i, *args):
+    z_list = args[:n_vars]
+    r_list = args[n_vars:2 * n_vars]
+    grad_list = args[2 * n_vars:3 * n_vars]
+
+    r_list = [r + 0.5 * step_size * grad
+              for r, grad in zip(r_list, grad_list)]
+    z_list = [z + step_size * velocity(key, r)
+              for key, z, r in zip(keys, z_list, r_list)]
+    log_joint_new, grad_list = _log_joint_and_grad(z_list)
+    r_list = [r + 0.5 * step_size * grad
+              for r, grad in zip(r_list, grad_list)]
+    return [i + 1] + z_list + r_list + grad_list + [log_joint_new]
+
+  z_list = [z_old[key] for key in keys]
+  r_list = [r_old[key] for key in keys]
+  log_joint_old, grad_list = _log_joint_and_grad(z_list)
+
+  loop_vars = [tf.constant(0)] + z_list + r_list + grad_list + \
+      [log_joint_old]
+  loop_vars = tf.while_loop(_cond, _body, loop_vars)
+
+  z_new = dict(zip(keys, loop_vars[1:n_vars + 1]))
+  r_new = dict(zip(keys, loop_vars[n_vars + 1:2 * n_vars + 1]))
+  return z_new, r_new, loop_vars[-1], log_joint_old
+
+
+def _adaptation_windows(n_warmup, init_buffer=75, term_buffer=50,
+                        base_window=25):
+  """Slow adaptation windows of warm-up, following Stan.
+
+  Returns
+  -------
+  tuple
+    The iteration at which the first window starts, and the list of
+    iterations at which each window ends. Windows double in size, and
+    the last one is extended to the terminal buffer. There are no
+    windows if ``n_warmup`` is less than 20.
+  """
+  if n_warmup < 20:
+    return 0, []
 
-def leapfrog(z_old, r_old, step_size, log_joint):
-  z_new = {}
-  r_new = {}
+  if init_buffer + base_window + term_buffer > n_warmup:
+    init_buffer = int(0.15 * n_warmup)
+    term_buffer = int(0.1 * n_warmup)
+    base_window = n_warmup - init_buffer - term_buffer
 
-  grad_log_joint = tf.gradients(log_joint(z_old), list(six.itervalues(z_old)))
-  for i, key in enumerate(six.iterkeys(z_old)):
-    z, r = z_old[key], r_old[key]
-    r_new[key] = r + 0.5 * step_size * grad_log_joint[i]
-    z_new[key] = z + step_size * r_new[key]
+  end_slow = n_warmup - term_buffer
+  window_ends = []
+  start = init_buffer
+  size = base_window
+  while start < end_slow:
+    end = start + size
+    if end + 2 * size > end_slow:
+      end = end_slow
 
-  grad_log_joint = tf.gradients(log_joint(z_new), list(six.itervalues(z_new)))
-  for i, key in enumerate(six.iterkeys(z_old)):
-    r_new[key] += 0.5 * step_size * grad_log_joint[i]
+    window_ends.append(end)
+    start = end
+    size *= 2
 
-  return z_new, r_new
+  return init_buffer, window_ends
@@ -0,0 +1,203 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import six
+import tensorflow as tf
+
+from edward.criticisms.diagnostics import pareto_k
+from edward.inferences.cavi import _get_variable
+from edward.inferences.inference import Inference
+from edward.models import Empirical
+from edward.util import get_session, log_sum_exp
+
+
+class ImportanceSampling(Inference):
+  """Self-normalized importance sampling.
+
+  It draws samples from a proposal distribution and weights each by
+  the ratio of the model's joint density to the proposal density. The
+  posterior approximation is a weighted ``Empirical`` random variable
+  for each latent variable.
+  """
+  def __init__(self, latent_vars, proposal_vars, data=None,
+               model_wrapper=None):
+    """
+    Parameters
+    ----------
+    latent_vars : list of RandomVariable or
+                  dict of RandomVariable to RandomVariable
+      Collection of random variables to perform inference on. If
+      list, each random variable is approximated by a weighted
+      ``Empirical`` random variable with 10,000 samples, defined
+      internally; they share their log weights. If dictionary, each
+      random variable must be an ``Empirical`` random variable whose
+      ``params`` and ``log_weights`` are ``tf.Variable``s.
+    proposal_vars : dict of RandomVariable to RandomVariable
+      Proposal distribution of each latent variable. Proposals are
+      independent of each other and of the latent variables, and the
+      batch shape of each is the shape of its latent variable.
+
+    Examples
+    --------
+    >>> z = Normal(mu=0.0, sigma=1.0)
+    >>> x = Normal(mu=tf.ones(10) * z, sigma=1.0)
+    >>>
+    >>> proposal_z = StudentT(df=3.0, mu=0.0, sigma=1.0)
+    >>> data = {x: np.array([0.0] * 10, dtype=np.float32)}
+    >>> inference = ed.ImportanceSampling([z], {z: proposal_z}, data)
+    >>> inference.run()
+    >>> qz = inference.latent_vars[z]  # weighted Empirical
+    """
+    if isinstance(latent_vars, list):
+      with tf.variable_scope("posterior"):
+        if model_wrapper is None:
+          log_weights = tf.Variable(tf.zeros([10000]), trainable=False)
+          latent_vars = {rv: Empirical(params=tf.Variable(
+              tf.zeros([10000] + rv.get_batch_shape().as_list())),
+              log_weights=log_weights)
+              for rv in latent_vars}
+        else:
+          raise NotImplementedError("A list is not supported for model "
+                                    "wrappers. See documentation.")
+    elif isinstance(latent_vars, dict):
+      for qz in six.itervalues(latent_vars):
+        if not isinstance(qz, Empirical) or qz.log_weights is None:
+          raise TypeError("Posterior approximation must consist of only "
+                          "weighted Empirical random variables.")
+
+    self.proposal_vars = proposal_vars
+    super(ImportanceSampling, self).__init__(latent_vars, data, model_wrapper)
+
+  def initialize(self, *args, **kwargs):
+    """Initialize inference algorithm.
+
+    Notes
+    -----
+    The number of samples is the minimum of all Empirical sizes; they
+    fill the first rows of each. All samples are drawn in one update,
+    so there is one iteration.
+    """
+    self.n_samples = int(np.amin([qz.n for qz in
+                                  six.itervalues(self.latent_vars)]))
+    self.scope_iter = 0  # a convenient counter for log joint calculations
+    kwargs['n_iter'] = 1
+    if kwargs.get('n_print', None) is None:
+      kwargs['n_print'] = 1
+
+    super(ImportanceSampling, self).initialize(*args, **kwargs)
+    self.train = self.build_update()
+
+  def update(self, feed_dict=None):
+    """Draw and weight all samples.
+
+    Parameters
+    ----------
+    feed_dict : dict, optional
+      Feed dictionary for a TensorFlow session run. It is used to feed
+      placeholders that are not fed during initialization.
+
+    Returns
+    -------
+    dict
+      Dictionary of algorithm-specific information. In this case, the
+      effective sample size of the weighted samples, the Pareto k
+      diagnostic of the weights, and the estimate of the log marginal
+      likelihood.
+    """
+    if feed_dict is None:
+      feed_dict = {}
+
+    for key, value in six.iteritems(self.data):
+      if isinstance(key, tf.Tensor):
+        feed_dict[key] = value
+
+    sess = get_session()
+    _, ess, k, log_evidence = sess.run(
+        [self.train, self.ess, self.pareto_k, self.log_evidence], feed_dict)
+    t = sess.run(self.increment_t)
+    return {'t': t, 'ess': ess, 'pareto_k': k, 'log_evidence': log_evidence}
+
+  def print_progress(self, info_dict):
+    """Print progress to output.
+    """
+    if self.n_print != 0:
+      string = 'Effective Sample Size = {0:.1f}'.format(info_dict['ess'])
+      string += ', Pareto k = {0:.2f}'.format(info_dict['pareto_k'])
+      string += ', Log Evidence = {0:.3f}'.format(info_dict['log_evidence'])
+      print(string)
+      if info_dict['pareto_k'] >= 0.7:
+        print('Warning: Pareto k is at least 0.7, so importance sampling '
+              'estimates are unreliable.')
+
+  def build_update(self):
+    """
+    Draw ``n_samples`` from each proposal in one batched op, and
+    compute the log weights
+
+    log w_s = log p(x, z_s) - log q(z_s).
+
+    The proposal densities are computed for all samples at once, and
+    the log joint densities in a ``tf.while_loop`` over samples. The
+    self-normalized weights are w_s / sum_s w_s.
+    """
+    sample = {}
+    log_q = 0.0
+    for z, proposal_z in six.iteritems(self.proposal_vars):
+      sample[z] = proposal_z.sample_n(self.n_samples)
+      log_prob = proposal_z.log_prob(sample[z])
+      rank = len(log_prob.get_shape())
+      if rank > 1:
+        log_prob = tf.reduce_sum(log_prob, list(range(1, rank)))
+
+      log_q += log_prob
+
+    log_weights = self._log_densities(sample) - log_q
+
+    self.ess = 1.0 / tf.reduce_sum(tf.square(
+        tf.nn.softmax(tf.expand_dims(log_weights, 0))))
+    self.pareto_k = pareto_k(log_weights)
+    self.log_evidence = log_sum_exp(log_weights) - np.log(self.n_samples)
+
+    # Update Empirical random variables.
+    assign_ops = []
+    log_weights_variables = set()
+    variables = {x.name: x for x in
+                 tf.get_default_graph().get_collection(tf.GraphKeys.VARIABLES)}
+    idx = tf.range(self.n_samples)
+    for z, qz in six.iteritems(self.latent_vars):
+      variable = _get_variable(qz.params, variables)
+      log_weights_variable = _get_variable(qz.log_weights, variables)
+      if variable is None or log_weights_variable is None:
+        raise TypeError("Empirical random variables must be parameterized "
+                        "by tf.Variables: " + str(qz))
+
+      assign_ops.append(tf.scatter_update(variable, idx,
+                                          qz.compress(sample[z])))
+      if isinstance(qz.n_filled, tf.Variable):
+        assign_ops.append(qz.n_filled.assign(self.n_samples))
+
+      log_weights_variables.add(log_weights_variable)
+
+    for variable in log_weights_variables:
+      assign_ops.append(tf.scatter_update(variable, idx, log_weights))
+
+    return tf.group(*assign_ops)
+
+  def _log_densities(self, z_sample):
+    """Log joint density of each sample, evaluated in a
+    ``tf.while_loop`` over samples."""
+    def _cond(i, *args):
+      return i < self.n_samples
+
+    def _body(i, ta):
+      z_sample_i = {z: tf.gather(sample, i)
+                    for z, sample in six.iteritems(z_sample)}
+      return i + 1, ta.write(i, self.log_joint(z_sample_i))
+
+    _, ta = tf.while_loop(
+        _cond, _body,
+        [tf.constant(0), tf.TensorArray(dtype=tf.float32,
+                                        size=self.n_samples)])
+    return ta.pack()
@@ -8,7 +8,7 @@ import six
 import tensorflow as tf
 
 from edward.models import RandomVariable, StanModel
-from edward.util import get_session, placeholder
+from edward.util import copy, get_session, placeholder
 
 
 class Inference(object):
@@ -126,7 +126,8 @@ class Inference(object):
     2. (Optional) Build a ``tf.train.SummaryWriter`` for TensorBoard.
     3. (Optional) Initialize TensorFlow variables.
     4. (Optional) Start queue runners.
-    5. Run ``update`` for ``self.n_iter`` iterations.
+    5. Run ``update`` for ``self.n_iter`` iterations, or until
+       ``update`` signals to stop early.
     6. While running, ``print_progress``.
     7. Finalize algorithm via ``finalize``.
     8. (Optional) Stop queue runners.
@@ -177,9 +178,11 @@ class Inference(object):
       self.coord = tf.train.Coordinator()
       self.threads = tf.train.start_queue_runners(coord=self.coord)
 
-    for _ in range(self.n_iter):
+    for _ in six.moves.range(self.n_iter):
       info_dict = self.update()
       self.print_progress(info_dict)
+      if info_dict.get('stop', False):
+        break
 
     self.finalize()
 
@@ -188,7 +191,8 @@ class Inference(object):
       self.coord.request_stop()
       self.coord.join(self.threads)
 
-  def initialize(self, n_iter=1000, n_print=None, n_minibatch=None):
+  def initialize(self, n_iter=1000, n_print=None, n_minibatch=None,
+                 scale=None):
     """Initialize inference algorithm.
 
     Parameters
@@ -204,6 +208,13 @@ class Inference(object):
       passed in are NumPy arrays and the model is not a Stan
       model. For subsampling details, see
       ``tf.train.slice_input_producer`` and ``tf.train.batch``.
+    scale : dict of RandomVariable to float or tf.Tensor, optional
+      Scale factors for the log density of random variables. For
+      example, when subsampling data, scaling the log-likelihood of
+      observed variables by the ratio of data size to minibatch size
+      makes it an unbiased estimate of the full data's. Default is no
+      scaling. It is used by inference methods that evaluate the
+      model's log density themselves.
     """
     self.n_iter = n_iter
     if n_print is None:
@@ -214,6 +225,11 @@ class Inference(object):
     self.t = tf.Variable(0, trainable=False)
     self.increment_t = self.t.assign_add(1)
 
+    if scale is None:
+      scale = {}
+
+    self.scale = scale
+
     self.n_minibatch = n_minibatch
     if n_minibatch is not None and \
        not isinstance(self.model_wrapper, StanModel):
@@ -238,7 +254,9 @@ class Inference(object):
     Returns
     -------
     dict
-      Dictionary of algorithm-specific information.
+      Dictionary of algorithm-specific information. If it has the key
+      ``'stop'`` set to ``True``, ``run`` terminates after this
+      iteration.
     """
     t = self.increment_t.eval()
     return {'t': t}
@@ -262,3 +280,48 @@ class Inference(object):
     """Function to call after convergence.
     """
     pass
+
+  def log_joint(self, z_sample):
+    """
+    Utility function to calculate model's log joint density,
+    log p(x, z), for inputs z (and fixed data x).
+
+    The densities of latent and observed variables are conditioned on
+    the observed data as well as on ``z_sample``, so, e.g., a latent
+    variable whose prior depends on an observed variable is evaluated
+    given its realization rather than a sample from its own prior.
+    Their log densities are scaled by ``scale``. Each call copies the
+    model into new scopes, counted by the ``scope_iter`` attribute of
+    the inference.
+
+    Parameters
+    ----------
+    z_sample : dict
+      Latent variable keys to samples.
+    """
+    if self.model_wrapper is None:
+      self.scope_iter += 1
+      # Form dictionary in order to replace conditioning on prior or
+      # observed variable with conditioning on posterior sample or
+      # observed data.
+      dict_swap = z_sample.copy()
+      for x, obs in six.iteritems(self.data):
+        if isinstance(x, RandomVariable):
+          dict_swap[x] = obs
+
+      log_joint = 0.0
+      for z, sample in six.iteritems(z_sample):
+        z_copy = copy(z, dict_swap, scope='prior' + str(self.scope_iter))
+        log_joint += self.scale.get(z, 1.0) * \
+            tf.reduce_sum(z_copy.log_prob(sample))
+
+      for x, obs in six.iteritems(self.data):
+        if isinstance(x, RandomVariable):
+          x_z = copy(x, dict_swap, scope='likelihood' + str(self.scope_iter))
+          log_joint += self.scale.get(x, 1.0) * \
+              tf.reduce_sum(x_z.log_prob(obs))
+    else:
+      x = self.data
+      log_joint = self.model_wrapper.log_prob(x, z_sample)
+
+    return log_joint
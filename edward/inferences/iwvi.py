@@ -0,0 +1,172 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import six
+import tensorflow as tf
+
+from edward.inferences.klqp import build_score_gradients
+from edward.inferences.variational_inference import VariationalInference
+from edward.util import log_mean_exp
+
+
+class IWVI(VariationalInference):
+  """Importance-weighted variational inference (Burda et al., 2016).
+  It maximizes the importance-weighted lower bound on the log marginal
+  likelihood,
+
+  .. math::
+
+    E_{q(z^1; \lambda), ..., q(z^K; \lambda)} [
+      \log 1/K \sum_{k=1}^K p(x, z^k) / q(z^k; \lambda) ],
+
+  which is the ELBO for :math:`K=1` and is tighter for larger
+  :math:`K`. It is the core idea behind importance-weighted
+  autoencoders: IWAEs are the special case when the probabilistic
+  model is among a specific class of deep generative models, and the
+  variational model is parameterized with an inference network.
+  """
+  def __init__(self, *args, **kwargs):
+    """
+    Examples
+    --------
+    >>> p = Beta(a=1.0, b=1.0)
+    >>> x = Bernoulli(p=tf.ones(10) * p)
+    >>>
+    >>> qp_a = tf.nn.softplus(tf.Variable(tf.random_normal([])))
+    >>> qp_b = tf.nn.softplus(tf.Variable(tf.random_normal([])))
+    >>> qp = Beta(a=qp_a, b=qp_b)
+    >>>
+    >>> inference = ed.IWVI({p: qp}, data={x: x_data})
+    >>> inference.run(K=5)
+    """
+    super(IWVI, self).__init__(*args, **kwargs)
+    self.scope_iter = 0  # a convenient counter for log joint calculations
+
+  def initialize(self, K=5, n_samples=1, score=None, baseline=None,
+                 control_variate=False, decay=0.9, *args, **kwargs):
+    """Initialization.
+
+    Parameters
+    ----------
+    K : int, optional
+      Number of importance samples in the bound.
+    n_samples : int, optional
+      Number of samples of the bound, each from ``K`` importance
+      samples, for calculating stochastic gradients.
+    score : bool, optional
+      Whether to force inference to use the score function
+      gradient estimator. Otherwise default is to use the
+      reparameterization gradient if available.
+    baseline : str, optional
+      Baseline subtracted from the learning signal of the score
+      function gradient estimator, one of 'moving_average' and
+      'leave_one_out'. See ``KLqp.initialize``. Default is no
+      baseline.
+    control_variate : bool, optional
+      Whether to use the score function as a control variate for the
+      score function gradient estimator. It requires ``n_samples`` >
+      1.
+    decay : float, optional
+      Decay rate of the moving average baseline.
+    """
+    if baseline not in [None, 'moving_average', 'leave_one_out']:
+      raise ValueError("baseline must be one of None, 'moving_average', "
+                       "and 'leave_one_out'.")
+
+    if n_samples < 2 and (baseline == 'leave_one_out' or control_variate):
+      raise ValueError("Leave-one-out baselines and control variates "
+                       "require n_samples > 1.")
+
+    self.K = K
+    self.n_samples = n_samples
+    if score is None and \
+       all([rv.is_reparameterized and rv.is_continuous
+            for rv in six.itervalues(self.latent_vars)]):
+      self.score = False
+    else:
+      self.score = True
+
+    self.baseline = baseline
+    self.control_variate = control_variate
+    self.decay = decay
+    return super(IWVI, self).initialize(*args, **kwargs)
+
+  def build_loss_and_gradients(self, var_list):
+    """Build loss function
+
+    .. math::
+
+      -1/S \sum_{s=1}^S \log 1/K \sum_{k=1}^K w(z^{s,k}; \lambda),
+
+      w(z; \lambda) = p(x, z) / q(z; \lambda),
+
+    and its gradients, for :math:`S` = ``n_samples`` sets of
+    :math:`K` samples :math:`z^{s,k} \sim q(z; \lambda)`.
+
+    All :math:`SK` samples are drawn from each factor in one op, and
+    their variational log densities are computed in one op. The log
+    joint densities are computed in a ``tf.while_loop`` over samples,
+    so the graph size does not grow with :math:`SK`.
+
+    The reparameterization gradient is the automatic differentiation
+    of the loss function. The score function gradient is
+
+    .. math::
+
+      -1/S \sum_{s=1}^S [ \sum_{k=1}^K
+        \partial_{\lambda} \log q(z^{s,k}; \lambda) L_s
+        - \sum_{k=1}^K w_{norm}(z^{s,k}; \lambda)
+        \partial_{\lambda} \log q(z^{s,k}; \lambda) ],
+
+    where :math:`L_s` is the bound of the :math:`s^{th}` set and
+    :math:`w_{norm}` are its normalized importance weights, with the
+    baseline and control variate of ``build_score_gradients``.
+    """
+    n_total = self.K * self.n_samples
+    z_sample = {}
+    q_log_prob = 0.0
+    for z, qz in six.iteritems(self.latent_vars):
+      z_sample[z] = qz.sample_n(n_total)
+      if self.score:
+        z_sample[z] = tf.stop_gradient(z_sample[z])
+
+      log_prob = qz.log_prob(z_sample[z])
+      rank = len(log_prob.get_shape())
+      if rank > 1:
+        log_prob = tf.reduce_sum(log_prob, list(range(1, rank)))
+
+      q_log_prob += self.scale.get(z, 1.0) * log_prob
+
+    p_log_prob = self._log_joints(z_sample, n_total)
+
+    # Form n_samples x K matrix of log importance weights.
+    log_w = tf.reshape(p_log_prob - q_log_prob, [self.n_samples, self.K])
+    # Take log mean exp across importance weights (columns).
+    bounds = tf.reshape(log_mean_exp(log_w, 1), [self.n_samples])
+    self.loss = -tf.reduce_mean(bounds)
+
+    if self.score:
+      q_log_prob = tf.reduce_sum(
+          tf.reshape(q_log_prob, [self.n_samples, self.K]), 1)
+      return build_score_gradients(self, q_log_prob, bounds, var_list,
+                                   self.loss)
+
+    grads = tf.gradients(self.loss, var_list)
+    return self.loss, list(zip(grads, var_list))
+
+  def _log_joints(self, z_sample, n_total):
+    """Log joint density of each sample, evaluated in a
+    ``tf.while_loop`` over samples."""
+    def _cond(i, *args):
+      return i < n_total
+
+    def _body(i, ta):
+      z_sample_i = {z: tf.gather(sample, i)
+                    for z, sample in six.iteritems(z_sample)}
+      return i + 1, ta.write(i, self.log_joint(z_sample_i))
+
+    _, ta = tf.while_loop(
+        _cond, _body,
+        [tf.constant(0), tf.TensorArray(dtype=tf.float32, size=n_total)])
+    return ta.pack()
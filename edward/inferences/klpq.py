@@ -5,6 +5,7 @@ from __future__ import print_function
 import six
 import tensorflow as tf
 
+from edward.inferences.klqp import build_score_gradients
 from edward.inferences.variational_inference import VariationalInference
 from edward.models import RandomVariable, Normal
 from edward.util import copy, log_sum_exp
@@ -21,7 +22,8 @@ class KLpq(VariationalInference):
   def __init__(self, *args, **kwargs):
     super(KLpq, self).__init__(*args, **kwargs)
 
-  def initialize(self, n_samples=1, *args, **kwargs):
+  def initialize(self, n_samples=1, baseline=None, control_variate=False,
+                 decay=0.9, *args, **kwargs):
     """Initialization.
 
     Parameters
@@ -29,11 +31,32 @@ class KLpq(VariationalInference):
     n_samples : int, optional
       Number of samples from variational model for calculating
       stochastic gradients.
+    baseline : str, optional
+      Baseline subtracted from the normalized importance weights in
+      the gradient, either 'moving_average' or None. See
+      ``KLqp.initialize``. Leave-one-out baselines are not supported:
+      each normalized weight depends on all samples, so the mean of
+      the others would bias the gradient. Default is no baseline.
+    control_variate : bool, optional
+      Whether to use the score function as a control variate, with a
+      scaling for each variational parameter estimated from the
+      samples. It requires ``n_samples`` > 1.
+    decay : float, optional
+      Decay rate of the moving average baseline.
     """
+    if baseline not in [None, 'moving_average']:
+      raise ValueError("baseline must be either None or 'moving_average'.")
+
+    if n_samples < 2 and control_variate:
+      raise ValueError("Control variates require n_samples > 1.")
+
     self.n_samples = n_samples
+    self.baseline = baseline
+    self.control_variate = control_variate
+    self.decay = decay
     return super(KLpq, self).initialize(*args, **kwargs)
 
-  def build_loss(self):
+  def build_loss_and_gradients(self, var_list):
     """Build loss function. Its automatic differentiation
     is a stochastic gradient of
 
@@ -65,6 +88,7 @@ class KLpq(VariationalInference):
       - 1/B \sum_{b=1}^B
       w_{norm}(z^b; \lambda) \partial_{\lambda} \log q(z^b; \lambda)
 
+    with the baseline and control variate of ``build_score_gradients``.
     """
     p_log_prob = [0.0] * self.n_samples
     q_log_prob = [0.0] * self.n_samples
@@ -106,4 +130,4 @@ class KLpq(VariationalInference):
     w_norm = tf.exp(log_w_norm)
 
     self.loss = tf.reduce_mean(w_norm * log_w)
-    return -tf.reduce_mean(q_log_prob * tf.stop_gradient(w_norm))
+    return build_score_gradients(self, q_log_prob, w_norm, var_list)
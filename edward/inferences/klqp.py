@@ -6,8 +6,9 @@ import six
 import tensorflow as tf
 
 from edward.inferences.variational_inference import VariationalInference
-from edward.models import RandomVariable, Normal
-from edward.util import copy, kl_multivariate_normal
+from edward.models import MultivariateNormalDiag, RandomVariable, Normal
+from edward.util import copy, get_children, kl_divergence, \
+    kl_multivariate_normal
 
 
 class KLqp(VariationalInference):
@@ -29,7 +30,9 @@ class KLqp(VariationalInference):
   def __init__(self, *args, **kwargs):
     super(KLqp, self).__init__(*args, **kwargs)
 
-  def initialize(self, n_samples=1, score=None, *args, **kwargs):
+  def initialize(self, n_samples=1, score=None, baseline=None,
+                 control_variate=False, decay=0.9, natural_gradient=False,
+                 *args, **kwargs):
     """Initialization.
 
     Parameters
@@ -41,6 +44,30 @@ class KLqp(VariationalInference):
       Whether to force inference to use the score function
       gradient estimator. Otherwise default is to use the
       reparameterization gradient if available.
+    baseline : str, optional
+      Baseline subtracted from the learning signal of the score
+      function gradient estimator, one of
+
+      + 'moving_average': an exponential moving average of the
+        learning signal over iterations.
+      + 'leave_one_out': for each sample, the mean learning signal of
+        the other samples. It requires ``n_samples`` > 1.
+
+      Default is no baseline.
+    control_variate : bool, optional
+      Whether to use the score function as a control variate for the
+      score function gradient estimator, with a scaling for each
+      variational parameter estimated from the samples (Ranganath et
+      al., 2014). It requires ``n_samples`` > 1.
+    decay : float, optional
+      Decay rate of the moving average baseline.
+    natural_gradient : bool, optional
+      Whether to precondition the gradients of the parameters of
+      ``Normal`` and ``MultivariateNormalDiag`` variational factors by
+      their inverse Fisher information; see
+      ``build_natural_gradients``. As adaptive optimizers rescale
+      gradients themselves, the default optimizer is then gradient
+      descent with a learning rate of 0.1.
     """
     if score is None and \
        all([rv.is_reparameterized and rv.is_continuous
@@ -49,10 +76,25 @@ class KLqp(VariationalInference):
     else:
       self.score = True
 
+    if baseline not in [None, 'moving_average', 'leave_one_out']:
+      raise ValueError("baseline must be one of None, 'moving_average', "
+                       "and 'leave_one_out'.")
+
+    if n_samples < 2 and (baseline == 'leave_one_out' or control_variate):
+      raise ValueError("Leave-one-out baselines and control variates "
+                       "require n_samples > 1.")
+
     self.n_samples = n_samples
+    self.baseline = baseline
+    self.control_variate = control_variate
+    self.decay = decay
+    self.natural_gradient = natural_gradient
+    if natural_gradient and kwargs.get('optimizer', None) is None:
+      kwargs['optimizer'] = tf.train.GradientDescentOptimizer(0.1)
+
     return super(KLqp, self).initialize(*args, **kwargs)
 
-  def build_loss(self):
+  def build_loss_and_gradients(self, var_list):
     """Wrapper for the KLqp loss function.
 
     .. math::
@@ -66,46 +108,60 @@ class KLqp(VariationalInference):
 
     of the loss function.
 
-    If the variational model is a Gaussian distribution, then part of the
-    loss function can be computed analytically.
-
-    If the variational model is a normal distribution and the prior is
-    standard normal, then part of the loss function can be computed
-    analytically following Kingma and Welling (2014),
+    Part of the loss function can be computed analytically following
+    Kingma and Welling (2014),
 
     .. math::
 
       E[\log p(x | z) + KL],
 
-    where the KL term is computed analytically.
+    where the KL term is computed analytically. For Edward's native
+    modeling language, it is analytic for each latent variable whose
+    pair of variational factor and prior is registered with
+    ``edward.util.register_kl``, and estimated by Monte Carlo for the
+    others. For model wrappers, it is analytic if the variational
+    model is a normal distribution and the prior is standard normal.
+
+    Score function gradients can use baselines and control variates,
+    and all gradients can be natural gradients; see ``initialize``.
 
     Returns
     -------
     result :
-      an appropriately selected loss function form
+      an appropriately selected loss function form, and its gradients
     """
-    qz_is_normal = all([isinstance(rv, Normal) for
-                       rv in six.itervalues(self.latent_vars)])
-    z_is_normal = all([isinstance(rv, Normal) for
-                       rv in six.iterkeys(self.latent_vars)])
-    is_analytic_kl = qz_is_normal and \
-        (z_is_normal or hasattr(self.model_wrapper, 'log_lik'))
+    if self.model_wrapper is None:
+      # Unregistered pairs fall back to Monte Carlo per latent variable.
+      is_analytic_kl = True
+    else:
+      is_analytic_kl = hasattr(self.model_wrapper, 'log_lik') and \
+          all([isinstance(rv, Normal) for
+               rv in six.itervalues(self.latent_vars)])
+
     if self.score:
       if is_analytic_kl:
-        return build_score_loss_kl(self)
+        loss, grads_and_vars = build_score_loss_kl(self, var_list)
       # Analytic entropies may lead to problems around
       # convergence; for now it is deactivated.
       # elif is_analytic_entropy:
-      #    return build_score_loss_entropy(self)
+      #    loss, grads_and_vars = build_score_loss_entropy(self, var_list)
       else:
-        return build_score_loss(self)
+        loss, grads_and_vars = build_score_loss(self, var_list)
     else:
       if is_analytic_kl:
-        return build_reparam_loss_kl(self)
+        loss = build_reparam_loss_kl(self)
       # elif is_analytic_entropy:
-      #    return build_reparam_loss_entropy(self)
+      #    loss = build_reparam_loss_entropy(self)
       else:
-        return build_reparam_loss(self)
+        loss = build_reparam_loss(self)
+
+      grads = tf.gradients(loss, var_list)
+      grads_and_vars = list(zip(grads, var_list))
+
+    if self.natural_gradient:
+      grads_and_vars = build_natural_gradients(self, grads_and_vars)
+
+    return loss, grads_and_vars
 
 
 MFVI = KLqp  # deprecated synonym
@@ -283,7 +339,8 @@ def build_reparam_loss(inference):
       # Copy q(z) to obtain new set of posterior samples.
       qz_copy = copy(qz, scope='inference_' + str(s))
       z_sample[z] = qz_copy.value()
-      q_log_prob[s] += tf.reduce_sum(qz.log_prob(z_sample[z]))
+      q_log_prob[s] += inference.scale.get(z, 1.0) * tf.reduce_sum(
+          qz.log_prob(z_sample[z]))
 
     if inference.model_wrapper is None:
       # Form dictionary in order to replace conditioning on prior or
@@ -296,12 +353,14 @@ def build_reparam_loss(inference):
 
       for z in six.iterkeys(inference.latent_vars):
         z_copy = copy(z, dict_swap, scope='inference_' + str(s))
-        p_log_prob[s] += tf.reduce_sum(z_copy.log_prob(z_sample[z]))
+        p_log_prob[s] += inference.scale.get(z, 1.0) * tf.reduce_sum(
+            z_copy.log_prob(z_sample[z]))
 
       for x, obs in six.iteritems(inference.data):
         if isinstance(x, RandomVariable):
           x_copy = copy(x, dict_swap, scope='inference_' + str(s))
-          p_log_prob[s] += tf.reduce_sum(x_copy.log_prob(obs))
+          p_log_prob[s] += inference.scale.get(x, 1.0) * tf.reduce_sum(
+              x_copy.log_prob(obs))
     else:
       x = inference.data
       p_log_prob[s] = inference.model_wrapper.log_prob(x, z_sample)
@@ -323,7 +382,13 @@ def build_reparam_loss_kl(inference):
 
   based on the reparameterization trick. (Kingma and Welling, 2014)
 
-  It assumes the KL is analytic.
+  For Edward's native modeling language, the KL divergence of each
+  latent variable is analytic if it is registered for the pair of
+  classes of its variational factor and prior; see
+  ``edward.util.kl_divergence``. If its prior depends on other latent
+  variables, the KL divergence is computed given their samples. The
+  KL divergences of other latent variables are estimated by Monte
+  Carlo, as part of the expected log joint.
 
   For model wrappers, it assumes the prior is :math:`p(z) =
   \mathcal{N}(z; 0, 1)`.
@@ -332,6 +397,7 @@ def build_reparam_loss_kl(inference):
   expectation using Monte Carlo sampling.
   """
   p_log_lik = [0.0] * inference.n_samples
+  kl = [0.0] * inference.n_samples
   for s in range(inference.n_samples):
     z_sample = {}
     for z, qz in six.iteritems(inference.latent_vars):
@@ -348,10 +414,21 @@ def build_reparam_loss_kl(inference):
         if isinstance(x, RandomVariable):
           dict_swap[x] = obs
 
+      for z, qz in six.iteritems(inference.latent_vars):
+        z_copy = copy(z, dict_swap, scope='inference_' + str(s))
+        try:
+          kl[s] += inference.scale.get(z, 1.0) * tf.reduce_sum(
+              kl_divergence(qz, z_copy))
+        except NotImplementedError:
+          p_log_lik[s] += inference.scale.get(z, 1.0) * (
+              tf.reduce_sum(z_copy.log_prob(z_sample[z])) -
+              tf.reduce_sum(qz.log_prob(z_sample[z])))
+
       for x, obs in six.iteritems(inference.data):
         if isinstance(x, RandomVariable):
           x_copy = copy(x, dict_swap, scope='inference_' + str(s))
-          p_log_lik[s] += tf.reduce_sum(x_copy.log_prob(obs))
+          p_log_lik[s] += inference.scale.get(x, 1.0) * tf.reduce_sum(
+              x_copy.log_prob(obs))
     else:
       x = inference.data
       p_log_lik[s] = inference.model_wrapper.log_lik(x, z_sample)
@@ -359,12 +436,11 @@ def build_reparam_loss_kl(inference):
   p_log_lik = tf.pack(p_log_lik)
 
   if inference.model_wrapper is None:
-    kl = tf.reduce_sum([tf.reduce_sum(kl_multivariate_normal(
-                        qz.mu, qz.sigma, z.mu, z.sigma))
-                        for z, qz in six.iteritems(inference.latent_vars)])
+    kl = tf.reduce_mean(tf.pack(kl))
   else:
-    kl = tf.reduce_sum([tf.reduce_sum(kl_multivariate_normal(qz.mu, qz.sigma))
-                        for qz in six.itervalues(inference.latent_vars)])
+    kl = tf.reduce_sum([inference.scale.get(z, 1.0) *
+                        tf.reduce_sum(kl_multivariate_normal(qz.mu, qz.sigma))
+                        for z, qz in six.iteritems(inference.latent_vars)])
 
   inference.loss = -(tf.reduce_mean(p_log_lik) - kl)
   return inference.loss
@@ -405,26 +481,29 @@ def build_reparam_loss_entropy(inference):
 
       for z in six.iterkeys(inference.latent_vars):
         z_copy = copy(z, dict_swap, scope='inference_' + str(s))
-        p_log_prob[s] += tf.reduce_sum(z_copy.log_prob(z_sample[z]))
+        p_log_prob[s] += inference.scale.get(z, 1.0) * tf.reduce_sum(
+            z_copy.log_prob(z_sample[z]))
 
       for x, obs in six.iteritems(inference.data):
         if isinstance(x, RandomVariable):
           x_copy = copy(x, dict_swap, scope='inference_' + str(s))
-          p_log_prob[s] += tf.reduce_sum(x_copy.log_prob(obs))
+          p_log_prob[s] += inference.scale.get(x, 1.0) * tf.reduce_sum(
+              x_copy.log_prob(obs))
     else:
       x = inference.data
       p_log_prob[s] = inference.model_wrapper.log_prob(x, z_sample)
 
   p_log_prob = tf.pack(p_log_prob)
 
-  q_entropy = tf.reduce_sum([qz.entropy()
-                             for qz in six.itervalues(inference.latent_vars)])
+  q_entropy = tf.reduce_sum([
+      inference.scale.get(z, 1.0) * tf.reduce_sum(qz.entropy())
+      for z, qz in six.iteritems(inference.latent_vars)])
 
   inference.loss = -(tf.reduce_mean(p_log_prob) + q_entropy)
   return inference.loss
 
 
-def build_score_loss(inference):
+def build_score_loss(inference, var_list):
   """Build loss function. Its automatic differentiation
   is a stochastic gradient of
 
@@ -436,17 +515,29 @@ def build_score_loss(inference):
 
   Computed by sampling from :math:`q(z;\lambda)` and evaluating the
   expectation using Monte Carlo sampling.
+
+  The gradients use the baseline and control variate of the
+  inference; see ``build_score_gradients``. For Edward's native
+  modeling language, they are Rao-Blackwellized; see
+  ``build_rao_blackwellized_signals``.
   """
   p_log_prob = [0.0] * inference.n_samples
   q_log_prob = [0.0] * inference.n_samples
+  # Log density of each random variable in each sample, to form the
+  # learning signal of each variational factor.
+  p_log_probs = [{} for s in range(inference.n_samples)]
+  q_log_probs = [{} for s in range(inference.n_samples)]
   for s in range(inference.n_samples):
     z_sample = {}
     for z, qz in six.iteritems(inference.latent_vars):
       # Copy q(z) to obtain new set of posterior samples.
       qz_copy = copy(qz, scope='inference_' + str(s))
       z_sample[z] = qz_copy.value()
-      q_log_prob[s] += tf.reduce_sum(
+      # The score function is unscaled; the scale enters through the
+      # learning signal.
+      q_log_probs[s][z] = tf.reduce_sum(
           qz.log_prob(tf.stop_gradient(z_sample[z])))
+      q_log_prob[s] += inference.scale.get(z, 1.0) * q_log_probs[s][z]
 
     if inference.model_wrapper is None:
       # Form dictionary in order to replace conditioning on prior or
@@ -459,12 +550,16 @@ def build_score_loss(inference):
 
       for z in six.iterkeys(inference.latent_vars):
         z_copy = copy(z, dict_swap, scope='inference_' + str(s))
-        p_log_prob[s] += tf.reduce_sum(z_copy.log_prob(z_sample[z]))
+        p_log_probs[s][z] = inference.scale.get(z, 1.0) * tf.reduce_sum(
+            z_copy.log_prob(z_sample[z]))
+        p_log_prob[s] += p_log_probs[s][z]
 
       for x, obs in six.iteritems(inference.data):
         if isinstance(x, RandomVariable):
           x_copy = copy(x, dict_swap, scope='inference_' + str(s))
-          p_log_prob[s] += tf.reduce_sum(x_copy.log_prob(obs))
+          p_log_probs[s][x] = inference.scale.get(x, 1.0) * tf.reduce_sum(
+              x_copy.log_prob(obs))
+          p_log_prob[s] += p_log_probs[s][x]
     else:
       x = inference.data
       p_log_prob[s] = inference.model_wrapper.log_prob(x, z_sample)
@@ -474,10 +569,18 @@ def build_score_loss(inference):
 
   losses = p_log_prob - q_log_prob
   inference.loss = -tf.reduce_mean(losses)
-  return -tf.reduce_mean(q_log_prob * tf.stop_gradient(losses))
+  if inference.model_wrapper is None:
+    q_log_prob, losses = build_rao_blackwellized_signals(
+        inference, q_log_probs, p_log_probs,
+        list(six.iterkeys(inference.latent_vars)))
+  else:
+    q_log_prob = tf.pack([tf.add_n(list(six.itervalues(q_log_probs[s])))
+                          for s in range(inference.n_samples)])
 
+  return build_score_gradients(inference, q_log_prob, losses, var_list)
 
-def build_score_loss_kl(inference):
+
+def build_score_loss_kl(inference, var_list):
   """Build loss function. Its automatic differentiation
   is a stochastic gradient of
 
@@ -488,23 +591,46 @@ def build_score_loss_kl(inference):
 
   based on the score function estimator. (Paisley et al., 2012)
 
-  It assumes the KL is analytic.
+  For Edward's native modeling language, the KL divergence of each
+  latent variable is analytic if it is registered for the pair of
+  classes of its variational factor and prior; see
+  ``edward.util.kl_divergence``. If its prior depends on other latent
+  variables, the KL divergence is computed given their samples, and
+  it is part of their learning signals only. The KL divergences of other
+  latent variables are estimated by Monte Carlo, as part of the
+  expected log joint.
 
   For model wrappers, it assumes the prior is :math:`p(z) =
   \mathcal{N}(z; 0, 1)`.
 
   Computed by sampling from :math:`q(z;\lambda)` and evaluating the
   expectation using Monte Carlo sampling.
+
+  The gradients use the baseline and control variate of the
+  inference; see ``build_score_gradients``. For Edward's native
+  modeling language, they are Rao-Blackwellized; see
+  ``build_rao_blackwellized_signals``.
   """
   p_log_lik = [0.0] * inference.n_samples
   q_log_prob = [0.0] * inference.n_samples
+  kl = [0.0] * inference.n_samples
+  # Log density of each random variable in each sample, to form the
+  # learning signal of each variational factor.
+  p_log_probs = [{} for s in range(inference.n_samples)]
+  q_log_probs = [{} for s in range(inference.n_samples)]
+  # Latent variables whose KL divergence is estimated by Monte Carlo,
+  # and those whose KL divergence is analytic.
+  mc_vars = []
+  kl_vars = []
   for s in range(inference.n_samples):
     z_sample = {}
     for z, qz in six.iteritems(inference.latent_vars):
       # Copy q(z) to obtain new set of posterior samples.
       qz_copy = copy(qz, scope='inference_' + str(s))
       z_sample[z] = qz_copy.value()
-      q_log_prob[s] += tf.reduce_sum(
+      # The score function is unscaled; the scale enters through the
+      # learning signal.
+      q_log_probs[s][z] = tf.reduce_sum(
           qz.log_prob(tf.stop_gradient(z_sample[z])))
 
     if inference.model_wrapper is None:
@@ -516,10 +642,34 @@ def build_score_loss_kl(inference):
         if isinstance(x, RandomVariable):
           dict_swap[x] = obs
 
+      # The analytic KL divergences are differentiated directly, so
+      # the priors condition on samples with stopped gradients.
+      dict_swap_prior = {key: tf.stop_gradient(value)
+                         for key, value in six.iteritems(dict_swap)}
+      for z, qz in six.iteritems(inference.latent_vars):
+        z_copy = copy(z, dict_swap_prior, scope='inference_' + str(s))
+        try:
+          kl_z = inference.scale.get(z, 1.0) * tf.reduce_sum(
+              kl_divergence(qz, z_copy))
+        except NotImplementedError:
+          p_log_probs[s][z] = inference.scale.get(z, 1.0) * tf.reduce_sum(
+              z_copy.log_prob(z_sample[z]))
+          p_log_lik[s] += p_log_probs[s][z]
+          q_log_prob[s] += inference.scale.get(z, 1.0) * q_log_probs[s][z]
+          if z not in mc_vars:
+            mc_vars.append(z)
+        else:
+          p_log_probs[s][z] = -kl_z
+          kl[s] += kl_z
+          if z not in kl_vars:
+            kl_vars.append(z)
+
       for x, obs in six.iteritems(inference.data):
         if isinstance(x, RandomVariable):
           x_copy = copy(x, dict_swap, scope='inference_' + str(s))
-          p_log_lik[s] += tf.reduce_sum(x_copy.log_prob(obs))
+          p_log_probs[s][x] = inference.scale.get(x, 1.0) * tf.reduce_sum(
+              x_copy.log_prob(obs))
+          p_log_lik[s] += p_log_probs[s][x]
     else:
       x = inference.data
       p_log_lik[s] = inference.model_wrapper.log_lik(x, z_sample)
@@ -528,18 +678,27 @@ def build_score_loss_kl(inference):
   q_log_prob = tf.pack(q_log_prob)
 
   if inference.model_wrapper is None:
-    kl = tf.reduce_sum([tf.reduce_sum(kl_multivariate_normal(
-                        qz.mu, qz.sigma, z.mu, z.sigma))
+    kl = tf.reduce_mean(tf.pack(kl))
+  else:
+    kl = tf.reduce_sum([inference.scale.get(z, 1.0) *
+                        tf.reduce_sum(kl_multivariate_normal(qz.mu, qz.sigma))
                         for z, qz in six.iteritems(inference.latent_vars)])
+
+  # The Monte Carlo KL divergences are part of the learning signal.
+  inference.loss = -(tf.reduce_mean(p_log_lik - q_log_prob) - kl)
+  if inference.model_wrapper is None:
+    q_log_prob, p_log_lik = build_rao_blackwellized_signals(
+        inference, q_log_probs, p_log_probs, mc_vars, kl_vars)
   else:
-    kl = tf.reduce_sum([tf.reduce_sum(kl_multivariate_normal(qz.mu, qz.sigma))
-                        for qz in six.itervalues(inference.latent_vars)])
+    # The score function is of all factors.
+    q_log_prob = tf.pack([tf.add_n(list(six.itervalues(q_log_probs[s])))
+                          for s in range(inference.n_samples)])
 
-  inference.loss = -(tf.reduce_mean(p_log_lik) - kl)
-  return -(tf.reduce_mean(q_log_prob * tf.stop_gradient(p_log_lik)) - kl)
+  return build_score_gradients(inference, q_log_prob, p_log_lik, var_list,
+                               kl)
 
 
-def build_score_loss_entropy(inference):
+def build_score_loss_entropy(inference, var_list):
   """Build loss function. Its automatic differentiation
   is a stochastic gradient of
 
@@ -554,17 +713,29 @@ def build_score_loss_entropy(inference):
 
   Computed by sampling from :math:`q(z;\lambda)` and evaluating the
   expectation using Monte Carlo sampling.
+
+  The gradients use the baseline and control variate of the
+  inference; see ``build_score_gradients``. For Edward's native
+  modeling language, they are Rao-Blackwellized; see
+  ``build_rao_blackwellized_signals``.
   """
   p_log_prob = [0.0] * inference.n_samples
   q_log_prob = [0.0] * inference.n_samples
+  # Log density of each random variable in each sample, to form the
+  # learning signal of each variational factor.
+  p_log_probs = [{} for s in range(inference.n_samples)]
+  q_log_probs = [{} for s in range(inference.n_samples)]
   for s in range(inference.n_samples):
     z_sample = {}
     for z, qz in six.iteritems(inference.latent_vars):
       # Copy q(z) to obtain new set of posterior samples.
       qz_copy = copy(qz, scope='inference_' + str(s))
       z_sample[z] = qz_copy.value()
-      q_log_prob[s] += tf.reduce_sum(
+      # The score function is unscaled; the scale enters through the
+      # learning signal.
+      q_log_probs[s][z] = tf.reduce_sum(
           qz.log_prob(tf.stop_gradient(z_sample[z])))
+      q_log_prob[s] += inference.scale.get(z, 1.0) * q_log_probs[s][z]
 
     if inference.model_wrapper is None:
       # Form dictionary in order to replace conditioning on prior or
@@ -577,12 +748,16 @@ def build_score_loss_entropy(inference):
 
       for z in six.iterkeys(inference.latent_vars):
         z_copy = copy(z, dict_swap, scope='inference_' + str(s))
-        p_log_prob[s] += tf.reduce_sum(z_copy.log_prob(z_sample[z]))
+        p_log_probs[s][z] = inference.scale.get(z, 1.0) * tf.reduce_sum(
+            z_copy.log_prob(z_sample[z]))
+        p_log_prob[s] += p_log_probs[s][z]
 
       for x, obs in six.iteritems(inference.data):
         if isinstance(x, RandomVariable):
           x_copy = copy(x, dict_swap, scope='inference_' + str(s))
-          p_log_prob[s] += tf.reduce_sum(x_copy.log_prob(obs))
+          p_log_probs[s][x] = inference.scale.get(x, 1.0) * tf.reduce_sum(
+              x_copy.log_prob(obs))
+          p_log_prob[s] += p_log_probs[s][x]
     else:
       x = inference.data
       p_log_prob[s] = inference.model_wrapper.log_prob(x, z_sample)
@@ -590,9 +765,300 @@ def build_score_loss_entropy(inference):
   p_log_prob = tf.pack(p_log_prob)
   q_log_prob = tf.pack(q_log_prob)
 
-  q_entropy = tf.reduce_sum([qz.entropy()
-                             for qz in six.itervalues(inference.latent_vars)])
+  q_entropy = tf.reduce_sum([
+      inference.scale.get(z, 1.0) * tf.reduce_sum(qz.entropy())
+      for z, qz in six.iteritems(inference.latent_vars)])
 
   inference.loss = -(tf.reduce_mean(p_log_prob) + q_entropy)
-  return -(tf.reduce_mean(q_log_prob * tf.stop_gradient(p_log_prob)) +
-           q_entropy)
+  if inference.model_wrapper is None:
+    q_log_prob, p_log_prob = build_rao_blackwellized_signals(
+        inference, q_log_probs, p_log_probs, [])
+  else:
+    q_log_prob = tf.pack([tf.add_n(list(six.itervalues(q_log_probs[s])))
+                          for s in range(inference.n_samples)])
+
+  return build_score_gradients(inference, q_log_prob, p_log_prob, var_list,
+                               -q_entropy)
+
+
+def build_score_gradients(inference, q_log_prob, learning_signal, var_list,
+                          loss=0.0):
+  """Build a loss function and score function gradients,
+
+  .. math::
+
+    - 1/S \sum_{s=1}^S \partial_{\lambda} \log q(z_s; \lambda)
+      (f(z_s) - b_s - a) + \partial_{\lambda} L(\lambda),
+
+  for samples :math:`z_s \sim q(z; \lambda)`, learning signal
+  :math:`f`, baseline :math:`b_s`, and additional loss :math:`L`.
+  The baseline is set by ``inference.baseline``: none, an exponential
+  moving average of the mean learning signal with rate
+  ``inference.decay``, or the mean learning signal of the other
+  samples (leave-one-out). It does not depend on :math:`z_s`, so the
+  estimator stays unbiased.
+
+  If ``inference.control_variate``, the score function
+  :math:`\partial_{\lambda} \log q(z_s; \lambda)`, which has mean
+  zero, is a control variate, with scaling :math:`a` for each
+  variational parameter set to the sample estimate of its optimal
+  value (Ranganath et al., 2014),
+
+  .. math::
+
+    a = Cov(h (f - b), h) / Var(h),
+    \quad h = \partial_{\lambda} \log q(z; \lambda).
+
+  Parameters
+  ----------
+  inference : VariationalInference
+    Inference with attributes ``baseline``, ``control_variate``, and
+    ``decay``.
+  q_log_prob : tf.Tensor or list of tf.Tensor
+    Vector of log densities of the samples under the variational
+    model, with stopped gradients through the samples. If list, a
+    vector for each factor of the variational model; the gradient is
+    the sum of each factor's gradient, with its own learning signal,
+    baseline, and control variate.
+  learning_signal : tf.Tensor or list of tf.Tensor
+    Vector of the learning signal of each sample, or a list of
+    vectors, one for each factor.
+  var_list : list of tf.Variable
+    Variables to compute gradients with respect to.
+  loss : tf.Tensor or float, optional
+    Additional loss whose gradient is computed by automatic
+    differentiation, e.g., an analytic KL term.
+
+  Returns
+  -------
+  tf.Tensor
+    Loss function, whose automatic differentiation is the score
+    function gradient without control variates.
+  list of tuple
+    Pairs of gradients and variables.
+  """
+  if not isinstance(q_log_prob, list):
+    q_log_prob = [q_log_prob]
+    learning_signal = [learning_signal]
+
+  signals = []
+  update_ops = []
+  for signal in learning_signal:
+    signal = tf.stop_gradient(signal)
+    if inference.baseline == 'moving_average':
+      moving_average = tf.Variable(0.0, trainable=False)
+      baseline = tf.identity(moving_average)
+      with tf.control_dependencies([baseline]):
+        update_ops.append(moving_average.assign(
+            inference.decay * moving_average +
+            (1.0 - inference.decay) * tf.reduce_mean(signal)))
+
+      signal -= baseline
+    elif inference.baseline == 'leave_one_out':
+      signal -= (tf.reduce_sum(signal) - signal) / (inference.n_samples - 1.0)
+
+    signals.append(signal)
+
+  surrogate_loss = loss - tf.add_n(
+      [tf.reduce_mean(q_log_prob_i * signal)
+       for q_log_prob_i, signal in zip(q_log_prob, signals)])
+  if not inference.control_variate:
+    grads = tf.gradients(surrogate_loss, var_list)
+  else:
+    if isinstance(loss, tf.Tensor):
+      grads = tf.gradients(loss, var_list)
+    else:
+      grads = [None] * len(var_list)
+
+    for q_log_prob_i, signal in zip(q_log_prob, signals):
+      # Score function of each sample and each variational parameter.
+      scores = [tf.gradients(q_log_prob_i[s], var_list)
+                for s in range(inference.n_samples)]
+      for j in range(len(var_list)):
+        if scores[0][j] is None:
+          continue
+
+        h = tf.pack([tf.convert_to_tensor(score[j]) for score in scores])
+        h_signal = h * tf.reshape(
+            signal, [inference.n_samples] + [1] * (len(h.get_shape()) - 1))
+        h_centered = h - tf.reduce_mean(h, 0)
+        cov = tf.reduce_sum((h_signal - tf.reduce_mean(h_signal, 0)) *
+                            h_centered, 0)
+        var = tf.reduce_sum(tf.square(h_centered), 0)
+        # Parameters whose score function has no variance across
+        # samples have zero scaling.
+        a = cov / tf.select(var > 0.0, var, tf.ones_like(var))
+        grad = -tf.reduce_mean(h_signal - h * a, 0)
+        if grads[j] is None:
+          grads[j] = grad
+        else:
+          grads[j] = tf.convert_to_tensor(grads[j]) + grad
+
+  if update_ops:
+    with tf.control_dependencies(update_ops):
+      for j, grad in enumerate(grads):
+        if isinstance(grad, tf.IndexedSlices):
+          grads[j] = tf.IndexedSlices(tf.identity(grad.values), grad.indices,
+                                      grad.dense_shape)
+        elif grad is not None:
+          grads[j] = tf.identity(grad)
+
+  return surrogate_loss, list(zip(grads, var_list))
+
+
+def build_natural_gradients(inference, grads_and_vars):
+  """Precondition gradients of normal variational factors by their
+  inverse Fisher information (Amari, 1998; Hoffman et al., 2013).
+
+  The Fisher information of :math:`\mathcal{N}(\mu, \sigma^2)` is
+  diagonal, with :math:`1/\sigma^2` for :math:`\mu` and
+  :math:`2/\sigma^2` for :math:`\sigma`. For a variable
+  :math:`v` that maps elementwise to a parameter :math:`\theta`,
+  e.g., :math:`\sigma = \text{softplus}(v)`, it is
+  :math:`F_\theta (\partial \theta / \partial v)^2` by the chain rule;
+  it is summed over the parameters that depend on :math:`v`. The
+  natural gradient divides the gradient of :math:`v` by it, which
+  needs no more evaluations of the model. The Fisher information is
+  floored at 1e-3 times its mean over the variable, so that elements
+  where the parameter saturates, e.g., the softplus of a large
+  negative value, are not amplified without bound.
+
+  Variables of other variational factors, or whose shape is not that
+  of the factor's parameters, such as weights of inference networks,
+  keep their gradients.
+
+  Parameters
+  ----------
+  inference : VariationalInference
+    Inference whose ``Normal`` and ``MultivariateNormalDiag``
+    variational factors are preconditioned.
+  grads_and_vars : list of tuple
+    Pairs of gradients and variables.
+
+  Returns
+  -------
+  list of tuple
+    Pairs of natural gradients and variables.
+  """
+  var_list = [var for _, var in grads_and_vars]
+  fishers = {}
+  excluded = set()
+  for qz in six.itervalues(inference.latent_vars):
+    if isinstance(qz, Normal):
+      mu = qz.mu
+      sigma = qz.sigma
+    elif isinstance(qz, MultivariateNormalDiag):
+      mu = qz.mu
+      sigma = tf.sqrt(tf.matrix_diag_part(qz.sigma))
+    else:
+      continue
+
+    # Standard deviation, broadcast to the batch shape of q(z).
+    sigma_batch = sigma * tf.ones_like(mu * sigma)
+    shape = sigma_batch.get_shape().as_list()
+    for param, fisher in [(mu, 1.0 / tf.square(sigma_batch)),
+                          (sigma, 2.0 / tf.square(sigma_batch))]:
+      for i, derivative in enumerate(tf.gradients(param, var_list)):
+        if derivative is None:
+          continue
+
+        if isinstance(derivative, tf.IndexedSlices) or \
+           var_list[i].get_shape().as_list() != shape:
+          excluded.add(i)
+          continue
+
+        fishers[i] = fishers.get(i, 0.0) + fisher * tf.square(derivative)
+
+  natural_grads_and_vars = []
+  for i, (grad, var) in enumerate(grads_and_vars):
+    if grad is not None and i in fishers and i not in excluded:
+      # Damp the Fisher information where the parameter saturates,
+      # relative to its other elements.
+      fisher = fishers[i]
+      floor = tf.maximum(1e-3 * tf.reduce_mean(fisher), 1e-8)
+      grad = tf.convert_to_tensor(grad) / tf.maximum(fisher, floor)
+
+    natural_grads_and_vars.append((grad, var))
+
+  return natural_grads_and_vars
+
+
+def build_rao_blackwellized_signals(inference, q_log_probs, p_log_probs,
+                                    mc_vars, kl_vars=None):
+  """Build the score function and learning signal of each factor of the
+  variational model, for Rao-Blackwellized score function gradients
+  (Ranganath et al., 2014).
+
+  The gradient with respect to the parameters of :math:`q(z_i)` only
+  needs the terms of the log joint density which depend on
+  :math:`z_i`, i.e., the log densities of :math:`z_i` and its
+  children, whose parents are its Markov blanket. The other terms are
+  independent of :math:`z_i` under a factorized variational model, so
+  they only add noise. Each factor's gradient is then
+
+  .. math::
+
+    E_{q} [ \partial_{\lambda} \log q(z_i; \lambda)
+      ( \log p_i(x, z) - \log q(z_i; \lambda) ) ],
+
+  where :math:`\log p_i` sums the log densities of :math:`z_i` and
+  its children.
+
+  Parameters
+  ----------
+  inference : VariationalInference
+    Inference over Edward's native modeling language.
+  q_log_probs : list of dict
+    For each sample, a dictionary binding each latent variable to the
+    log density of its sample under its variational factor, without
+    its scale.
+  p_log_probs : list of dict
+    For each sample, a dictionary binding latent and observed
+    variables to their log density under the model, or latent
+    variables whose KL divergence is analytic to its negative.
+    Variables without either are skipped.
+  mc_vars : list of RandomVariable
+    Latent variables whose learning signal includes the negative log
+    density of their factor, i.e., whose entropy is estimated by
+    Monte Carlo.
+  kl_vars : list of RandomVariable, optional
+    Latent variables whose KL divergence is analytic. It is
+    differentiated directly with respect to the parameters of their
+    own factor, so it is only part of the learning signals of their
+    parents, through which their prior depends on other factors.
+
+  Returns
+  -------
+  list of tf.Tensor
+    Vector of log densities of the samples under each factor.
+  list of tf.Tensor
+    Vector of learning signals of the samples for each factor.
+  """
+  if kl_vars is None:
+    kl_vars = []
+
+  collection = list(six.iterkeys(inference.latent_vars)) + \
+      [x for x in six.iterkeys(inference.data)
+       if isinstance(x, RandomVariable)]
+
+  q_log_prob = []
+  learning_signal = []
+  for z in six.iterkeys(inference.latent_vars):
+    factors = get_children(z, collection)
+    if z not in kl_vars:
+      factors = [z] + factors
+
+    signal = [0.0] * inference.n_samples
+    for s in range(inference.n_samples):
+      for rv in factors:
+        if rv in p_log_probs[s]:
+          signal[s] += p_log_probs[s][rv]
+
+      if z in mc_vars:
+        signal[s] -= inference.scale.get(z, 1.0) * q_log_probs[s][z]
+
+    q_log_prob.append(tf.pack([q_log_probs[s][z]
+                               for s in range(inference.n_samples)]))
+    learning_signal.append(tf.pack(signal))
+
+  return q_log_prob, learning_signal
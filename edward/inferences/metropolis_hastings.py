@@ -7,7 +7,7 @@ import tensorflow as tf
 
 from edward.inferences.monte_carlo import MonteCarlo
 from edward.models import RandomVariable, Uniform
-from edward.util import copy
+from edward.util import copy, get_children
 
 
 class MetropolisHastings(MonteCarlo):
@@ -39,22 +39,60 @@ class MetropolisHastings(MonteCarlo):
     self.proposal_vars = proposal_vars
     super(MetropolisHastings, self).__init__(latent_vars, data, model_wrapper)
 
+  def initialize(self, blocks=None, *args, **kwargs):
+    """
+    Parameters
+    ----------
+    blocks : list of list of RandomVariable, optional
+      Partition of the latent variables into blocks for
+      component-wise Metropolis-within-Gibbs. Each iteration proposes
+      only the latent variables of one block, cycling through the
+      blocks. Its acceptance ratio only has the log density terms of
+      the block and of its children, which are found from the graph.
+      Default is to propose all latent variables jointly.
+
+    Examples
+    --------
+    >>> inference.initialize(blocks=[[mu], [sigma], [z]])
+    """
+    if blocks is not None:
+      if self.model_wrapper is not None:
+        raise NotImplementedError("blocks is not supported for model "
+                                  "wrappers.")
+
+      for block in blocks:
+        for z in block:
+          if z not in self.proposal_vars:
+            raise ValueError("Block variables must have a proposal: " +
+                             str(z))
+
+    self.blocks = blocks
+    self.scope_iter = 0  # a convenient counter for log joint calculations
+    # Log joint density of the current state, log p(x, zold), which
+    # was computed when the state was accepted.
+    self.current_log_joint = tf.Variable(0.0, trainable=False)
+    return super(MetropolisHastings, self).initialize(*args, **kwargs)
+
   def build_update(self):
     """
     Draw sample from proposal conditional on last sample. Then accept
     or reject the sample based on the ratio,
 
     ratio = log p(x, znew) - log p(x, zold) +
-            log g(znew | zold) - log g(zold | znew)
-          = sum_z [ log p(znew) - log p(zold) +
-                    log g(znew | zold) - log g(zold | znew) ] +
-            sum_x [ log p(x | znew) - sum_x log p(x | zold) ]
-          = sum_z [ log g(znew | zold) - log p(zold) ] +
-            sum_z [ log p(znew) - log g(zold | znew) ] +
-            sum_x [ log p(x | znew) - sum_x log p(x | zold) ]
+            log g(zold | znew) - log g(znew | zold)
+
+    If the data is the same across iterations, the log joint of the
+    current state, log p(x, zold), is cached across iterations: it is
+    computed only at the first iteration, and it is set to
+    log p(x, znew) on acceptance. Thus the likelihood is evaluated
+    once per iteration. With ``n_minibatch`` or data bound to
+    tensors, e.g., placeholders fed at each iteration, it is
+    recomputed at every iteration.
     """
-    old_sample = {z: tf.gather(qz.params, tf.maximum(self.t - 1, 0))
-                  for z, qz in six.iteritems(self.latent_vars)}
+    old_sample = self._read_sample()
+
+    if self.blocks is not None:
+      return self._build_block_update(old_sample)
 
     # Draw proposed sample and calculate acceptance ratio.
     new_sample = {}
@@ -62,39 +100,27 @@ class MetropolisHastings(MonteCarlo):
     for z, proposal_z in six.iteritems(self.proposal_vars):
       # Build proposal g(znew | zold).
       proposal_znew = copy(proposal_z, old_sample, scope='proposal_znew')
-      # Build prior p(zold).
-      zold = copy(z, old_sample, scope='zold')
       # Sample znew ~ g(znew | zold).
-      new_sample[z] = proposal_z.sample()
+      new_sample[z] = proposal_znew.value()
       # Increment ratio.
-      ratio += tf.reduce_sum(proposal_znew.log_prob(new_sample[z]))
-      if self.model_wrapper is None:
-        ratio -= tf.reduce_sum(zold.log_prob(old_sample[z]))
+      ratio -= tf.reduce_sum(proposal_znew.log_prob(new_sample[z]))
 
     for z, proposal_z in six.iteritems(self.proposal_vars):
-      # Build proposal p(zold | znew).
+      # Build proposal g(zold | znew).
       proposal_zold = copy(proposal_z, new_sample, scope='proposal_zold')
-      # Build prior p(znew).
-      znew = copy(z, new_sample, scope='znew')
       # Increment ratio.
-      ratio -= tf.reduce_sum(proposal_zold.log_prob(old_sample[z]))
-      if self.model_wrapper is None:
-        ratio += tf.reduce_sum(znew.log_prob(new_sample[z]))
-
-    if self.model_wrapper is None:
-      for x, obs in six.iteritems(self.data):
-        if isinstance(x, RandomVariable):
-          # Build likelihood p(x | znew).
-          x_znew = copy(x, new_sample, scope='x_znew')
-          # Build likelihood p(x | zold).
-          x_zold = copy(x, old_sample, scope='x_zold')
-          # Increment ratio.
-          ratio += tf.reduce_sum(x_znew.log_prob(obs))
-          ratio -= tf.reduce_sum(x_zold.log_prob(obs))
+      ratio += tf.reduce_sum(proposal_zold.log_prob(old_sample[z]))
+
+    new_log_joint = self.log_joint(new_sample)
+    if self._fixed_data():
+      old_log_joint = tf.cond(tf.equal(self.t, 0),
+                              lambda: self.log_joint(old_sample),
+                              lambda: tf.identity(self.current_log_joint))
     else:
-        x = self.data
-        ratio += self.model_wrapper.log_prob(x, new_sample)
-        ratio -= self.model_wrapper.log_prob(x, old_sample)
+      old_log_joint = self.log_joint(old_sample)
+
+    ratio += new_log_joint
+    ratio -= old_log_joint
 
     # Accept or reject sample.
     u = Uniform().sample()
@@ -109,13 +135,102 @@ class MetropolisHastings(MonteCarlo):
               zip(six.iterkeys(new_sample), sample_values)}
 
     # Update Empirical random variables.
-    assign_ops = []
-    variables = {x.name: x for x in
-                 tf.get_default_graph().get_collection(tf.GraphKeys.VARIABLES)}
-    for z, qz in six.iteritems(self.latent_vars):
-      variable = variables[qz.params.op.inputs[0].op.inputs[0].name]
-      assign_ops.append(tf.scatter_update(variable, self.t, sample[z]))
+    assign_ops = self._write_sample(sample)
+
+    # Update log joint of the current state.
+    assign_ops.append(self.current_log_joint.assign(
+        tf.select(accept, new_log_joint, old_log_joint)))
 
     # Increment n_accept (if accepted).
     assign_ops.append(self.n_accept.assign_add(tf.select(accept, 1, 0)))
     return tf.group(*assign_ops)
+
+  def _fixed_data(self):
+    """Whether the data is the same across iterations, i.e., there is
+    no ``n_minibatch`` and no data is bound to tensors, which may be
+    fed or read anew at each iteration."""
+    if self.n_minibatch is not None:
+      return False
+
+    return not any(isinstance(value, tf.Tensor)
+                   for key, value in six.iteritems(self.data)
+                   if not isinstance(key, tf.Tensor))
+
+  def _build_block_update(self, old_sample):
+    """Build update for component-wise Metropolis-within-Gibbs.
+
+    Iteration t updates block t mod B. Each block's update is a
+    branch of ``tf.cond``, so only its log density terms are
+    evaluated: those of its latent variables and of their children
+    among the latent and observed variables.
+    """
+    keys = list(six.iterkeys(old_sample))
+    rvs = keys + [x for x in six.iterkeys(self.data)
+                  if isinstance(x, RandomVariable)]
+
+    def _log_prob(rv, z_sample, scope):
+      rv_copy = copy(rv, z_sample, scope=scope)
+      if rv in self.data:
+        value = self.data[rv]
+      else:
+        value = z_sample[rv]
+
+      return tf.reduce_sum(rv_copy.log_prob(value))
+
+    def _update(k):
+      block = self.blocks[k]
+      terms = list(block)
+      for z in block:
+        for child in get_children(z, rvs):
+          if child not in terms:
+            terms.append(child)
+
+      def _fn():
+        scope = 'block' + str(k)
+        new_sample = old_sample.copy()
+        ratio = 0.0
+        for z in block:
+          proposal_znew = copy(self.proposal_vars[z], old_sample,
+                               scope=scope + '_proposal_znew')
+          new_sample[z] = proposal_znew.value()
+          ratio -= tf.reduce_sum(proposal_znew.log_prob(new_sample[z]))
+
+        for z in block:
+          proposal_zold = copy(self.proposal_vars[z], new_sample,
+                               scope=scope + '_proposal_zold')
+          ratio += tf.reduce_sum(proposal_zold.log_prob(old_sample[z]))
+
+        for rv in terms:
+          ratio += _log_prob(rv, new_sample, scope + '_new')
+          ratio -= _log_prob(rv, old_sample, scope + '_old')
+
+        u = Uniform().sample()
+        accept = tf.log(u) < ratio
+        sample_values = tf.cond(accept,
+                                lambda: [new_sample[z] for z in keys],
+                                lambda: [old_sample[z] for z in keys])
+        if not isinstance(sample_values, list):
+          # ``tf.cond`` returns tf.Tensor if output is a list of size 1.
+          sample_values = [sample_values]
+
+        return sample_values + [tf.select(accept, 1, 0)]
+
+      return _fn
+
+    def _cycle(k):
+      if k == len(self.blocks) - 1:
+        return _update(k)()
+      else:
+        return tf.cond(tf.equal(block_idx, k), _update(k),
+                       lambda: _cycle(k + 1))
+
+    block_idx = tf.mod(self.t, len(self.blocks))
+    values = _cycle(0)
+    sample_values, accept = values[:-1], values[-1]
+
+    # Update Empirical random variables.
+    assign_ops = self._write_sample(dict(zip(keys, sample_values)))
+
+    # Increment n_accept (if accepted).
+    assign_ops.append(self.n_accept.assign_add(accept))
+    return tf.group(*assign_ops)
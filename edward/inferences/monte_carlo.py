@@ -5,7 +5,9 @@ from __future__ import print_function
 import numpy as np
 import six
 import tensorflow as tf
+import time
 
+from edward.criticisms.diagnostics import effective_sample_size
 from edward.inferences.inference import Inference
 from edward.models import Empirical, RandomVariable
 from edward.util import get_session
@@ -72,7 +74,8 @@ class MonteCarlo(Inference):
     Notes
     -----
     The number of Monte Carlo iterations is set according to the
-    minimum of all Empirical sizes.
+    minimum of all Empirical sizes, unless the Empirical random
+    variables are used as ring buffers (see ``initialize``).
 
     Initialization is assumed from params[0, :]. This generalizes
     initializing randomly and initializing from user input. Updates
@@ -100,12 +103,68 @@ class MonteCarlo(Inference):
     super(MonteCarlo, self).__init__(latent_vars, data, model_wrapper)
 
   def initialize(self, *args, **kwargs):
-    min_t = np.amin([qz.n for qz in six.itervalues(self.latent_vars)])
-    kwargs['n_iter'] = min_t
+    """Initialize Monte Carlo algorithm.
+
+    Positional arguments are passed to ``Inference.initialize``, as
+    are keyword arguments other than the following keyword-only
+    arguments.
+
+    Parameters
+    ----------
+    n_diagnose : int, optional
+      Number of iterations between each computation of the effective
+      sample size over the samples drawn so far, once there are at
+      least 4. Default is to never compute it during inference.
+    target_ess : float, optional
+      Stop sampling once the effective sample size of every dimension
+      of every latent variable reaches this value. It is checked every
+      ``n_diagnose`` iterations.
+    ring_buffer : bool, optional
+      Whether to store samples in each Empirical random variable as a
+      ring buffer. Iteration t writes to row t mod n, so only the last
+      n samples are kept, and the number of iterations is not capped
+      by n. It is ``n_iter`` if specified; otherwise it is unbounded
+      if ``time_budget`` is specified, or the default of ``Inference``.
+    time_budget : float, optional
+      Stop sampling once this many seconds of wall-clock time have
+      passed since the first update.
+
+    Examples
+    --------
+    Sample for at most 30 seconds, keeping the last 1000 samples and
+    stopping early if they have an effective sample size of 200:
+
+    >>> qz = Empirical(tf.Variable(tf.zeros(1000)))
+    >>> inference = ed.HMC({z: qz}, data)
+    >>> inference.run(ring_buffer=True, time_budget=30.0,
+    ...               n_diagnose=100, target_ess=200)
+    """
+    n_diagnose = kwargs.pop('n_diagnose', None)
+    target_ess = kwargs.pop('target_ess', None)
+    ring_buffer = kwargs.pop('ring_buffer', False)
+    time_budget = kwargs.pop('time_budget', None)
+    if ring_buffer:
+      if time_budget is not None and 'n_iter' not in kwargs:
+        kwargs['n_iter'] = np.iinfo(np.int32).max
+    else:
+      min_t = np.amin([qz.n for qz in six.itervalues(self.latent_vars)])
+      kwargs['n_iter'] = min_t
+
     super(MonteCarlo, self).initialize(*args, **kwargs)
 
+    if target_ess is not None and n_diagnose is None:
+      raise ValueError("target_ess requires n_diagnose to be specified.")
+
+    self.n_diagnose = n_diagnose
+    self.target_ess = target_ess
+    self.ring_buffer = ring_buffer
+    self.time_budget = time_budget
+    self.start_time = None
     self.n_accept = tf.Variable(0, trainable=False)
     self.train = self.build_update()
+    if n_diagnose is not None:
+      self.ess = [effective_sample_size(self._filled_samples(qz))
+                  for qz in six.itervalues(self.latent_vars)]
 
   def update(self, feed_dict=None):
     """Run one iteration of sampling for Monte Carlo.
@@ -121,6 +180,8 @@ class MonteCarlo(Inference):
     dict
       Dictionary of algorithm-specific information. In this case, the
       acceptance rate of samples since (and including) this iteration.
+      Every ``n_diagnose`` iterations, it also has the minimum
+      effective sample size across all dimensions.
 
     Notes
     -----
@@ -136,10 +197,29 @@ class MonteCarlo(Inference):
       if isinstance(key, tf.Tensor):
         feed_dict[key] = value
 
+    if self.start_time is None:
+      self.start_time = time.time()
+
     sess = get_session()
     _, accept_rate = sess.run([self.train, self.n_accept / self.t], feed_dict)
     t = sess.run(self.increment_t)
-    return {'t': t, 'accept_rate': accept_rate}
+    info_dict = {'t': t, 'accept_rate': accept_rate}
+
+    # The effective sample size needs a few samples for its
+    # autocovariance estimates to be defined.
+    if self.n_diagnose is not None and t % self.n_diagnose == 0 and \
+       self._n_filled(t) >= 4:
+      ess = np.amin([np.amin(value)
+                     for value in sess.run(self.ess, feed_dict)])
+      info_dict['ess'] = ess
+      if self.target_ess is not None and ess >= self.target_ess:
+        info_dict['stop'] = True
+
+    if self.time_budget is not None and \
+       time.time() - self.start_time >= self.time_budget:
+      info_dict['stop'] = True
+
+    return info_dict
 
   def print_progress(self, info_dict):
     """Print progress to output.
@@ -151,8 +231,101 @@ class MonteCarlo(Inference):
         string = 'Iteration {0}'.format(str(t).rjust(len(str(self.n_iter))))
         string += ' [{0}%]'.format(str(int(t / self.n_iter * 100)).rjust(3))
         string += ': Acceptance Rate = {0:.2f}'.format(accept_rate)
+        if 'ess' in info_dict:
+          string += ', Min ESS = {0:.1f}'.format(info_dict['ess'])
         print(string)
 
+  def _n_filled(self, t):
+    """Number of samples stored in every Empirical random variable
+    after ``t`` iterations."""
+    n = np.amin([qz.n for qz in six.itervalues(self.latent_vars)])
+    if self.ring_buffer:
+      return min(t, n)
+    else:
+      return t
+
+  def _filled_samples(self, qz, n_written=None):
+    """Rows of the Empirical's parameters written so far, in the order
+    they were written.
+
+    Parameters
+    ----------
+    qz : Empirical
+      Empirical random variable.
+    n_written : tf.Tensor, optional
+      Number of rows written so far. Default is the number of
+      iterations.
+    """
+    if n_written is None:
+      n_written = self.t
+
+    if self.ring_buffer:
+      n_filled = tf.minimum(n_written, qz.n)
+      return qz.gather(tf.mod(n_written - n_filled + tf.range(n_filled),
+                              qz.n))
+
+    rank = len(qz.params.get_shape())
+    size = tf.concat(0, [tf.expand_dims(n_written, 0),
+                         tf.constant([-1] * (rank - 1), dtype=tf.int32)])
+    return qz.decompress(
+        tf.slice(qz.params, tf.zeros([rank], dtype=tf.int32), size))
+
+  def _read_sample(self):
+    """Sample of the last iteration from the Empirical random
+    variables, or their first row at the first iteration."""
+    t = tf.maximum(self.t - 1, 0)
+    return {z: qz.gather(self._row(qz, t))
+            for z, qz in six.iteritems(self.latent_vars)}
+
+  def _row(self, qz, t):
+    """Row of the Empirical's parameters that stores iteration t."""
+    if self.ring_buffer:
+      return tf.mod(t, qz.n)
+    else:
+      return t
+
+  def _write_sample(self, sample, t=None):
+    """Build ops that write sample to the Empirical random variables.
+
+    Parameters
+    ----------
+    sample : dict
+      Latent variable keys to samples. Only these latent variables are
+      written.
+    t : tf.Tensor or int, optional
+      Iteration of the sample, or vector of iterations of samples
+      stacked along the outer dimension. Default is the current
+      iteration.
+
+    Returns
+    -------
+    list of tf.Operation
+      Assign ops.
+
+    Notes
+    -----
+    The updates assume each Empirical random variable is directly
+    parameterized by tf.Variables(). Samples are compressed to the
+    type of the Empirical's parameters, and its count of written rows
+    is updated.
+    """
+    if t is None:
+      t = self.t
+
+    variables = {x.name: x for x in
+                 tf.get_default_graph().get_collection(tf.GraphKeys.VARIABLES)}
+    assign_ops = []
+    for z, sample_z in six.iteritems(sample):
+      qz = self.latent_vars[z]
+      variable = variables[qz.params.op.inputs[0].op.inputs[0].name]
+      assign_ops.append(tf.scatter_update(variable, self._row(qz, t),
+                                          qz.compress(sample_z)))
+      if isinstance(qz.n_filled, tf.Variable):
+        assign_ops.append(qz.n_filled.assign(
+            tf.minimum(tf.reduce_max(t) + 1, qz.n)))
+
+    return assign_ops
+
   def build_update(self):
     """Build update, which returns an assign op for parameters in
     the Empirical random variables.
@@ -0,0 +1,336 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import six
+import tensorflow as tf
+
+from edward.inferences.hmc import HMC
+from edward.util import get_session
+
+
+class NUTS(HMC):
+  """No-U-Turn Sampler (Hoffman and Gelman, 2014).
+
+  It extends Hamiltonian Monte Carlo by choosing the trajectory length
+  adaptively: the trajectory is doubled, forwards or backwards in
+  time, until it makes a U-turn. A sample is drawn from all states
+  of the trajectory with weights proportional to their density
+  (Betancourt, 2017).
+
+  The tree doubling is expressed in graph control flow, so a single
+  session run draws one sample, and the graph size does not depend on
+  the tree depth. Warm-up and the mass matrix are those of ``HMC``;
+  the step size is adapted to the mean acceptance probability of the
+  states of the trajectory.
+  """
+  def __init__(self, latent_vars, data=None, model_wrapper=None):
+    """
+    Examples
+    --------
+    >>> z = Normal(mu=0.0, sigma=1.0)
+    >>> x = Normal(mu=tf.ones(10) * z, sigma=1.0)
+    >>>
+    >>> qz = Empirical(tf.Variable(tf.zeros([500])))
+    >>> data = {x: np.array([0.0] * 10, dtype=np.float32)}
+    >>> inference = ed.NUTS({z: qz}, data)
+    """
+    super(NUTS, self).__init__(latent_vars, data, model_wrapper)
+
+  def initialize(self, step_size=0.25, max_tree_depth=10,
+                 max_energy_error=1000.0, n_warmup=0, target_accept=0.8,
+                 mass_matrix='diagonal', *args, **kwargs):
+    """
+    Parameters
+    ----------
+    step_size : float, optional
+      Step size of numerical integrator. With warm-up, it is the
+      initial step size for adaptation.
+    max_tree_depth : int, optional
+      Maximum number of doublings of the trajectory. Each iteration
+      takes at most ``2**max_tree_depth - 1`` leapfrog steps.
+    max_energy_error : float, optional
+      Increase in the Hamiltonian above which a trajectory is
+      considered divergent and building it stops.
+    n_warmup : int, optional
+      Number of warm-up iterations. See ``HMC.initialize``.
+    target_accept : float, optional
+      Target acceptance probability of step size adaptation.
+    mass_matrix : str, optional
+      Form of the mass matrix adapted during warm-up. See
+      ``HMC.initialize``.
+    """
+    self.max_tree_depth = max_tree_depth
+    self.max_energy_error = max_energy_error
+    self.tree_depth = tf.Variable(0, trainable=False)
+    self.n_divergent = tf.Variable(0, trainable=False)
+    return super(NUTS, self).initialize(
+        step_size, 1, n_warmup, target_accept, mass_matrix, *args, **kwargs)
+
+  def update(self, feed_dict=None):
+    """Run one iteration of sampling, preceded by warm-up on the
+    first call.
+
+    Returns
+    -------
+    dict
+      Dictionary of algorithm-specific information. In addition to
+      the acceptance rate, it has the tree depth of this iteration
+      and the number of divergent iterations so far.
+    """
+    info_dict = super(NUTS, self).update(feed_dict)
+    sess = get_session()
+    tree_depth, n_divergent = sess.run([self.tree_depth, self.n_divergent])
+    info_dict['tree_depth'] = tree_depth
+    info_dict['n_divergent'] = n_divergent
+    return info_dict
+
+  def build_update(self):
+    """
+    Build a balanced binary tree of leapfrog steps by repeated
+    doubling. Each doubling picks a direction at random and builds a
+    new subtree of the same size, one leaf at a time, in an inner
+    ``tf.while_loop``. Building stops when the subtree or the whole
+    trajectory makes a U-turn, when the Hamiltonian diverges, or at
+    the maximum tree depth.
+
+    U-turns within every sub-subtree of the new subtree are checked
+    using checkpoints of the leftmost leaf of each sub-subtree, so
+    only ``max_tree_depth`` states are held in memory. They compare
+    displacements with velocities, i.e., momenta multiplied by the
+    inverse mass matrix.
+
+    The same transition also builds the warm-up ops of ``HMC``, with
+    the mean acceptance probability of all states built as the
+    adaptation statistic (Hoffman and Gelman, 2014, Algorithm 6).
+    """
+    keys = list(six.iterkeys(self.latent_vars))
+    n_vars = len(keys)
+    max_depth = self.max_tree_depth
+
+    old_sample = self._read_sample()
+    z0 = [old_sample[z] for z in keys]
+    r0 = []
+    for z in keys:
+      eps = tf.random_normal(self.latent_vars[z].get_event_shape())
+      r0.append(self._momentum(z, eps))
+
+    log_joint0, grad0 = self._log_joint_and_grad(keys, z0)
+
+    def _kinetic(r_list):
+      return tf.reduce_sum([self._kinetic(key, r)
+                            for key, r in zip(keys, r_list)])
+
+    def _velocity(r_list):
+      return [self._velocity(key, r) for key, r in zip(keys, r_list)]
+
+    energy0 = -log_joint0 + _kinetic(r0)
+
+    def _leapfrog(z_list, r_list, grad_list, step_size):
+      r_list = [r + 0.5 * step_size * grad
+                for r, grad in zip(r_list, grad_list)]
+      z_list = [z + step_size * v for z, v in zip(z_list, _velocity(r_list))]
+      log_joint, grad_list = self._log_joint_and_grad(keys, z_list)
+      r_list = [r + 0.5 * step_size * grad
+                for r, grad in zip(r_list, grad_list)]
+      return z_list, r_list, grad_list, log_joint
+
+    def _subtree_cond(n, n_leaves, *args):
+      turning, divergent = args[-2:]
+      return tf.logical_and(
+          n < n_leaves,
+          tf.logical_not(tf.logical_or(turning, divergent)))
+
+    def _subtree_body(n, n_leaves, direction, *args):
+      """Add one leaf to the subtree."""
+      z, r, grad, prop, z_ckpt, v_ckpt = _unflatten(args[:6 * n_vars], 6)
+      prop_log_joint, log_sum_w, sum_alpha, n_alpha, turning, divergent = \
+          args[6 * n_vars:]
+
+      z, r, grad, log_joint = _leapfrog(z, r, grad,
+                                        direction * self.step_size)
+      energy = -log_joint + _kinetic(r)
+      log_w = energy0 - energy
+      divergent = tf.logical_not(
+          energy - energy0 <= self.max_energy_error)
+      sum_alpha += tf.select(tf.is_nan(log_w), 0.0,
+                             tf.minimum(1.0, tf.exp(log_w)))
+      n_alpha += 1.0
+
+      # Progressive sampling of the subtree's proposal.
+      new_log_sum_w = _log_add_exp(log_sum_w, log_w)
+      accept = tf.logical_and(
+          tf.logical_not(divergent),
+          tf.log(tf.random_uniform([])) < log_w - new_log_sum_w)
+      new = _select(accept, z + [log_joint], prop + [prop_log_joint])
+      prop, prop_log_joint = new[:-1], new[-1]
+      log_sum_w = tf.select(divergent, log_sum_w, new_log_sum_w)
+
+      # Leaf ``n`` closes the sub-subtrees starting at the checkpoints
+      # ``idx_min, ..., idx_max``; even leaves are stored as the
+      # checkpoint ``idx_max``, with their velocities.
+      idx_max, idx_min = _checkpoint_idxs(n, max_depth)
+      is_even = tf.equal(tf.mod(n, 2), 0)
+      store = tf.cast(tf.logical_and(
+          is_even, tf.equal(tf.range(max_depth), idx_max)), tf.float32)
+      v = _velocity(r)
+      z_ckpt = [_set_row(ckpt, store, x) for ckpt, x in zip(z_ckpt, z)]
+      v_ckpt = [_set_row(ckpt, store, x) for ckpt, x in zip(v_ckpt, v)]
+
+      in_range = tf.logical_and(tf.range(max_depth) >= idx_min,
+                                tf.range(max_depth) <= idx_max)
+      dz = [direction * (tf.expand_dims(x, 0) - ckpt)
+            for x, ckpt in zip(z, z_ckpt)]
+      dz_v_left = _batch_dot(dz, v_ckpt)
+      dz_v_right = _batch_dot(dz, [tf.expand_dims(x, 0) for x in v])
+      subtree_turning = tf.logical_and(
+          in_range, tf.logical_or(dz_v_left < 0.0, dz_v_right < 0.0))
+      turning = tf.logical_and(tf.logical_not(is_even),
+                               tf.reduce_any(subtree_turning))
+      return [n + 1, n_leaves, direction] + \
+          z + r + grad + prop + z_ckpt + v_ckpt + \
+          [prop_log_joint, log_sum_w, sum_alpha, n_alpha, turning,
+           divergent]
+
+    def _tree_cond(depth, *args):
+      turning, divergent = args[-3:-1]
+      return tf.logical_and(
+          depth < max_depth,
+          tf.logical_not(tf.logical_or(turning, divergent)))
+
+    def _tree_body(depth, *args):
+      """Double the tree in a random direction."""
+      z_left, r_left, grad_left, z_right, r_right, grad_right, prop = \
+          _unflatten(args[:7 * n_vars], 7)
+      prop_log_joint, log_sum_w, sum_alpha, n_alpha, turning, divergent, \
+          moved = args[7 * n_vars:]
+
+      forward = tf.random_uniform([]) < 0.5
+      direction = tf.select(forward, 1.0, -1.0)
+      edge = _select(forward, z_right + r_right + grad_right,
+                     z_left + r_left + grad_left)
+      z, r, grad = _unflatten(edge, 3)
+
+      n_leaves = tf.cast(tf.pow(2.0, tf.cast(depth, tf.float32)), tf.int32)
+      z_ckpt = [tf.zeros([max_depth] + x.get_shape().as_list()) for x in z]
+      v_ckpt = [tf.zeros([max_depth] + x.get_shape().as_list()) for x in z]
+      loop_vars = [tf.constant(0), n_leaves, direction] + \
+          z + r + grad + z + z_ckpt + v_ckpt + \
+          [tf.zeros([]), tf.constant(-np.inf), sum_alpha, n_alpha,
+           tf.constant(False), tf.constant(False)]
+      loop_vars = tf.while_loop(_subtree_cond, _subtree_body, loop_vars)
+      z, r, grad, sub_prop, _, _ = _unflatten(loop_vars[3:6 * n_vars + 3], 6)
+      sub_prop_log_joint, sub_log_sum_w, sum_alpha, n_alpha, sub_turning, \
+          divergent = loop_vars[6 * n_vars + 3:]
+
+      # Biased progressive sampling between the old tree and the new
+      # subtree; a subtree that U-turned or diverged is discarded.
+      valid = tf.logical_not(tf.logical_or(sub_turning, divergent))
+      accept = tf.logical_and(
+          valid,
+          tf.log(tf.random_uniform([])) < sub_log_sum_w - log_sum_w)
+      new = _select(accept, sub_prop + [sub_prop_log_joint],
+                    prop + [prop_log_joint])
+      prop, prop_log_joint = new[:-1], new[-1]
+      log_sum_w = tf.select(valid, _log_add_exp(log_sum_w, sub_log_sum_w),
+                            log_sum_w)
+      moved = tf.logical_or(moved, accept)
+
+      edges = _select(forward,
+                      z_left + r_left + grad_left + z + r + grad,
+                      z + r + grad + z_right + r_right + grad_right)
+      z_left, r_left, grad_left, z_right, r_right, grad_right = \
+          _unflatten(edges, 6)
+      dz = [right - left for left, right in zip(z_left, z_right)]
+      turning = tf.logical_or(
+          sub_turning,
+          tf.logical_or(_dot(dz, _velocity(r_left)) < 0.0,
+                        _dot(dz, _velocity(r_right)) < 0.0))
+      return [depth + 1] + z_left + r_left + grad_left + \
+          z_right + r_right + grad_right + prop + \
+          [prop_log_joint, log_sum_w, sum_alpha, n_alpha, turning,
+           divergent, moved]
+
+    loop_vars = [tf.constant(0)] + z0 + r0 + grad0 + z0 + r0 + grad0 + \
+        z0 + [log_joint0, tf.constant(0.0), tf.constant(0.0),
+              tf.constant(0.0), tf.constant(False), tf.constant(False),
+              tf.constant(False)]
+    loop_vars = tf.while_loop(_tree_cond, _tree_body, loop_vars)
+    depth = loop_vars[0]
+    sample = dict(zip(keys, loop_vars[6 * n_vars + 1:7 * n_vars + 1]))
+    sum_alpha, n_alpha = loop_vars[7 * n_vars + 3:7 * n_vars + 5]
+    divergent, moved = loop_vars[-2:]
+
+    # Update Empirical random variables.
+    assign_ops = self._write_sample(sample)
+    warmup_ops = self._write_sample(sample, 0)
+    self._build_warmup(warmup_ops, sample,
+                       sum_alpha / tf.maximum(n_alpha, 1.0))
+
+    # Increment n_accept (if the sample moved) and record diagnostics.
+    assign_ops.append(self.n_accept.assign_add(tf.select(moved, 1, 0)))
+    assign_ops.append(self.tree_depth.assign(depth))
+    assign_ops.append(self.n_divergent.assign_add(tf.select(divergent, 1, 0)))
+    return tf.group(*assign_ops)
+
+  def _log_joint_and_grad(self, keys, z_list):
+    log_joint = tf.convert_to_tensor(
+        self.log_joint(dict(zip(keys, z_list))))
+    grads = tf.gradients(log_joint, z_list)
+    grads = [tf.zeros_like(z) if grad is None else grad
+             for z, grad in zip(z_list, grads)]
+    return log_joint, grads
+
+
+def _dot(x_list, y_list):
+  return tf.reduce_sum([tf.reduce_sum(x * y) for x, y in zip(x_list, y_list)])
+
+
+def _batch_dot(x_list, y_list):
+  """Dot product of each row of the ``[max_depth, ...]`` tensors."""
+  return tf.reduce_sum(
+      tf.pack([tf.reduce_sum(tf.reshape(x * y, [tf.shape(x)[0], -1]), 1)
+               for x, y in zip(x_list, y_list)]), 0)
+
+
+def _log_add_exp(x, y):
+  x_max = tf.maximum(x, y)
+  return x_max + tf.log(tf.exp(x - x_max) + tf.exp(y - x_max))
+
+
+def _set_row(x, mask, row):
+  """Replace the rows of ``x`` where ``mask`` is 1 with ``row``."""
+  mask = tf.reshape(mask, [-1] + [1] * len(row.get_shape()))
+  return x * (1.0 - mask) + tf.expand_dims(row, 0) * mask
+
+
+def _checkpoint_idxs(n, max_depth):
+  """Checkpoint indices for leaf ``n`` of a subtree, following the
+  iterative tree building of Phan et al. (2019).
+
+  The maximum index is the number of ones in the binary expansion of
+  ``n // 2``; the number of sub-subtrees closed by leaf ``n`` is its
+  number of trailing ones.
+  """
+  bits = tf.mod(tf.floordiv(n, tf.pow(2, tf.range(max_depth))), 2)
+  idx_max = tf.reduce_sum(bits) - tf.gather(bits, 0)
+  trailing_ones = tf.reduce_sum(tf.cumprod(bits))
+  return idx_max, idx_max - trailing_ones + 1
+
+
+def _select(pred, xs, ys):
+  """Select between two lists of tensors."""
+  out = tf.cond(pred, lambda: list(xs), lambda: list(ys))
+  if not isinstance(out, list):
+    # ``tf.cond`` returns tf.Tensor if output is a list of size 1.
+    out = [out]
+
+  return out
+
+
+def _unflatten(values, n_groups):
+  """Split a flat list into ``n_groups`` lists of equal size."""
+  values = list(values)
+  size = len(values) // n_groups
+  return [values[i * size:(i + 1) * size] for i in range(n_groups)]
@@ -0,0 +1,243 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import six
+import tensorflow as tf
+
+from edward.inferences.monte_carlo import MonteCarlo
+from edward.models import RandomVariable
+from edward.util import copy, get_session
+
+
+class ParallelTempering(MonteCarlo):
+  """Parallel tempering, also known as replica exchange Monte Carlo
+  (Swendsen and Wang, 1986; Geyer, 1991).
+
+  A ladder of replicas runs Metropolis-Hastings on tempered posteriors
+  p(z) p(x | z)^beta, with inverse temperatures 1 = beta_0 > ... >
+  beta_{R-1}. After each step, adjacent replicas propose to swap
+  states. Hot replicas move freely across modes, and swaps carry their
+  states down to the cold replica, whose samples target the posterior.
+  """
+  def __init__(self, latent_vars, proposal_vars, data=None,
+               model_wrapper=None):
+    """
+    Parameters
+    ----------
+    proposal_vars : dict of RandomVariable to RandomVariable
+      Collection of random variables to perform inference on; each is
+      binded to a proposal distribution p(z' | z). It is used by all
+      replicas.
+
+    Examples
+    --------
+    >>> z = Normal(mu=0.0, sigma=1.0)
+    >>> x = Normal(mu=tf.ones(10) * z, sigma=1.0)
+    >>>
+    >>> qz = Empirical(tf.Variable(tf.zeros([500])))
+    >>> proposal_z = Normal(mu=z, sigma=0.5)
+    >>> data = {x: np.array([0.0] * 10, dtype=np.float32)}
+    >>> inference = ed.ParallelTempering({z: qz}, {z: proposal_z}, data)
+
+    Notes
+    -----
+    Only samples of the cold replica are stored in the Empirical
+    random variables.
+    """
+    if model_wrapper is not None:
+      raise NotImplementedError("ParallelTempering is not supported for "
+                                "model wrappers.")
+
+    self.proposal_vars = proposal_vars
+    super(ParallelTempering, self).__init__(latent_vars, data, model_wrapper)
+
+  def initialize(self, n_replicas=4, max_temperature=10.0,
+                 temperatures=None, *args, **kwargs):
+    """
+    Parameters
+    ----------
+    n_replicas : int, optional
+      Number of replicas, including the cold one. It must be at least
+      2.
+    max_temperature : float, optional
+      Temperature of the hottest replica. Temperatures are spaced
+      geometrically between 1 and ``max_temperature``.
+    temperatures : list of float, optional
+      Temperatures of the replicas, starting with 1 for the cold
+      replica. It overrides ``n_replicas`` and ``max_temperature``.
+    """
+    if temperatures is None:
+      temperatures = max_temperature ** (np.arange(n_replicas) /
+                                         (n_replicas - 1.0))
+
+    temperatures = np.asarray(temperatures, dtype=np.float32)
+    if len(temperatures) < 2:
+      raise ValueError("ParallelTempering requires at least 2 replicas.")
+
+    self.n_replicas = len(temperatures)
+    self.beta = 1.0 / temperatures
+    self.scope_iter = 0  # a convenient counter for log joint calculations
+
+    # State of every replica, initialized from the first sample of
+    # each Empirical at the first iteration.
+    self.replicas = {}
+    for z, qz in six.iteritems(self.latent_vars):
+      shape = [self.n_replicas] + qz.get_event_shape().as_list()
+      self.replicas[z] = tf.Variable(tf.zeros(shape, dtype=qz.dtype),
+                                     trainable=False)
+
+    self.n_swap = tf.Variable(tf.zeros([self.n_replicas - 1]),
+                              trainable=False)
+    self.n_swap_proposed = tf.Variable(tf.zeros([self.n_replicas - 1]),
+                                       trainable=False)
+    self.swap_rate = self.n_swap / tf.maximum(self.n_swap_proposed, 1.0)
+    return super(ParallelTempering, self).initialize(*args, **kwargs)
+
+  def update(self, feed_dict=None):
+    """Run one iteration of sampling for Monte Carlo.
+
+    Parameters
+    ----------
+    feed_dict : dict, optional
+      Feed dictionary for a TensorFlow session run. It is used to feed
+      placeholders that are not fed during initialization.
+
+    Returns
+    -------
+    dict
+      Dictionary of algorithm-specific information. In addition to
+      the acceptance rate of the cold replica, it has the acceptance
+      rate of swaps between each pair of adjacent replicas.
+    """
+    info_dict = super(ParallelTempering, self).update(feed_dict)
+    sess = get_session()
+    info_dict['swap_rate'] = sess.run(self.swap_rate)
+    return info_dict
+
+  def build_update(self):
+    """
+    Propose a new state for each replica and accept or reject it with
+    its tempered acceptance ratio. Then propose swaps between adjacent
+    replicas, alternating between even and odd pairs across
+    iterations; a swap of replicas r and r + 1 is accepted with
+    probability
+
+    min(1, exp((beta_r - beta_{r+1}) *
+               (log p(x | z_{r+1}) - log p(x | z_r)))).
+
+    All replicas are updated in one ``tf.while_loop``, so the graph
+    size does not grow with the number of replicas.
+
+    Notes
+    -----
+    Proposals and log densities are not batched over replicas:
+    model graphs cannot broadcast over a leading replica dimension in
+    general, so they are evaluated one replica at a time inside the
+    loop, as in ``ImportanceSampling`` and ``IWVI``. Acceptance and
+    swaps are batched across replicas.
+    """
+    keys = list(six.iterkeys(self.latent_vars))
+    old_states = {}
+    for z, qz in six.iteritems(self.latent_vars):
+      rank = len(qz.get_event_shape())
+      first_sample = tf.tile(tf.expand_dims(qz.gather(0), 0),
+                             [self.n_replicas] + [1] * rank)
+      old_states[z] = tf.cond(tf.equal(self.t, 0),
+                              lambda first_sample=first_sample: first_sample,
+                              lambda z=z: tf.identity(self.replicas[z]))
+
+    # Propose a new state for each replica.
+    def _cond(r, *args):
+      return r < self.n_replicas
+
+    def _body(r, *tas):
+      old_sample = {z: tf.gather(old_states[z], r) for z in keys}
+      new_sample = {}
+      log_proposal = 0.0
+      for z in keys:
+        proposal_znew = copy(self.proposal_vars[z], old_sample,
+                             scope='proposal_znew')
+        new_sample[z] = proposal_znew.value()
+        log_proposal -= tf.reduce_sum(proposal_znew.log_prob(new_sample[z]))
+
+      for z in keys:
+        proposal_zold = copy(self.proposal_vars[z], new_sample,
+                             scope='proposal_zold')
+        log_proposal += tf.reduce_sum(proposal_zold.log_prob(old_sample[z]))
+
+      values = [new_sample[z] for z in keys] + [log_proposal] + \
+          list(self._log_densities(new_sample)) + \
+          list(self._log_densities(old_sample))
+      return [r + 1] + [ta.write(r, value) for ta, value in zip(tas, values)]
+
+    dtypes = [self.latent_vars[z].dtype for z in keys] + \
+        [tf.float32] * 5
+    tas = [tf.TensorArray(dtype=dtype, size=self.n_replicas)
+           for dtype in dtypes]
+    loop_vars = tf.while_loop(_cond, _body, [tf.constant(0)] + tas)
+    values = [ta.pack() for ta in loop_vars[1:]]
+    new_states = dict(zip(keys, values[:len(keys)]))
+    log_proposal, prior_new, lik_new, prior_old, lik_old = values[len(keys):]
+
+    # Accept or reject the new state of each replica.
+    ratio = prior_new + self.beta * lik_new - \
+        prior_old - self.beta * lik_old + log_proposal
+    u = tf.random_uniform([self.n_replicas])
+    accept = tf.log(u) < ratio
+    states = {z: tf.select(accept, new_states[z], old_states[z])
+              for z in keys}
+    lik = tf.select(accept, lik_new, lik_old)
+
+    # Propose swaps between adjacent replicas of alternating parity.
+    n_pairs = self.n_replicas - 1
+    active = tf.equal(tf.mod(tf.range(n_pairs), 2), tf.mod(self.t, 2))
+    log_swap = (self.beta[:-1] - self.beta[1:]) * \
+        (tf.slice(lik, [1], [n_pairs]) - tf.slice(lik, [0], [n_pairs]))
+    swap = tf.logical_and(active,
+                          tf.log(tf.random_uniform([n_pairs])) < log_swap)
+    perm = _swap_permutation(swap)
+    states = {z: tf.gather(state, perm) for z, state in six.iteritems(states)}
+
+    # Update replicas and Empirical random variables with the cold
+    # replica.
+    assign_ops = self._write_sample(
+        {z: tf.gather(state, 0) for z, state in six.iteritems(states)})
+    for z in six.iterkeys(self.latent_vars):
+      assign_ops.append(self.replicas[z].assign(states[z]))
+
+    assign_ops.append(self.n_swap.assign_add(tf.cast(swap, tf.float32)))
+    assign_ops.append(self.n_swap_proposed.assign_add(
+        tf.cast(active, tf.float32)))
+
+    # Increment n_accept (if accepted by the cold replica).
+    assign_ops.append(self.n_accept.assign_add(
+        tf.cast(tf.gather(accept, 0), tf.int32)))
+    return tf.group(*assign_ops)
+
+  def _log_densities(self, z_sample):
+    """Log prior log p(z) and log likelihood log p(x | z), for inputs z
+    (and fixed data x)."""
+    self.scope_iter += 1
+
+    log_prior = 0.0
+    for z, sample in six.iteritems(z_sample):
+      z = copy(z, z_sample, scope='prior' + str(self.scope_iter))
+      log_prior += tf.reduce_sum(z.log_prob(sample))
+
+    log_lik = 0.0
+    for x, obs in six.iteritems(self.data):
+      if isinstance(x, RandomVariable):
+        x_z = copy(x, z_sample, scope='likelihood' + str(self.scope_iter))
+        log_lik += tf.reduce_sum(x_z.log_prob(obs))
+
+    return log_prior, log_lik
+
+
+def _swap_permutation(swap):
+  """Permutation of replicas which swaps each pair r, r + 1 for which
+  ``swap[r]`` is True. Swapped pairs must not overlap."""
+  swap = tf.cast(swap, tf.int32)
+  return tf.range(tf.size(swap) + 1) + tf.concat(0, [swap, [0]]) - \
+      tf.concat(0, [[0], swap])
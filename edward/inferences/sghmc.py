@@ -0,0 +1,86 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import six
+import tensorflow as tf
+
+from edward.inferences.sgmcmc import SGMCMC
+from edward.models import Normal
+
+
+class SGHMC(SGMCMC):
+  """Stochastic gradient Hamiltonian Monte Carlo (Chen et al., 2014).
+  """
+  def __init__(self, latent_vars, data=None, model_wrapper=None):
+    """
+    Examples
+    --------
+    >>> z = Normal(mu=0.0, sigma=1.0)
+    >>> x = Normal(mu=tf.ones(10) * z, sigma=1.0)
+    >>>
+    >>> qz = Empirical(tf.Variable(tf.zeros([500])))
+    >>> data = {x: np.array([0.0] * 10, dtype=np.float32)}
+    >>> inference = ed.SGHMC({z: qz}, data)
+    """
+    super(SGHMC, self).__init__(latent_vars, data, model_wrapper)
+
+  def initialize(self, *args, **kwargs):
+    """
+    Positional arguments are passed to ``SGMCMC.initialize``, as are
+    keyword arguments other than the following keyword-only argument.
+
+    Parameters
+    ----------
+    friction : float, optional
+      Friction term alpha in (0, 1). It counteracts the noise of
+      stochastic gradients; larger values dampen the momentum more.
+
+    Notes
+    -----
+    The learning rate of SGHMC is on the scale of the squared step
+    size of HMC, so ``step_size`` is typically much smaller than for
+    SGLD. The momentum persists across iterations.
+    """
+    self.friction = kwargs.pop('friction', 0.1)
+    self.velocity = {
+        z: tf.Variable(tf.zeros(qz.get_event_shape().as_list()),
+                       trainable=False)
+        for z, qz in six.iteritems(self.latent_vars)}
+    return super(SGHMC, self).initialize(*args, **kwargs)
+
+  def build_update(self):
+    """
+    Simulate Hamiltonian dynamics with friction using a discretized
+    integrator. With learning rate eta and friction alpha, the update
+    is
+
+    v' = (1 - alpha) v + eta * grad log p(x, z) + N(0, 2 alpha eta),
+    z' = z + v'.
+
+    The friction and injected noise compensate for the noise of the
+    stochastic gradient, so no Metropolis-Hastings correction is done.
+    """
+    old_sample = self._read_sample()
+
+    # Simulate Hamiltonian dynamics with friction.
+    learning_rate = self.learning_rate()
+    grad_log_joint = self.grad_log_joint(old_sample)
+    sample = {}
+    assign_ops = []
+    for z, qz in six.iteritems(self.latent_vars):
+      event_shape = qz.get_event_shape()
+      normal = Normal(mu=tf.zeros(event_shape),
+                      sigma=tf.sqrt(2.0 * self.friction * learning_rate) *
+                      tf.ones(event_shape))
+      velocity = (1.0 - self.friction) * self.velocity[z] + \
+          learning_rate * grad_log_joint[z] + normal.sample()
+      sample[z] = old_sample[z] + velocity
+      assign_ops.append(self.velocity[z].assign(velocity))
+
+    # Update Empirical random variables.
+    assign_ops.extend(self._write_sample(sample))
+
+    # Increment n_accept.
+    assign_ops.append(self.n_accept.assign_add(1))
+    return tf.group(*assign_ops)
@@ -5,13 +5,13 @@ from __future__ import print_function
 import six
 import tensorflow as tf
 
-from edward.inferences.monte_carlo import MonteCarlo
-from edward.models import Normal, RandomVariable
-from edward.util import copy
+from edward.inferences.sgmcmc import SGMCMC
+from edward.models import Normal
 
 
-class SGLD(MonteCarlo):
-  """Stochastic gradient Langevin dynamics (Welling and Teh, 2011).
+class SGLD(SGMCMC):
+  """Stochastic gradient Langevin dynamics (Welling and Teh, 2011),
+  optionally preconditioned with RMSprop (Li et al., 2016).
   """
   def __init__(self, latent_vars, data=None, model_wrapper=None):
     """
@@ -26,73 +26,72 @@ class SGLD(MonteCarlo):
     """
     super(SGLD, self).__init__(latent_vars, data, model_wrapper)
 
-  def initialize(self, step_size=0.25, *args, **kwargs):
+  def initialize(self, *args, **kwargs):
     """
+    Positional arguments are passed to ``SGMCMC.initialize``, as are
+    keyword arguments other than the following keyword-only arguments.
+
     Parameters
     ----------
-    step_size : float, optional
-      Constant scale factor of learning rate.
+    preconditioned : bool, optional
+      Whether to precondition the dynamics with a diagonal matrix
+      from RMSprop, i.e., pSGLD. It adapts the step size of each
+      dimension to the local curvature.
+    decay : float, optional
+      Decay rate of the running average of squared gradients of
+      RMSprop.
+    epsilon : float, optional
+      Constant added to the root mean square of gradients of RMSprop,
+      which bounds the preconditioner.
     """
-    self.step_size = step_size
+    self.preconditioned = kwargs.pop('preconditioned', False)
+    self.decay = kwargs.pop('decay', 0.99)
+    self.epsilon = kwargs.pop('epsilon', 1e-5)
+    if self.preconditioned:
+      self.mean_square = {
+          z: tf.Variable(tf.zeros(qz.get_event_shape().as_list()),
+                         trainable=False)
+          for z, qz in six.iteritems(self.latent_vars)}
+
     return super(SGLD, self).initialize(*args, **kwargs)
 
   def build_update(self):
     """
     Simulate Langevin dynamics using a discretized integrator. Its
     discretization error goes to zero as the learning rate decreases.
+
+    With learning rate epsilon and preconditioner G (the identity
+    unless preconditioned), the update is
+
+    z' = z + 0.5 * epsilon * G grad log p(x, z) + N(0, epsilon * G).
     """
-    old_sample = {z: tf.gather(qz.params, tf.maximum(self.t - 1, 0))
-                  for z, qz in six.iteritems(self.latent_vars)}
+    old_sample = self._read_sample()
 
     # Simulate Langevin dynamics.
-    learning_rate = self.step_size / tf.cast(self.t + 1, tf.float32)
-    grad_log_joint = tf.gradients(self.log_joint(old_sample),
-                                  list(six.itervalues(old_sample)))
+    learning_rate = self.learning_rate()
+    grad_log_joint = self.grad_log_joint(old_sample)
     sample = {}
-    for z, qz, grad_log_p in \
-        zip(six.iterkeys(self.latent_vars),
-            six.itervalues(self.latent_vars),
-            grad_log_joint):
+    assign_ops = []
+    for z, qz in six.iteritems(self.latent_vars):
+      grad_log_p = grad_log_joint[z]
+      if self.preconditioned:
+        mean_square = self.decay * self.mean_square[z] + \
+            (1.0 - self.decay) * tf.square(grad_log_p)
+        precond = 1.0 / (self.epsilon + tf.sqrt(mean_square))
+        assign_ops.append(self.mean_square[z].assign(mean_square))
+      else:
+        precond = 1.0
+
       event_shape = qz.get_event_shape()
       normal = Normal(mu=tf.zeros(event_shape),
-                      sigma=learning_rate * tf.ones(event_shape))
-      sample[z] = old_sample[z] + 0.5 * learning_rate * grad_log_p + \
-          normal.sample()
+                      sigma=tf.sqrt(learning_rate * precond) *
+                      tf.ones(event_shape))
+      sample[z] = old_sample[z] + \
+          0.5 * learning_rate * precond * grad_log_p + normal.sample()
 
     # Update Empirical random variables.
-    assign_ops = []
-    variables = {x.name: x for x in
-                 tf.get_default_graph().get_collection(tf.GraphKeys.VARIABLES)}
-    for z, qz in six.iteritems(self.latent_vars):
-      variable = variables[qz.params.op.inputs[0].op.inputs[0].name]
-      assign_ops.append(tf.scatter_update(variable, self.t, sample[z]))
+    assign_ops.extend(self._write_sample(sample))
 
     # Increment n_accept.
     assign_ops.append(self.n_accept.assign_add(1))
     return tf.group(*assign_ops)
-
-  def log_joint(self, z_sample):
-    """
-    Utility function to calculate model's log joint density,
-    log p(x, z), for inputs z (and fixed data x).
-
-    Parameters
-    ----------
-    z_sample : dict
-      Latent variable keys to samples.
-    """
-    if self.model_wrapper is None:
-      log_joint = 0.0
-      for z, sample in six.iteritems(z_sample):
-        z = copy(z, z_sample, scope='prior')
-        log_joint += tf.reduce_sum(z.log_prob(sample))
-
-      for x, obs in six.iteritems(self.data):
-        if isinstance(x, RandomVariable):
-          x_z = copy(x, z_sample, scope='likelihood')
-          log_joint += tf.reduce_sum(x_z.log_prob(obs))
-    else:
-      x = self.data
-      log_joint = self.model_wrapper.log_prob(x, z_sample)
-
-    return log_joint
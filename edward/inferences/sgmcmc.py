@@ -0,0 +1,113 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import six
+import tensorflow as tf
+
+from edward.inferences.monte_carlo import MonteCarlo
+from edward.models import RandomVariable
+
+
+class SGMCMC(MonteCarlo):
+  """Base class for stochastic gradient Markov chain Monte Carlo
+  methods.
+
+  They simulate dynamics driven by the gradient of the log joint
+  density, estimated on minibatches of data, with a step size that
+  follows a schedule.
+  """
+  def initialize(self, step_size=0.25, *args, **kwargs):
+    """
+    Positional arguments after ``step_size`` are passed to
+    ``MonteCarlo.initialize``, as are keyword arguments other than
+    ``schedule``, ``power``, and ``n_cycles``, which are keyword-only.
+
+    Parameters
+    ----------
+    step_size : float, optional
+      Constant scale factor of learning rate.
+    schedule : str or function, optional
+      Schedule of the learning rate, one of
+
+      + 'constant': ``step_size``;
+      + 'inverse': ``step_size / (t + 1)``;
+      + 'polynomial': ``step_size * (t + 1)^(-power)`` (Welling and
+        Teh, 2011);
+      + 'cyclical': a cosine decay from ``step_size`` to zero,
+        restarted ``n_cycles`` times over all iterations (Zhang et al.,
+        2020).
+
+      It can also be a function mapping the iteration, a float
+      tensor, to the learning rate.
+    power : float, optional
+      Power of the 'polynomial' schedule, in (0.5, 1].
+    n_cycles : int, optional
+      Number of cycles of the 'cyclical' schedule.
+
+    Notes
+    -----
+    If ``n_minibatch`` is specified and ``scale`` is not, the
+    log-likelihood of each observed variable is scaled by the ratio of
+    data size to minibatch size, so that its gradient is an unbiased
+    estimate of the full data's.
+    """
+    schedule = kwargs.pop('schedule', 'inverse')
+    power = kwargs.pop('power', 0.55)
+    n_cycles = kwargs.pop('n_cycles', 4)
+    if schedule not in ['constant', 'inverse', 'polynomial', 'cyclical'] \
+       and not callable(schedule):
+      raise ValueError("Unknown schedule: " + str(schedule))
+
+    self.step_size = step_size
+    self.schedule = schedule
+    self.power = power
+    self.n_cycles = n_cycles
+    self.scope_iter = 0  # a convenient counter for log joint calculations
+
+    n_minibatch = kwargs.get('n_minibatch', None)
+    if n_minibatch is not None and kwargs.get('scale', None) is None:
+      kwargs['scale'] = {
+          x: float(obs.get_shape()[0].value) / n_minibatch
+          for x, obs in six.iteritems(self.data)
+          if isinstance(x, RandomVariable)}
+
+    return super(SGMCMC, self).initialize(*args, **kwargs)
+
+  def learning_rate(self):
+    """Learning rate at the current iteration, according to the
+    schedule."""
+    t = tf.cast(self.t, tf.float32)
+    if callable(self.schedule):
+      return self.schedule(t)
+    elif self.schedule == 'constant':
+      return tf.constant(self.step_size)
+    elif self.schedule == 'inverse':
+      return self.step_size / (t + 1.0)
+    elif self.schedule == 'polynomial':
+      return self.step_size * tf.pow(t + 1.0, -self.power)
+    else:
+      cycle_length = float(np.ceil(self.n_iter / self.n_cycles))
+      return 0.5 * self.step_size * \
+          (tf.cos(np.pi * tf.mod(t, cycle_length) / cycle_length) + 1.0)
+
+  def grad_log_joint(self, z_sample):
+    """Gradient of the log joint density with respect to each latent
+    variable.
+
+    Parameters
+    ----------
+    z_sample : dict
+      Latent variable keys to samples.
+
+    Returns
+    -------
+    dict
+      Latent variable keys to gradients.
+    """
+    keys = list(six.iterkeys(z_sample))
+    grads = tf.gradients(self.log_joint(z_sample),
+                         [z_sample[z] for z in keys])
+    return {z: tf.zeros_like(z_sample[z]) if grad is None else grad
+            for z, grad in zip(keys, grads)}
@@ -0,0 +1,329 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import six
+import tensorflow as tf
+
+from edward.inferences.inference import Inference
+from edward.inferences.monte_carlo import MonteCarlo
+from edward.models import RandomVariable
+from edward.util import copy, get_session, log_sum_exp
+
+
+class SMC(MonteCarlo):
+  """Sequential Monte Carlo sampler (Del Moral et al., 2006; Chopin,
+  2002).
+
+  A population of weighted particles moves through a sequence of
+  distributions from the prior to the posterior. Each stage reweights
+  the particles by the increment of the likelihood, resamples them
+  when the effective sample size is low, and rejuvenates them with
+  Metropolis-Hastings moves that leave the stage's distribution
+  invariant.
+
+  The particles are the samples of the Empirical random variables,
+  along their outer dimension, up to the smallest number of samples
+  among them; they are read and written as in other Monte Carlo
+  methods, so the Empirical random variables may be compressed. Their
+  log weights are in ``log_weights``. The particles are always
+  resampled at the last stage, so that they are equally weighted
+  samples of the posterior.
+  """
+  def __init__(self, latent_vars, data=None, model_wrapper=None):
+    """
+    Examples
+    --------
+    >>> z = Normal(mu=0.0, sigma=1.0)
+    >>> x = Normal(mu=tf.ones(10) * z, sigma=1.0)
+    >>>
+    >>> qz = Empirical(tf.Variable(tf.zeros([1000])))
+    >>> data = {x: np.array([0.0] * 10, dtype=np.float32)}
+    >>> inference = ed.SMC({z: qz}, data)
+    >>> inference.run(n_stages=50)
+    >>> weights = tf.exp(inference.log_weights)
+    """
+    if model_wrapper is not None:
+      raise NotImplementedError("SMC is not supported for model wrappers.")
+
+    super(SMC, self).__init__(latent_vars, data, model_wrapper)
+
+  def initialize(self, n_stages=100, annealing='likelihood', power=4.0,
+                 resampling='systematic', ess_threshold=0.5, n_moves=1,
+                 *args, **kwargs):
+    """
+    Parameters
+    ----------
+    n_stages : int, optional
+      Number of stages from the prior to the posterior. Each update
+      runs one stage, so it is also the number of iterations.
+    annealing : str, optional
+      Sequence of distributions. If 'likelihood', the likelihood is
+      tempered, p(z) p(x | z)^beta, with beta rising from 0 to 1 as
+      (k / n_stages)^power at stage k. If 'data', data points are
+      added along the outer dimension of the observed variables in
+      ``n_stages`` equal batches, p(z) p(x_{1:n_k} | z); the
+      log-likelihood must factorize over data points.
+    power : float, optional
+      Power of the tempering schedule for 'likelihood' annealing.
+    resampling : str, optional
+      Resampling scheme, one of 'systematic' and 'stratified'.
+    ess_threshold : float, optional
+      Resample once the effective sample size falls below this
+      fraction of the number of particles.
+    n_moves : int, optional
+      Number of Metropolis-Hastings rejuvenation moves at each stage.
+      Proposals are random walks scaled by the spread of the
+      particles.
+
+    Notes
+    -----
+    The options of ``MonteCarlo.initialize`` for diagnostics, ring
+    buffers, and time budgets are not supported, as the number of
+    iterations is the number of stages.
+    """
+    for key in ['n_diagnose', 'target_ess', 'ring_buffer', 'time_budget']:
+      if kwargs.pop(key, None):
+        raise NotImplementedError(key + " is not supported for SMC.")
+
+    if annealing not in ['likelihood', 'data']:
+      raise ValueError("annealing must be one of 'likelihood' and 'data'.")
+
+    if resampling not in ['systematic', 'stratified']:
+      raise ValueError("resampling must be one of 'systematic' and "
+                       "'stratified'.")
+
+    self.n_particles = int(np.amin([qz.n for qz in
+                                    six.itervalues(self.latent_vars)]))
+    self.n_stages = n_stages
+    self.annealing = annealing
+    self.power = power
+    self.resampling = resampling
+    self.ess_threshold = ess_threshold
+    self.n_moves = n_moves
+    self.scope_iter = 0  # a convenient counter for log joint calculations
+
+    # The number of iterations is the number of stages, and not the
+    # number of samples as in other Monte Carlo methods.
+    kwargs['n_iter'] = n_stages
+    Inference.initialize(self, *args, **kwargs)
+
+    self.n_diagnose = None
+    self.ring_buffer = False
+    self.log_weights = tf.Variable(tf.zeros([self.n_particles]),
+                                   trainable=False)
+    self.log_evidence = tf.Variable(0.0, trainable=False)
+    self.n_accept = tf.Variable(0.0, trainable=False)
+    self._initialized_particles = False
+    self.initialize_particles = self._build_initialize_particles()
+    self.train = self.build_update()
+
+  def update(self, feed_dict=None):
+    """Run one stage of sequential Monte Carlo.
+
+    Parameters
+    ----------
+    feed_dict : dict, optional
+      Feed dictionary for a TensorFlow session run. It is used to feed
+      placeholders that are not fed during initialization.
+
+    Returns
+    -------
+    dict
+      Dictionary of algorithm-specific information. In this case, the
+      acceptance rate of rejuvenation moves over all stages so far,
+      and the effective sample size of the particles at the end of
+      the stage.
+    """
+    if feed_dict is None:
+      feed_dict = {}
+
+    for key, value in six.iteritems(self.data):
+      if isinstance(key, tf.Tensor):
+        feed_dict[key] = value
+
+    sess = get_session()
+    if not self._initialized_particles:
+      sess.run(self.initialize_particles, feed_dict)
+      self._initialized_particles = True
+
+    _, ess = sess.run([self.train, self.ess], feed_dict)
+    t = sess.run(self.increment_t)
+    accept_rate = sess.run(self.n_accept) / (t * self.n_moves)
+    return {'t': t, 'accept_rate': accept_rate, 'ess': ess}
+
+  def build_update(self):
+    """
+    Run one stage: reweight particles by the increment of the tempered
+    log-likelihood, resample them if their effective sample size is
+    low, and rejuvenate them with Metropolis-Hastings moves. All
+    particles are processed together, with per-particle log densities
+    evaluated in a ``tf.while_loop``.
+    """
+    keys = list(six.iterkeys(self.latent_vars))
+    particles = {z: qz.gather(tf.range(self.n_particles))
+                 for z, qz in six.iteritems(self.latent_vars)}
+    weights_old = self._annealing_weights(self.t)
+    weights_new = self._annealing_weights(self.t + 1)
+
+    # Reweight particles.
+    log_prior, log_lik = self._log_densities(particles)
+    log_weights = self.log_weights + \
+        tf.reduce_sum((weights_new - weights_old) * log_lik, 1)
+    log_evidence = self.log_evidence + \
+        log_sum_exp(log_weights) - log_sum_exp(self.log_weights)
+    log_weights -= log_sum_exp(log_weights)
+
+    # Resample particles if effective sample size is low, or at the
+    # last stage.
+    ess = 1.0 / tf.reduce_sum(tf.exp(2.0 * log_weights))
+    resample = tf.logical_or(ess < self.ess_threshold * self.n_particles,
+                             self.t + 1 >= self.n_stages)
+    idx = tf.cond(resample, lambda: self._resample(tf.exp(log_weights)),
+                  lambda: tf.range(self.n_particles))
+    particles = {z: tf.gather(particle, idx)
+                 for z, particle in six.iteritems(particles)}
+    log_prior = tf.gather(log_prior, idx)
+    log_lik = tf.gather(log_lik, idx)
+    log_weights = tf.cond(
+        resample,
+        lambda: -np.log(self.n_particles) * tf.ones([self.n_particles]),
+        lambda: log_weights)
+
+    # Rejuvenate particles with random walk Metropolis-Hastings moves,
+    # scaled by the spread of the particles.
+    dim = np.sum([qz.get_event_shape().num_elements()
+                  for qz in six.itervalues(self.latent_vars)])
+    n_accept = 0.0
+    for _ in range(self.n_moves):
+      new_particles = {}
+      for z, particle in six.iteritems(particles):
+        _, var = tf.nn.moments(particle, [0])
+        new_particles[z] = particle + 2.38 / np.sqrt(dim) * \
+            tf.sqrt(var) * tf.random_normal(tf.shape(particle))
+
+      new_log_prior, new_log_lik = self._log_densities(new_particles)
+      ratio = new_log_prior + \
+          tf.reduce_sum(weights_new * new_log_lik, 1) - \
+          log_prior - tf.reduce_sum(weights_new * log_lik, 1)
+      accept = tf.log(tf.random_uniform([self.n_particles])) < ratio
+      particles = {z: tf.select(accept, new_particles[z], particles[z])
+                   for z in keys}
+      log_prior = tf.select(accept, new_log_prior, log_prior)
+      log_lik = tf.select(accept, new_log_lik, log_lik)
+      n_accept += tf.reduce_mean(tf.cast(accept, tf.float32))
+
+    self.ess = 1.0 / tf.reduce_sum(tf.exp(2.0 * log_weights))
+
+    # Update Empirical random variables.
+    assign_ops = self._write_sample(particles, tf.range(self.n_particles))
+    assign_ops.append(self.log_weights.assign(log_weights))
+    assign_ops.append(self.log_evidence.assign(log_evidence))
+    assign_ops.append(self.n_accept.assign_add(n_accept))
+    return tf.group(*assign_ops)
+
+  def _build_initialize_particles(self):
+    """Build op that draws the particles from the prior."""
+    keys = list(six.iterkeys(self.latent_vars))
+
+    def _cond(i, *args):
+      return i < self.n_particles
+
+    def _body(i, *tas):
+      # Copying all latent variables in one scope draws them jointly.
+      self.scope_iter += 1
+      scope = 'smc_prior' + str(self.scope_iter)
+      values = [copy(z, scope=scope).value() for z in keys]
+      return [i + 1] + [ta.write(i, value) for ta, value in zip(tas, values)]
+
+    tas = [tf.TensorArray(dtype=self.latent_vars[z].dtype,
+                          size=self.n_particles) for z in keys]
+    loop_vars = tf.while_loop(_cond, _body, [tf.constant(0)] + tas)
+
+    particles = {z: ta.pack() for z, ta in zip(keys, loop_vars[1:])}
+    assign_ops = self._write_sample(particles, tf.range(self.n_particles))
+    assign_ops.append(self.log_weights.assign(
+        -np.log(self.n_particles) * tf.ones([self.n_particles])))
+    assign_ops.append(self.log_evidence.assign(0.0))
+    return tf.group(*assign_ops)
+
+  def _annealing_weights(self, k):
+    """Weights of the log-likelihood terms at stage ``k``."""
+    k = tf.cast(k, tf.float32)
+    if self.annealing == 'likelihood':
+      return tf.ones([1]) * tf.pow(k / self.n_stages, self.power)
+    else:
+      n_data = self._n_data()
+      n_k = tf.ceil(k * n_data / self.n_stages)
+      return tf.cast(tf.cast(tf.range(n_data), tf.float32) < n_k,
+                     tf.float32)
+
+  def _n_data(self):
+    for x, obs in six.iteritems(self.data):
+      if isinstance(x, RandomVariable):
+        return obs.get_shape()[0].value
+
+  def _resample(self, weights):
+    """Draw indices of particles, with systematic or stratified
+    resampling."""
+    if self.resampling == 'systematic':
+      u = tf.random_uniform([])
+    else:
+      u = tf.random_uniform([self.n_particles])
+
+    u = (tf.cast(tf.range(self.n_particles), tf.float32) + u) / \
+        self.n_particles
+    cdf = tf.cumsum(weights)
+    # Index of the first particle whose cumulative weight exceeds u.
+    idx = tf.reduce_sum(tf.cast(tf.expand_dims(cdf, 0) <
+                                tf.expand_dims(u, 1), tf.int32), 1)
+    return tf.minimum(idx, self.n_particles - 1)
+
+  def _log_densities(self, particles):
+    """Log prior and log-likelihood terms of each particle.
+
+    Returns
+    -------
+    tuple
+      Log prior of shape ``[n_particles]``, and log-likelihood of
+      shape ``[n_particles, 1]`` for likelihood annealing or
+      ``[n_particles, N]`` for data annealing, with a term for each
+      data point.
+    """
+    keys = list(six.iterkeys(particles))
+
+    def _cond(i, *args):
+      return i < self.n_particles
+
+    def _body(i, ta_prior, ta_lik):
+      self.scope_iter += 1
+      z_sample = {z: tf.gather(particles[z], i) for z in keys}
+      log_prior = 0.0
+      for z, sample in six.iteritems(z_sample):
+        z_copy = copy(z, z_sample, scope='prior' + str(self.scope_iter))
+        log_prior += self.scale.get(z, 1.0) * \
+            tf.reduce_sum(z_copy.log_prob(sample))
+
+      log_lik = 0.0
+      for x, obs in six.iteritems(self.data):
+        if isinstance(x, RandomVariable):
+          x_z = copy(x, z_sample, scope='likelihood' + str(self.scope_iter))
+          log_prob = self.scale.get(x, 1.0) * x_z.log_prob(obs)
+          if self.annealing == 'likelihood':
+            log_prob = tf.reshape(tf.reduce_sum(log_prob), [1])
+          else:
+            rank = len(log_prob.get_shape())
+            if rank > 1:
+              log_prob = tf.reduce_sum(log_prob, list(range(1, rank)))
+
+          log_lik += log_prob
+
+      return i + 1, ta_prior.write(i, log_prior), ta_lik.write(i, log_lik)
+
+    _, ta_prior, ta_lik = tf.while_loop(
+        _cond, _body,
+        [tf.constant(0),
+         tf.TensorArray(dtype=tf.float32, size=self.n_particles),
+         tf.TensorArray(dtype=tf.float32, size=self.n_particles)])
+    return ta_prior.pack(), ta_lik.pack()
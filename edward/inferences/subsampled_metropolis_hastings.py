@@ -0,0 +1,345 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import six
+import tensorflow as tf
+
+from edward.inferences.metropolis_hastings import MetropolisHastings
+from edward.models import RandomVariable
+from edward.util import copy, get_session, placeholder
+from scipy import stats
+
+
+class SubsampledMetropolisHastings(MetropolisHastings):
+  """Metropolis-Hastings with data subsampling, for tall datasets
+  (Korattikara et al., 2014; Bardenet et al., 2017).
+
+  The acceptance decision compares the average log-likelihood ratio
+  over data points to a threshold. It is made with a sequential test
+  on minibatches drawn without replacement, which stops as soon as the
+  decision is confident. The log-likelihood ratio of each data point
+  is estimated with a control variate: its first-order Taylor
+  expansion around a reference point, whose sum over the full data is
+  precomputed once. The closer the chain is to the reference point,
+  the fewer data points each iteration uses.
+  """
+  def __init__(self, latent_vars, proposal_vars, data=None,
+               model_wrapper=None):
+    """
+    Parameters
+    ----------
+    proposal_vars : dict of RandomVariable to RandomVariable
+      Collection of random variables to perform inference on; each is
+      binded to a proposal distribution p(z' | z).
+
+    Examples
+    --------
+    >>> M = 100  # minibatch size
+    >>> X = tf.placeholder(tf.float32, [M, D])
+    >>> w = Normal(mu=tf.zeros(D), sigma=tf.ones(D))
+    >>> y = Normal(mu=ed.dot(X, w), sigma=tf.ones(M))
+    >>>
+    >>> qw = Empirical(tf.Variable(tf.zeros([500, D])))
+    >>> proposal_w = Normal(mu=w, sigma=0.01 * tf.ones(D))
+    >>> data = {X: X_train, y: y_train}
+    >>> inference = ed.SubsampledMetropolisHastings(
+    ...     {w: qw}, {w: proposal_w}, data)
+    >>> inference.run(batch_size=M, reference={w: w_map})
+
+    Notes
+    -----
+    The model is written for a minibatch of data points along the
+    outer dimension, as with ``n_minibatch``, and the data
+    dictionary binds its observed variables and placeholders to NumPy
+    arrays of all data points. The log-likelihood must factorize over
+    data points.
+    """
+    if model_wrapper is not None:
+      raise NotImplementedError("SubsampledMetropolisHastings is not "
+                                "supported for model wrappers.")
+
+    super(SubsampledMetropolisHastings, self).__init__(
+        latent_vars, proposal_vars, data, model_wrapper)
+
+    # Store data bound to placeholders in the graph, so that it can be
+    # subsampled alongside the observed variables.
+    sess = get_session()
+    self.covariates = {}
+    for key, value in list(six.iteritems(self.data)):
+      if isinstance(key, tf.Tensor):
+        if isinstance(value, np.ndarray):
+          ph = placeholder(key.dtype, value.shape)
+          var = tf.Variable(ph, trainable=False, collections=[])
+          sess.run(var.initializer, {ph: value})
+          value = var
+
+        self.covariates[key] = value
+        del self.data[key]
+
+    sizes = [value.get_shape()[0].value
+             for value in six.itervalues(self.data)] + \
+        [value.get_shape()[0].value
+         for value in six.itervalues(self.covariates)]
+    if len(sizes) == 0 or None in sizes or len(set(sizes)) != 1:
+      raise ValueError("Data must be NumPy arrays with the same number of "
+                       "data points.")
+
+    self.N = sizes[0]
+
+  def initialize(self, batch_size=100, epsilon=0.05, reference=None,
+                 *args, **kwargs):
+    """
+    Parameters
+    ----------
+    batch_size : int, optional
+      Number of data points in each minibatch of the sequential test.
+      It must match the size of the data in the model, and be at most
+      the number of data points.
+    epsilon : float, optional
+      Tolerance of the sequential test. It stops once the probability
+      of a wrong decision, under a normal approximation, is below
+      ``epsilon``. Smaller values use more data and bias the chain
+      less.
+    reference : dict, optional
+      Latent variable keys to the reference point of the control
+      variates, such as a MAP estimate. Default is the first sample of
+      each Empirical. The full data is used once, in the first
+      update, to compute the gradient at the reference point.
+
+    Raises
+    ------
+    ValueError
+      If ``batch_size`` exceeds the number of data points.
+    """
+    if batch_size > self.N:
+      raise ValueError("batch_size must be at most the number of data "
+                       "points, " + str(self.N) + ".")
+
+    self.batch_size = batch_size
+    self.threshold = stats.norm.ppf(1.0 - epsilon)
+    self.reference_values = reference
+    self.reference = {}
+    self.grad_reference = {}
+    for z, qz in six.iteritems(self.latent_vars):
+      shape = qz.get_event_shape().as_list()
+      self.reference[z] = tf.Variable(tf.zeros(shape), trainable=False)
+      self.grad_reference[z] = tf.Variable(tf.zeros(shape), trainable=False)
+
+    self._computed_reference = False
+    self.n_data = tf.Variable(0.0, trainable=False)
+    return super(SubsampledMetropolisHastings, self).initialize(
+        *args, **kwargs)
+
+  def update(self, feed_dict=None):
+    """Run one iteration of sampling for Monte Carlo.
+
+    Parameters
+    ----------
+    feed_dict : dict, optional
+      Feed dictionary for a TensorFlow session run. It is used to feed
+      placeholders that are not fed during initialization.
+
+    Returns
+    -------
+    dict
+      Dictionary of algorithm-specific information. In addition to
+      the acceptance rate, it has the average fraction of data points
+      used per iteration.
+    """
+    sess = get_session()
+    if not self._computed_reference:
+      sess.run(self.compute_reference, feed_dict)
+      self._computed_reference = True
+
+    info_dict = super(SubsampledMetropolisHastings, self).update(feed_dict)
+    info_dict['data_fraction'] = sess.run(self.data_fraction)
+    return info_dict
+
+  def build_update(self):
+    """
+    Draw sample from proposal conditional on last sample. Accept it
+    if the average log-likelihood ratio over data points,
+
+    mu = 1/N sum_n [ log p(x_n | znew) - log p(x_n | zold) ],
+
+    exceeds mu0 = 1/N [ log u - log p(znew) + log p(zold) -
+    log g(zold | znew) + log g(znew | zold) ], where u ~ Uniform.
+
+    mu is estimated from minibatches drawn without replacement, in a
+    ``tf.while_loop`` that stops once a t-test decides between
+    mu > mu0 and mu < mu0 with error below ``epsilon``, or once all
+    data is used. Each data point's term is corrected by the control
+    variate g_n^T (znew - zold) - 1/N sum_m g_m^T (znew - zold),
+    where g_n is the gradient of log p(x_n | z) at the reference
+    point. Its products with the proposed move are computed for the
+    minibatch from two reverse-mode gradients.
+    """
+    self.compute_reference = self._build_reference()
+
+    keys = list(six.iterkeys(self.latent_vars))
+    old_sample = self._read_sample()
+
+    # Draw proposed sample and calculate terms of the threshold.
+    new_sample = {}
+    log_proposal = 0.0
+    for z, proposal_z in six.iteritems(self.proposal_vars):
+      proposal_znew = copy(proposal_z, old_sample, scope='proposal_znew')
+      new_sample[z] = proposal_znew.value()
+      log_proposal -= tf.reduce_sum(proposal_znew.log_prob(new_sample[z]))
+
+    for z, proposal_z in six.iteritems(self.proposal_vars):
+      proposal_zold = copy(proposal_z, new_sample, scope='proposal_zold')
+      log_proposal += tf.reduce_sum(proposal_zold.log_prob(old_sample[z]))
+
+    log_prior = self._log_prior(new_sample) - self._log_prior(old_sample)
+    u = tf.random_uniform([])
+    mu0 = (tf.log(u) - log_prior - log_proposal) / self.N
+
+    # Average of the control variates over the full data.
+    cv_mean = tf.add_n([tf.reduce_sum(self.grad_reference[z] *
+                                      (new_sample[z] - old_sample[z]))
+                        for z in keys]) / self.N
+
+    # Run the sequential test.
+    N = self.N
+    M = self.batch_size
+    perm = tf.random_shuffle(tf.range(N))
+
+    def _cond(n, sum_d, sum_d2, done):
+      return tf.logical_not(done)
+
+    def _body(n, sum_d, sum_d2, done):
+      pos = n + tf.range(M)
+      valid = tf.cast(pos < N, tf.float32)
+      idx = tf.gather(perm, tf.minimum(pos, N - 1))
+
+      # Calculate log-likelihood ratio of each data point, with
+      # control variates.
+      ref = {z: tf.identity(self.reference[z]) for z in keys}
+      dummy = tf.zeros([M])
+      grads = tf.gradients(self._log_lik(ref, idx),
+                           [ref[z] for z in keys], grad_ys=dummy)
+      inner = [tf.reduce_sum(grad * (new_sample[z] - old_sample[z]))
+               for z, grad in zip(keys, grads) if grad is not None]
+      if inner:
+        jvp = tf.gradients(tf.add_n(inner), dummy)[0]
+      else:
+        jvp = 0.0
+
+      d = self._log_lik(new_sample, idx) - self._log_lik(old_sample, idx)
+      d = (d - jvp + cv_mean) * valid
+
+      n = n + tf.minimum(M, N - n)
+      sum_d += tf.reduce_sum(d)
+      sum_d2 += tf.reduce_sum(tf.square(d))
+
+      # Calculate standard error of the mean, with the finite
+      # population correction of sampling without replacement.
+      n_float = tf.cast(n, tf.float32)
+      mean = sum_d / n_float
+      var = tf.maximum(sum_d2 / n_float - tf.square(mean), 0.0) * \
+          n_float / tf.maximum(n_float - 1.0, 1.0)
+      se = tf.sqrt(var / n_float * (1.0 - (n_float - 1.0) / max(N - 1, 1)))
+      done = tf.logical_or(n >= N,
+                           tf.abs(mean - mu0) > self.threshold * se)
+      return n, sum_d, sum_d2, done
+
+    n, sum_d, _, _ = tf.while_loop(
+        _cond, _body,
+        [tf.constant(0), tf.constant(0.0), tf.constant(0.0),
+         tf.constant(False)])
+
+    # Accept or reject sample.
+    accept = sum_d / tf.cast(n, tf.float32) > mu0
+    sample_values = tf.cond(accept, lambda: list(six.itervalues(new_sample)),
+                            lambda: list(six.itervalues(old_sample)))
+    if not isinstance(sample_values, list):
+      # ``tf.cond`` returns tf.Tensor if output is a list of size 1.
+      sample_values = [sample_values]
+
+    sample = {z: sample_value for z, sample_value in
+              zip(six.iterkeys(new_sample), sample_values)}
+
+    # Update Empirical random variables.
+    assign_ops = self._write_sample(sample)
+
+    assign_ops.append(self.n_data.assign_add(tf.cast(n, tf.float32)))
+    self.data_fraction = self.n_data / \
+        (N * tf.cast(tf.maximum(self.t, 1), tf.float32))
+
+    # Increment n_accept (if accepted).
+    assign_ops.append(self.n_accept.assign_add(tf.select(accept, 1, 0)))
+    return tf.group(*assign_ops)
+
+  def _build_reference(self):
+    """Build op that sets the reference point and calculates the
+    gradient of the log-likelihood at it, over the full data in
+    minibatches."""
+    keys = list(six.iterkeys(self.latent_vars))
+    values = {}
+    for z, qz in six.iteritems(self.latent_vars):
+      if self.reference_values is not None and z in self.reference_values:
+        values[z] = tf.cast(self.reference_values[z], tf.float32)
+      else:
+        values[z] = qz.gather(0)
+
+    N = self.N
+    M = self.batch_size
+    n_batches = (N + M - 1) // M
+
+    def _cond(k, *args):
+      return k < n_batches
+
+    def _body(k, *grads):
+      ref = {z: tf.identity(values[z]) for z in keys}
+      pos = k * M + tf.range(M)
+      valid = tf.cast(pos < N, tf.float32)
+      log_lik = tf.reduce_sum(
+          self._log_lik(ref, tf.minimum(pos, N - 1)) * valid)
+      new_grads = tf.gradients(log_lik, [ref[z] for z in keys])
+      return [k + 1] + [grad if new_grad is None else grad + new_grad
+                        for grad, new_grad in zip(grads, new_grads)]
+
+    loop_vars = [tf.constant(0)] + [tf.zeros_like(values[z]) for z in keys]
+    grads = tf.while_loop(_cond, _body, loop_vars)[1:]
+    assign_ops = []
+    for z, grad in zip(keys, grads):
+      assign_ops.append(self.reference[z].assign(values[z]))
+      assign_ops.append(self.grad_reference[z].assign(grad))
+
+    return tf.group(*assign_ops)
+
+  def _log_lik(self, z_sample, idx):
+    """Log-likelihood of each data point in ``idx``, log p(x_n | z),
+    for inputs z."""
+    self.scope_iter += 1
+    scope = 'likelihood' + str(self.scope_iter)
+    dict_swap = z_sample.copy()
+    for key, value in six.iteritems(self.covariates):
+      dict_swap[key] = tf.gather(value, idx)
+
+    log_lik = 0.0
+    for x, obs in six.iteritems(self.data):
+      if isinstance(x, RandomVariable):
+        x_z = copy(x, dict_swap, scope=scope)
+        log_prob = x_z.log_prob(tf.gather(obs, idx))
+        rank = len(log_prob.get_shape())
+        if rank > 1:
+          log_prob = tf.reduce_sum(log_prob, list(range(1, rank)))
+
+        log_lik += log_prob
+
+    return log_lik
+
+  def _log_prior(self, z_sample):
+    """Log prior density, log p(z), for inputs z."""
+    self.scope_iter += 1
+    scope = 'prior' + str(self.scope_iter)
+    log_prior = 0.0
+    for z, sample in six.iteritems(z_sample):
+      z_copy = copy(z, z_sample, scope=scope)
+      log_prior += tf.reduce_sum(z_copy.log_prob(sample))
+
+    return log_prior
@@ -0,0 +1,250 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import multiprocessing
+import six
+import tensorflow as tf
+
+from edward.inferences.klqp import KLqp
+from edward.models import RandomVariable
+from edward.util import copy, get_session
+
+
+class SVI(KLqp):
+  """Stochastic variational inference (Hoffman et al., 2013) with
+  local and global latent variables.
+
+  Local latent variables are indexed by rows of the data, e.g., the
+  cluster assignment of each data point. The model defines them over
+  a minibatch, and their variational factors are parameterized by
+  tables of variables with a row for each data point. At each step,
+  only the rows of the minibatch are gathered and optimized, with
+  sparse updates to the tables, optionally for several steps before
+  the step of the global variational parameters.
+  """
+  def __init__(self, *args, **kwargs):
+    """
+    Examples
+    --------
+    >>> mu = Normal(mu=tf.zeros([K, D]), sigma=tf.ones([K, D]))
+    >>> z = Categorical(logits=tf.zeros([M, K]))
+    >>> x = Normal(mu=tf.gather(mu, z), sigma=tf.ones([M, D]))
+    >>>
+    >>> qmu = Normal(mu=tf.Variable(tf.zeros([K, D])),
+    ...              sigma=tf.nn.softplus(tf.Variable(tf.zeros([K, D]))))
+    >>> qz = Categorical(logits=tf.Variable(tf.zeros([N, K])))
+    >>>
+    >>> inference = ed.SVI({mu: qmu, z: qz}, data={x: x_train})
+    >>> inference.run(local_vars=[z], n_minibatch=M, n_local_steps=5)
+    """
+    super(SVI, self).__init__(*args, **kwargs)
+
+  def initialize(self, local_vars=None, idx=None, n_data=None,
+                 n_local_steps=0, local_step_size=0.1, *args, **kwargs):
+    """Initialization.
+
+    Parameters
+    ----------
+    local_vars : list of RandomVariable, optional
+      Local latent variables. The outer dimension of each is the
+      minibatch, and the variables parameterizing its variational
+      factor whose outer dimension is the data size are tables of
+      local parameters. Other variables, e.g., shared scales or
+      weights of inference networks, are global. Default is no local
+      variables.
+    idx : tf.Tensor, optional
+      Vector of the data rows of the minibatch, e.g., a placeholder
+      fed with the minibatch. It is required if data is fed, and set
+      internally if ``n_minibatch`` is specified.
+    n_data : int, optional
+      Number of data points. It is required with ``idx``, and set
+      from the data if ``n_minibatch`` is specified.
+    n_local_steps : int, optional
+      Number of gradient steps on the local parameters of the
+      minibatch before each global step, to optimize them closer to
+      convergence given the global parameters.
+    local_step_size : float, optional
+      Learning rate of gradient descent on the local parameters.
+
+    Notes
+    -----
+    If ``n_minibatch`` is specified, the minibatch is drawn with its
+    rows and cached in variables, so that all steps of an iteration
+    use the same minibatch. If ``scale`` is not specified, the log
+    densities of observed variables and of local latent variables and
+    their variational factors are scaled by the ratio of data size to
+    minibatch size, so that the gradients are unbiased estimates of
+    the full data's.
+
+    The global optimizer only updates global variational parameters.
+    Local parameters are updated by gradient descent, which only
+    changes the rows of the minibatch. Their gradients are divided by
+    the scale of their local variable, so that each row follows the
+    gradient of its own terms of the ELBO.
+    """
+    if local_vars is None:
+      local_vars = []
+
+    self.load_minibatch = None
+    n_minibatch = kwargs.get('n_minibatch', None)
+    if n_minibatch is not None:
+      n_data = self._build_minibatch(n_minibatch)
+      kwargs['n_minibatch'] = None
+      if kwargs.get('scale', None) is None:
+        scale = float(n_data) / n_minibatch
+        kwargs['scale'] = {rv: scale for rv in
+                           list(six.iterkeys(self.data)) + local_vars
+                           if isinstance(rv, RandomVariable)}
+    elif idx is not None:
+      if n_data is None:
+        raise ValueError("n_data must be specified with idx.")
+
+      self.idx = idx
+    elif local_vars:
+      raise ValueError("idx must be specified for local variables if "
+                       "n_minibatch is not.")
+
+    self.local_vars = local_vars
+    self.n_local_steps = n_local_steps
+    self.local_step_size = local_step_size
+
+    # Gather the rows of the minibatch from the local parameter tables.
+    variables = {x.name: x for x in
+                 tf.get_default_graph().get_collection(tf.GraphKeys.VARIABLES)}
+    # Dictionary binding each table to its local variable.
+    self.local_variables = {}
+    dict_swap = {}
+    for z in local_vars:
+      for var in _get_local_variables(self.latent_vars[z], variables,
+                                      n_data):
+        if var not in self.local_variables:
+          self.local_variables[var] = z
+          dict_swap[var.value()] = tf.gather(var, self.idx)
+
+    latent_vars = self.latent_vars
+    self.latent_vars = latent_vars.copy()
+    for z in local_vars:
+      self.latent_vars[z] = copy(latent_vars[z], dict_swap, scope='local')
+
+    super(SVI, self).initialize(*args, **kwargs)
+    self.n_minibatch = n_minibatch
+    self.latent_vars = latent_vars
+    self.train = tf.group(self.train, self.train_local)
+
+  def build_loss_and_gradients(self, var_list):
+    """Build the KLqp loss function and its gradients, splitting them
+    into global gradients, which are returned for the optimizer, and
+    local gradients, which are applied by gradient descent in
+    ``train_local``.
+
+    The local gradients are divided by the scale of their local
+    variable. The scaled loss multiplies the terms of each row by it,
+    so it would otherwise multiply the step size of the rows, e.g., by
+    the ratio of data size to minibatch size.
+    """
+    loss, grads_and_vars = super(SVI, self).build_loss_and_gradients(
+        var_list + [var for var in self.local_variables
+                    if var not in var_list])
+    global_grads_and_vars = []
+    local_grads_and_vars = []
+    for grad, var in grads_and_vars:
+      if var in self.local_variables:
+        if grad is not None:
+          scale = self.scale.get(self.local_variables[var], 1.0)
+          if isinstance(grad, tf.IndexedSlices):
+            grad = tf.IndexedSlices(grad.values / scale, grad.indices,
+                                    grad.dense_shape)
+          else:
+            grad = grad / scale
+
+          local_grads_and_vars.append((grad, var))
+      else:
+        global_grads_and_vars.append((grad, var))
+
+    if local_grads_and_vars:
+      optimizer = tf.train.GradientDescentOptimizer(self.local_step_size)
+      self.train_local = optimizer.apply_gradients(local_grads_and_vars)
+    else:
+      self.train_local = tf.no_op()
+
+    return loss, global_grads_and_vars
+
+  def update(self, feed_dict=None):
+    """Run one iteration of stochastic variational inference: draw a
+    minibatch, take ``n_local_steps`` steps on its local parameters,
+    then take a step on the global and local parameters.
+
+    Parameters
+    ----------
+    feed_dict : dict, optional
+      Feed dictionary for a TensorFlow session run. It is used to feed
+      placeholders that are not fed during initialization.
+
+    Returns
+    -------
+    dict
+      Dictionary of algorithm-specific information. In this case, the
+      loss function value after one iteration.
+    """
+    if feed_dict is None:
+      feed_dict = {}
+
+    for key, value in six.iteritems(self.data):
+      if isinstance(key, tf.Tensor):
+        feed_dict[key] = value
+
+    sess = get_session()
+    if self.load_minibatch is not None:
+      sess.run(self.load_minibatch, feed_dict)
+
+    for _ in range(self.n_local_steps):
+      sess.run(self.train_local, feed_dict)
+
+    _, t, loss = sess.run([self.train, self.increment_t, self.loss], feed_dict)
+    return {'t': t, 'loss': loss}
+
+  def _build_minibatch(self, n_minibatch):
+    """Re-assign data to variables holding a minibatch, drawn with its
+    rows ``idx`` by ``load_minibatch``, and return the data size."""
+    values = list(six.itervalues(self.data))
+    n_data = values[0].get_shape()[0].value
+    slices = tf.train.slice_input_producer(values + [tf.range(n_data)])
+    # By default use as many threads as CPUs.
+    batches = tf.train.batch(slices, n_minibatch,
+                             num_threads=multiprocessing.cpu_count())
+
+    caches = [tf.Variable(tf.zeros(batch.get_shape(), dtype=batch.dtype),
+                          trainable=False)
+              for batch in batches]
+    self.load_minibatch = tf.group(*[cache.assign(batch) for cache, batch
+                                     in zip(caches, batches)])
+    self.data = {key: cache for key, cache in
+                 zip(six.iterkeys(self.data), caches)}
+    self.idx = caches[-1]
+    return n_data
+
+
+def _get_local_variables(rv, variables, n_data):
+  """Variables whose outer dimension is the data size that the
+  parameters of ``rv`` depend on."""
+  result = []
+  visited = set()
+  tensors = [value for value in six.itervalues(rv._kwargs)
+             if isinstance(value, tf.Tensor)]
+  while tensors:
+    tensor = tensors.pop()
+    if tensor in visited:
+      continue
+
+    visited.add(tensor)
+    if tensor.name in variables:
+      var = variables[tensor.name]
+      shape = var.get_shape()
+      if var not in result and len(shape) > 0 and \
+         shape[0].value == n_data:
+        result.append(var)
+    else:
+      tensors += list(tensor.op.inputs)
+
+  return result
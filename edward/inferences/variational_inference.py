@@ -63,7 +63,9 @@ class VariationalInference(Inference):
     use_prettytensor : bool, optional
       ``True`` if aim to use TensorFlow optimizer or ``False`` if aim
       to use PrettyTensor optimizer (when using PrettyTensor).
-      Defaults to TensorFlow.
+      Defaults to TensorFlow. The PrettyTensor optimizer
+      differentiates the loss directly, so it does not support
+      baselines, control variates, or natural gradients.
     """
     super(VariationalInference, self).initialize(*args, **kwargs)
     self.loss = tf.constant(0.0)
@@ -101,12 +103,19 @@ class VariationalInference(Inference):
     else:
       raise TypeError()
 
-    loss = self.build_loss()
+    if use_prettytensor and (getattr(self, 'baseline', None) is not None or
+                             getattr(self, 'control_variate', False) or
+                             getattr(self, 'natural_gradient', False)):
+      raise NotImplementedError("PrettyTensor optimizer does not support "
+                                "baselines, control variates, or natural "
+                                "gradients.")
+
     var_list = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES,
                                  scope=scope)
+    loss, grads_and_vars = self.build_loss_and_gradients(var_list)
     if not use_prettytensor:
-      self.train = optimizer.minimize(loss, global_step=global_step,
-                                      var_list=var_list)
+      self.train = optimizer.apply_gradients(grads_and_vars,
+                                             global_step=global_step)
     else:
       if scope is not None:
         raise NotImplementedError("PrettyTensor optimizer does not accept "
@@ -154,6 +163,33 @@ class VariationalInference(Inference):
         string += ': Loss = {0:.3f}'.format(loss)
         print(string)
 
+  def build_loss_and_gradients(self, var_list):
+    """Build loss function and its gradients.
+
+    By default, the gradients are the automatic differentiation of
+    ``build_loss``. Derived classes may override this method to use
+    other gradient estimators.
+
+    Parameters
+    ----------
+    var_list : list of tf.Variable
+      Variables to compute gradients with respect to.
+
+    Returns
+    -------
+    tf.Tensor
+      Loss function, whose automatic differentiation is a (possibly
+      noisier) gradient. It is used by optimizers which take a loss,
+      such as PrettyTensor's.
+    list of tuple
+      Pairs of gradients and variables, for
+      ``tf.train.Optimizer.apply_gradients``.
+    """
+    loss = self.build_loss()
+    grads = tf.gradients(loss, var_list)
+    grads_and_vars = list(zip(grads, var_list))
+    return loss, grads_and_vars
+
   def build_loss(self):
     """Build loss function.
 
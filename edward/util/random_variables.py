@@ -284,6 +284,77 @@ def copy(org_instance, dict_swap=None, scope="copied",
     return ret
 
 
+def get_blanket(x, collection=None):
+  """Get Markov blanket of input, which consists of its parents, its
+  children, and the other parents of its children.
+
+  Parameters
+  ----------
+  x : RandomVariable
+    Query node to find Markov blanket of.
+  collection : list of RandomVariable, optional
+    Random variables to consider as nodes of the graph. Default is
+    all random variables in the graph.
+
+  Returns
+  -------
+  list of RandomVariable
+    Markov blanket of ``x``.
+
+  Examples
+  --------
+  >>> a = Normal(mu=0.0, sigma=1.0)
+  >>> b = Normal(mu=0.0, sigma=1.0)
+  >>> c = Normal(mu=tf.mul(a, b), sigma=1.0)
+  >>> d = Normal(mu=0.0, sigma=1.0)
+  >>> e = Normal(mu=tf.mul(c, d), sigma=1.0)
+  >>> assert set(get_blanket(c)) == set([a, b, d, e])
+  """
+  blanket = []
+  for node in get_parents(x, collection) + get_children(x, collection):
+    if node not in blanket:
+      blanket.append(node)
+
+  for child in get_children(x, collection):
+    for node in get_parents(child, collection):
+      if node is not x and node not in blanket:
+        blanket.append(node)
+
+  return blanket
+
+
+def get_children(x, collection=None):
+  """Get child random variables of input, i.e., random variables
+  whose distribution directly depends on it.
+
+  Parameters
+  ----------
+  x : RandomVariable
+    Query node to find children of.
+  collection : list of RandomVariable, optional
+    Random variables to consider as nodes of the graph. Default is
+    all random variables in the graph.
+
+  Returns
+  -------
+  list of RandomVariable
+    Children of ``x``.
+
+  Examples
+  --------
+  >>> a = Normal(mu=0.0, sigma=1.0)
+  >>> b = Normal(mu=a, sigma=1.0)
+  >>> c = Normal(mu=a, sigma=1.0)
+  >>> assert set(get_children(a)) == set([b, c])
+  """
+  if collection is None:
+    collection = tf.get_default_graph().get_collection(
+        '_random_variable_collection_')
+
+  return [node for node in collection
+          if node is not x and x in get_parents(node, collection)]
+
+
 def get_dims(x):
   """Get values of each dimension.
 
@@ -307,3 +378,61 @@ def get_dims(x):
     return x.get_batch_shape().as_list()
   else:
     raise NotImplementedError()
+
+
+def get_parents(x, collection=None):
+  """Get parent random variables of input, i.e., random variables
+  that its distribution directly depends on.
+
+  The graph is walked from the tensor of ``x``, stopping at the
+  tensor of any random variable.
+
+  Parameters
+  ----------
+  x : RandomVariable
+    Query node to find parents of.
+  collection : list of RandomVariable, optional
+    Random variables to consider as nodes of the graph. Default is
+    all random variables in the graph.
+
+  Returns
+  -------
+  list of RandomVariable
+    Parents of ``x``.
+
+  Raises
+  ------
+  TypeError
+    If ``x`` is not a RandomVariable.
+
+  Examples
+  --------
+  >>> a = Normal(mu=0.0, sigma=1.0)
+  >>> b = Normal(mu=a, sigma=1.0)
+  >>> c = Normal(mu=0.0, sigma=b)
+  >>> assert get_parents(c) == [b]
+  """
+  if not isinstance(x, RandomVariable):
+    raise TypeError("Input must be a RandomVariable: " + str(x))
+
+  if collection is None:
+    collection = tf.get_default_graph().get_collection(
+        '_random_variable_collection_')
+
+  nodes = {node.value(): node for node in collection if node is not x}
+  parents = []
+  visited = set()
+  tensors = list(x.value().op.inputs)
+  while tensors:
+    tensor = tensors.pop()
+    if tensor in visited:
+      continue
+
+    visited.add(tensor)
+    if tensor in nodes:
+      if nodes[tensor] not in parents:
+        parents.append(nodes[tensor])
+    else:
+      tensors += list(tensor.op.inputs)
+
+  return parents
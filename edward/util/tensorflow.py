@@ -7,8 +7,13 @@ import tensorflow as tf
 
 from edward.util.random_variables import get_dims
 from edward.util.graphs import get_session
+from tensorflow.contrib import distributions
 from tensorflow.python.ops import control_flow_ops
 
+# Registry of analytic KL divergences, keyed by pairs of distribution
+# classes; see ``register_kl``.
+_kl_registry = {}
+
 
 def dot(x, y):
   """Compute dot product between a 2-D tensor and a 1-D tensor.
@@ -109,6 +114,52 @@ def hessian(y, xs):
     return tf.pack(mat)
 
 
+def kl_divergence(q, p):
+  """Calculate the KL divergence :math:`\text{KL}(q \| p)` analytically.
+
+  It uses the function registered for the classes of ``q`` and ``p``
+  with ``register_kl``, or else for their closest base classes, in
+  method resolution order. Pairs of the same family are registered
+  for ``Normal``, ``MultivariateNormalDiag``,
+  ``MultivariateNormalFull``, ``Gamma``, ``Beta``, ``Dirichlet``,
+  ``Bernoulli``, ``Categorical``, ``Poisson``, and ``Exponential``,
+  and of diagonal and full covariance multivariate normals.
+
+  Parameters
+  ----------
+  q : tf.contrib.distributions.Distribution
+    Distribution, e.g., a random variable.
+  p : tf.contrib.distributions.Distribution
+    Distribution, e.g., a random variable.
+
+  Returns
+  -------
+  tf.Tensor
+    Tensor of the batch shape of the distributions, where each
+    element is the KL divergence of the corresponding distributions
+    in the batch.
+
+  Raises
+  ------
+  NotImplementedError
+    If no KL divergence is registered for the pair of classes.
+
+  Examples
+  --------
+  >>> q = Normal(mu=tf.zeros(5), sigma=tf.ones(5))
+  >>> p = Normal(mu=tf.ones(5), sigma=tf.ones(5))
+  >>> kl_divergence(q, p).eval()
+  array([ 0.5,  0.5,  0.5,  0.5,  0.5], dtype=float32)
+  """
+  kl_fn = _get_kl(type(q), type(p))
+  if kl_fn is None:
+    raise NotImplementedError(
+        "No analytic KL divergence is registered for {} and {}.".format(
+            type(q).__name__, type(p).__name__))
+
+  return kl_fn(q, p)
+
+
 def kl_multivariate_normal(loc_one, scale_one, loc_two=0.0, scale_two=1.0):
   """Calculate the KL of multivariate normal distributions with
   diagonal covariances.
@@ -364,6 +415,37 @@ def rbf(x, y=0.0, sigma=1.0, l=1.0):
       tf.exp(-1.0 / (2.0 * tf.pow(l, 2.0)) * tf.pow(x - y, 2.0))
 
 
+def register_kl(q_class, p_class):
+  """Decorator to register a function as the analytic KL divergence
+  of a pair of distribution classes, for ``kl_divergence``.
+
+  Parameters
+  ----------
+  q_class : type
+    Class of the first argument of the KL divergence.
+  p_class : type
+    Class of the second argument of the KL divergence.
+
+  Returns
+  -------
+  function
+    Decorator, which registers the function ``kl_fn(q, p)`` and
+    returns it unchanged. The function returns a tensor of the batch
+    shape of the distributions.
+
+  Examples
+  --------
+  >>> @register_kl(Laplace, Laplace)
+  ... def kl_laplace(q, p):
+  ...   ...
+  """
+  def decorator(kl_fn):
+    _kl_registry[q_class, p_class] = kl_fn
+    return kl_fn
+
+  return decorator
+
+
 def tile(input, multiples, *args, **kwargs):
   """Constructs a tensor by tiling a given tensor.
 
@@ -514,3 +596,121 @@ def to_simplex(x):
     piu = tf.concat(1, [tf.ones([n_rows, 1]), 1.0 - z])
     S = tf.cumprod(piu, axis=1)
     return S * pil
+
+
+def _get_kl(q_class, p_class):
+  """Get the registered KL divergence of the closest pair of classes."""
+  for q_base in q_class.__mro__:
+    for p_base in p_class.__mro__:
+      kl_fn = _kl_registry.get((q_base, p_base), None)
+      if kl_fn is not None:
+        return kl_fn
+
+  return None
+
+
+def _log_softmax(logits):
+  """Normalize logits to log probabilities along the last dimension."""
+  axis = len(logits.get_shape()) - 1
+  logits_max = tf.reduce_max(logits, axis, keep_dims=True)
+  return logits - logits_max - tf.log(tf.reduce_sum(
+      tf.exp(logits - logits_max), axis, keep_dims=True))
+
+
+@register_kl(distributions.Normal, distributions.Normal)
+def _kl_normal_normal(q, p):
+  return tf.log(p.sigma) - tf.log(q.sigma) + \
+      0.5 * (tf.square(q.sigma) + tf.square(q.mu - p.mu)) / \
+      tf.square(p.sigma) - 0.5
+
+
+@register_kl(distributions.MultivariateNormalDiag,
+             distributions.MultivariateNormalDiag)
+def _kl_mvn_diag_mvn_diag(q, p):
+  q_var = tf.matrix_diag_part(q.sigma)
+  p_var = tf.matrix_diag_part(p.sigma)
+  return 0.5 * tf.reduce_sum(
+      tf.log(p_var) - tf.log(q_var) +
+      (q_var + tf.square(q.mu - p.mu)) / p_var - 1.0,
+      len(q.mu.get_shape()) - 1)
+
+
+@register_kl(distributions.MultivariateNormalDiag,
+             distributions.MultivariateNormalFull)
+@register_kl(distributions.MultivariateNormalFull,
+             distributions.MultivariateNormalDiag)
+@register_kl(distributions.MultivariateNormalFull,
+             distributions.MultivariateNormalFull)
+def _kl_mvn_mvn(q, p):
+  # Use Cholesky factors L of the covariances, where
+  # tr(S_p^{-1} S_q) = ||L_p^{-1} L_q||^2 and the Mahalanobis distance
+  # is ||L_p^{-1} (mu_p - mu_q)||^2.
+  q_chol = tf.cholesky(q.sigma)
+  p_chol = tf.cholesky(p.sigma)
+  axis = len(q.mu.get_shape()) - 1
+  trace = tf.reduce_sum(tf.square(
+      tf.matrix_triangular_solve(p_chol, q_chol)), [axis, axis + 1])
+  mahalanobis = tf.reduce_sum(tf.square(tf.matrix_triangular_solve(
+      p_chol, tf.expand_dims(p.mu - q.mu, axis + 1))), [axis, axis + 1])
+  log_det_ratio = 2.0 * tf.reduce_sum(
+      tf.log(tf.matrix_diag_part(p_chol)) -
+      tf.log(tf.matrix_diag_part(q_chol)), axis)
+  n_dims = tf.cast(tf.shape(q.mu)[axis], q.mu.dtype)
+  return 0.5 * (trace + mahalanobis - n_dims + log_det_ratio)
+
+
+@register_kl(distributions.Gamma, distributions.Gamma)
+def _kl_gamma_gamma(q, p):
+  return (q.alpha - p.alpha) * tf.digamma(q.alpha) - \
+      tf.lgamma(q.alpha) + tf.lgamma(p.alpha) + \
+      p.alpha * (tf.log(q.beta) - tf.log(p.beta)) + \
+      q.alpha * (p.beta - q.beta) / q.beta
+
+
+@register_kl(distributions.Exponential, distributions.Exponential)
+def _kl_exponential_exponential(q, p):
+  return tf.log(q.lam) - tf.log(p.lam) + p.lam / q.lam - 1.0
+
+
+@register_kl(distributions.Beta, distributions.Beta)
+def _kl_beta_beta(q, p):
+  q_sum = q.a + q.b
+  p_sum = p.a + p.b
+  return tf.lgamma(q_sum) - tf.lgamma(q.a) - tf.lgamma(q.b) - \
+      tf.lgamma(p_sum) + tf.lgamma(p.a) + tf.lgamma(p.b) + \
+      (q.a - p.a) * tf.digamma(q.a) + (q.b - p.b) * tf.digamma(q.b) + \
+      (p_sum - q_sum) * tf.digamma(q_sum)
+
+
+@register_kl(distributions.Dirichlet, distributions.Dirichlet)
+def _kl_dirichlet_dirichlet(q, p):
+  axis = len(q.alpha.get_shape()) - 1
+  q_sum = tf.reduce_sum(q.alpha, axis)
+  p_sum = tf.reduce_sum(p.alpha, axis)
+  return tf.lgamma(q_sum) - tf.lgamma(p_sum) + tf.reduce_sum(
+      tf.lgamma(p.alpha) - tf.lgamma(q.alpha) +
+      (q.alpha - p.alpha) *
+      (tf.digamma(q.alpha) - tf.digamma(tf.expand_dims(q_sum, axis))),
+      axis)
+
+
+@register_kl(distributions.Bernoulli, distributions.Bernoulli)
+def _kl_bernoulli_bernoulli(q, p):
+  # Use log(p) = -softplus(-logits) and log(1 - p) = -softplus(logits)
+  # for numerical stability.
+  q_p = tf.sigmoid(q.logits)
+  return q_p * (tf.nn.softplus(-p.logits) - tf.nn.softplus(-q.logits)) + \
+      (1.0 - q_p) * (tf.nn.softplus(p.logits) - tf.nn.softplus(q.logits))
+
+
+@register_kl(distributions.Categorical, distributions.Categorical)
+def _kl_categorical_categorical(q, p):
+  q_log_p = _log_softmax(q.logits)
+  p_log_p = _log_softmax(p.logits)
+  return tf.reduce_sum(tf.exp(q_log_p) * (q_log_p - p_log_p),
+                       len(q.logits.get_shape()) - 1)
+
+
+@register_kl(distributions.Poisson, distributions.Poisson)
+def _kl_poisson_poisson(q, p):
+  return q.lam * (tf.log(q.lam) - tf.log(p.lam)) - q.lam + p.lam
@@ -0,0 +1,111 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.criticisms import autocorrelation, effective_sample_size, \
+    pareto_k, potential_scale_reduction
+from edward.models import Empirical, Normal
+
+
+def _autocorrelation(x):
+  n = x.shape[0]
+  x = x - x.mean()
+  acov = np.array([np.sum(x[:n - t] * x[t:]) for t in range(n)]) / n
+  return acov / acov[0]
+
+
+def _effective_sample_size(x):
+  n = x.shape[0]
+  within = np.var(x, ddof=1)
+  var_plus = (n - 1.0) / n * within
+  acov = _autocorrelation(x) * np.var(x)
+  rho = 1.0 - (within - acov) / var_plus
+  tau = -1.0
+  for k in range(n // 2):
+    pair = rho[2 * k] + rho[2 * k + 1]
+    if pair <= 0.0:
+      break
+    tau += 2.0 * pair
+
+  return n / tau
+
+
+def _pareto_k(log_weights):
+  n = log_weights.shape[0]
+  m = int(min(n / 5.0, 3.0 * np.sqrt(n)))
+  top = np.sort(log_weights)[::-1][:m + 1]
+  x = np.sort(np.exp(top[:m] - top[0]) - np.exp(top[m] - top[0]))
+  n_grid = 30 + int(np.sqrt(m))
+  b = 1.0 - np.sqrt(n_grid / (np.arange(1, n_grid + 1) - 0.5))
+  b = b / (3.0 * x[int(m / 4.0 + 0.5) - 1]) + 1.0 / x[-1]
+  k = np.mean(np.log1p(-b[:, None] * x), 1)
+  log_lik = m * (np.log(-b / k) - k - 1.0)
+  weights = 1.0 / np.sum(np.exp(log_lik - log_lik[:, None]), 1)
+  k_post = np.mean(np.log1p(-np.sum(b * weights) * x))
+  return (m * k_post + 10.0 * 0.5) / (m + 10.0)
+
+
+def _potential_scale_reduction(chains):
+  half = chains.shape[1] // 2
+  chains = np.concatenate([chains[:, :half], chains[:, -half:]])
+  n = chains.shape[1]
+  within = np.mean(np.var(chains, 1, ddof=1))
+  between = n * np.var(np.mean(chains, 1), ddof=1)
+  var_plus = (n - 1.0) / n * within + between / n
+  return np.sqrt(var_plus / within)
+
+
+class test_diagnostics_class(tf.test.TestCase):
+
+  def test_autocorrelation(self):
+    with self.test_session():
+      x = np.random.randn(50, 3).astype(np.float32)
+      val_est = autocorrelation(x).eval()
+      for d in range(3):
+        self.assertAllClose(val_est[:, d], _autocorrelation(x[:, d]),
+                            atol=1e-4)
+
+  def test_effective_sample_size(self):
+    with self.test_session():
+      x = np.cumsum(np.random.randn(100, 2), 0).astype(np.float32)
+      qx = Empirical(params=tf.constant(x))
+      val_est = effective_sample_size(qx).eval()
+      for d in range(2):
+        self.assertAllClose(val_est[d], _effective_sample_size(x[:, d]),
+                            rtol=1e-3)
+
+  def test_effective_sample_size_few_samples(self):
+    with self.test_session():
+      z = Normal(mu=0.0, sigma=1.0)
+      qz = Empirical(params=tf.Variable(tf.zeros(10)))
+      inference = ed.MetropolisHastings({z: qz}, {z: Normal(mu=z, sigma=1.0)})
+      inference.initialize(n_diagnose=1, target_ess=1e6)
+      tf.initialize_all_variables().run()
+      # The effective sample size is only computed from 4 samples on.
+      for _ in range(3):
+        self.assertNotIn('ess', inference.update())
+
+      info_dict = inference.update()
+      self.assertFalse(np.isnan(info_dict['ess']))
+      self.assertNotIn('stop', info_dict)
+
+  def test_pareto_k(self):
+    with self.test_session():
+      log_weights = np.random.standard_t(3, 1000).astype(np.float32)
+      val_est = pareto_k(log_weights).eval()
+      self.assertAllClose(val_est, _pareto_k(log_weights), atol=1e-3)
+
+  def test_potential_scale_reduction(self):
+    with self.test_session():
+      chains = np.random.randn(4, 51).astype(np.float32)
+      chains[0] += 3.0
+      val_est = potential_scale_reduction(list(chains)).eval()
+      self.assertAllClose(val_est, _potential_scale_reduction(chains),
+                          rtol=1e-4)
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -0,0 +1,52 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.models import Empirical, Normal
+
+
+class test_adaptive_metropolis_hastings_class(tf.test.TestCase):
+
+  def _normal_normal(self, n_samples):
+    mu = Normal(mu=tf.zeros(2), sigma=tf.ones(2))
+    x = Normal(mu=tf.ones([10, 2]) * mu, sigma=tf.ones([10, 2]))
+    qmu = Empirical(params=tf.Variable(tf.zeros([n_samples, 2])))
+    x_data = np.ones([10, 2], dtype=np.float32)
+    inference = ed.AdaptiveMetropolisHastings({mu: qmu}, data={x: x_data})
+    return qmu, inference
+
+  def test_normal_normal(self):
+    with self.test_session():
+      tf.set_random_seed(42)
+      qmu, inference = self._normal_normal(4000)
+      inference.run(n_adapt=1000)
+
+      # The posterior is N(10 / 11, 1 / 11) in each dimension.
+      samples = qmu.params.eval()[1000:]
+      self.assertAllClose(np.mean(samples, 0), [10.0 / 11.0] * 2, atol=0.1)
+      self.assertAllClose(np.var(samples, 0), [1.0 / 11.0] * 2, atol=0.05)
+
+  def test_running_covariance(self):
+    with self.test_session():
+      tf.set_random_seed(42)
+      qmu, inference = self._normal_normal(200)
+      inference.initialize(n_adapt=150, n_initial=50)
+      tf.initialize_all_variables().run()
+      for _ in range(200):
+        inference.update()
+
+      # The running mean and covariance are those of the samples
+      # drawn while adapting.
+      samples = qmu.params.eval()[:150]
+      self.assertAllClose(inference.n_samples.eval(), 150.0)
+      self.assertAllClose(inference.sample_mean.eval(), np.mean(samples, 0),
+                          atol=1e-4)
+      self.assertAllClose(inference.sample_cov.eval(),
+                          np.cov(samples, rowvar=False), atol=1e-4)
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -0,0 +1,68 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.models import Bernoulli, Beta, Normal
+
+
+class test_cavi_class(tf.test.TestCase):
+
+  def test_beta_bernoulli(self):
+    with self.test_session():
+      p = Beta(a=1.0, b=1.0)
+      x = Bernoulli(p=tf.ones(10) * p)
+
+      qp = Beta(a=tf.Variable(1.0), b=tf.Variable(1.0))
+      x_data = np.array([0, 1, 0, 0, 0, 0, 0, 0, 0, 1], dtype=np.int32)
+      inference = ed.CAVI({p: qp}, data={x: x_data})
+      inference.initialize()
+      tf.initialize_all_variables().run()
+      inference.update()
+
+      # The factor is the exact posterior after one update.
+      self.assertAllClose(qp.a.eval(), 3.0, atol=1e-3)
+      self.assertAllClose(qp.b.eval(), 9.0, atol=1e-3)
+
+  def test_normal_normal(self):
+    with self.test_session():
+      mu = Normal(mu=tf.zeros(2), sigma=tf.ones(2))
+      x = Normal(mu=tf.ones([5, 2]) * mu, sigma=tf.ones([5, 2]))
+
+      qmu = Normal(mu=tf.Variable(tf.zeros(2)), sigma=tf.Variable(tf.ones(2)))
+      x_data = np.ones([5, 2], dtype=np.float32)
+      inference = ed.CAVI({mu: qmu}, data={x: x_data})
+      inference.initialize()
+      tf.initialize_all_variables().run()
+      inference.update()
+
+      self.assertAllClose(qmu.mu.eval(), [5.0 / 6.0] * 2, atol=1e-3)
+      self.assertAllClose(qmu.sigma.eval(), [np.sqrt(1.0 / 6.0)] * 2,
+                          atol=1e-3)
+
+  def test_stochastic_local_scale(self):
+    with self.test_session():
+      p = Beta(a=1.0, b=1.0)
+      z = Bernoulli(p=tf.ones(2) * p)
+      x = Bernoulli(p=tf.ones(2) * p)
+
+      qp = Beta(a=tf.Variable(1.0), b=tf.Variable(1.0))
+      qz = Bernoulli(p=tf.Variable(0.5 * tf.ones(2)))
+      x_data = np.array([0, 1], dtype=np.int32)
+      inference = ed.StochasticCAVI({p: qp, z: qz}, data={x: x_data})
+      self.assertRaises(ValueError, inference.initialize, tau=0.0,
+                        local_vars=[z])
+      inference.initialize(local_vars=[z], scale={x: 5.0, z: 5.0})
+
+      # Local latent variables are scaled in the conditionals of global
+      # variables, and their own conditionals are not tempered.
+      self.assertEqual(inference._scale(p, z), 5.0)
+      self.assertEqual(inference._scale(p, x), 5.0)
+      self.assertEqual(inference._scale(z, z), 1.0)
+      self.assertEqual(inference._scale(z, x), 1.0)
+
+if __name__ == '__main__':
+  tf.test.main()
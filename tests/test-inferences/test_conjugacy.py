@@ -0,0 +1,134 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import tensorflow as tf
+
+from edward.inferences import complete_conditional, is_conjugate
+from edward.models import Bernoulli, Beta, Categorical, Dirichlet, Gamma, \
+    InverseGamma, Normal, Poisson
+from edward.util import copy
+
+
+def _log_prob_fn(z, x, x_data):
+  def log_prob(value):
+    # Copy into a new scope for each value.
+    scope = 'conditional/' + value.op.name
+    z_copy = copy(z, {z: value}, scope=scope)
+    x_copy = copy(x, {z: value}, scope=scope)
+    return [z_copy.log_prob(value), x_copy.log_prob(x_data)]
+
+  return log_prob
+
+
+class test_conjugacy_class(tf.test.TestCase):
+
+  def test_beta_bernoulli(self):
+    with self.test_session():
+      p = Beta(a=2.0, b=3.0)
+      x = Bernoulli(p=tf.ones(10) * p)
+      x_data = tf.constant([0, 1, 0, 0, 0, 0, 0, 0, 0, 1])
+      cond = complete_conditional(p, _log_prob_fn(p, x, x_data))
+      self.assertIsInstance(cond, Beta)
+      self.assertAllClose(cond.a.eval(), 4.0, atol=1e-3)
+      self.assertAllClose(cond.b.eval(), 11.0, atol=1e-3)
+
+  def test_gamma_poisson(self):
+    with self.test_session():
+      lam = Gamma(alpha=tf.constant([1.0, 2.0]), beta=tf.constant(0.5))
+      x = Poisson(lam=tf.ones([3, 2]) * lam)
+      x_data = np.array([[1, 0], [2, 4], [0, 3]], dtype=np.float32)
+      cond = complete_conditional(lam, _log_prob_fn(lam, x, x_data))
+      self.assertIsInstance(cond, Gamma)
+      self.assertAllClose(cond.alpha.eval(), [4.0, 9.0], atol=1e-3)
+      self.assertAllClose(cond.beta.eval(), [3.5, 3.5], atol=1e-3)
+
+  def test_normal_normal(self):
+    with self.test_session():
+      mu = Normal(mu=tf.zeros(2), sigma=tf.ones(2))
+      x = Normal(mu=tf.ones([5, 2]) * mu, sigma=tf.ones([5, 2]))
+      x_data = np.ones([5, 2], dtype=np.float32)
+      cond = complete_conditional(mu, _log_prob_fn(mu, x, x_data))
+      self.assertAllClose(cond.mu.eval(), [5.0 / 6.0] * 2, atol=1e-3)
+      self.assertAllClose(cond.sigma.eval(), np.eye(2) / 6.0, atol=1e-3)
+
+  def test_categorical(self):
+    with self.test_session():
+      c = Categorical(logits=tf.zeros([4, 3]))
+      mus = tf.constant([-1.0, 0.0, 1.0])
+      x = Normal(mu=tf.gather(mus, c), sigma=tf.ones(4))
+      x_data = np.array([-1.0, 0.0, 1.0, 5.0], dtype=np.float32)
+      cond = complete_conditional(c, _log_prob_fn(c, x, x_data))
+      logits = -0.5 * np.square(x_data[:, np.newaxis] - [-1.0, 0.0, 1.0])
+      val_est = cond.logits.eval()
+      self.assertAllClose(val_est - val_est[:, :1], logits - logits[:, :1],
+                          atol=1e-3)
+
+  def test_is_conjugate(self):
+    with self.test_session():
+      mu = Normal(mu=tf.zeros(2), sigma=tf.ones(2))
+      x_linear = Normal(mu=tf.ones([5, 2]) * mu, sigma=tf.ones([5, 2]))
+      x_nonlinear = Normal(mu=tf.exp(mu), sigma=tf.ones(2))
+      x_scale = Normal(mu=tf.zeros(2), sigma=tf.exp(mu))
+      self.assertTrue(is_conjugate(mu, [x_linear]))
+      self.assertFalse(is_conjugate(mu, [x_nonlinear]))
+      self.assertFalse(is_conjugate(mu, [x_scale]))
+
+      lam = Gamma(alpha=1.0, beta=1.0)
+      x_rate = Poisson(lam=tf.ones(3) * lam)
+      x_mean = Normal(mu=tf.ones(3) * lam, sigma=tf.ones(3))
+      self.assertTrue(is_conjugate(lam, [x_rate]))
+      self.assertFalse(is_conjugate(lam, [x_mean]))
+
+      c = Categorical(logits=tf.zeros([4, 3]))
+      mus = tf.constant([-1.0, 0.0, 1.0])
+      x_elementwise = Normal(mu=tf.gather(mus, c), sigma=tf.ones(4))
+      x_joint = Normal(mu=tf.reduce_sum(tf.gather(mus, c)), sigma=1.0)
+      self.assertTrue(is_conjugate(c, [x_elementwise]))
+      self.assertFalse(is_conjugate(c, [x_joint]))
+
+  def test_is_conjugate_transforms(self):
+    with self.test_session():
+      tau = Gamma(alpha=1.0, beta=1.0)
+      x_precision = Normal(mu=tf.zeros(3), sigma=tf.ones(3) * tf.rsqrt(tau))
+      x_std = Normal(mu=tf.zeros(3), sigma=tf.ones(3) * tau)
+      x_variance = Normal(mu=tf.zeros(3), sigma=tf.ones(3) * tf.sqrt(tau))
+      self.assertTrue(is_conjugate(tau, [x_precision]))
+      self.assertFalse(is_conjugate(tau, [x_std]))
+      self.assertFalse(is_conjugate(tau, [x_variance]))
+
+      sigma_sq = InverseGamma(alpha=1.0, beta=1.0)
+      x_variance = Normal(mu=tf.zeros(3),
+                          sigma=tf.ones(3) * tf.sqrt(sigma_sq))
+      x_std = Normal(mu=tf.zeros(3), sigma=tf.ones(3) * sigma_sq)
+      x_precision = Normal(mu=tf.zeros(3),
+                           sigma=tf.ones(3) * tf.rsqrt(sigma_sq))
+      self.assertTrue(is_conjugate(sigma_sq, [x_variance]))
+      self.assertFalse(is_conjugate(sigma_sq, [x_std]))
+      self.assertFalse(is_conjugate(sigma_sq, [x_precision]))
+
+      p = Beta(a=1.0, b=1.0)
+      x_p = Bernoulli(p=tf.ones(3) * p)
+      x_scaled = Bernoulli(p=0.5 * p)
+      self.assertTrue(is_conjugate(p, [x_p]))
+      self.assertFalse(is_conjugate(p, [x_scaled]))
+
+      lam = Gamma(alpha=1.0, beta=1.0)
+      x_scaled = Poisson(lam=2.0 * lam)
+      x_exp = Poisson(lam=tf.exp(lam))
+      x_bypass = Poisson(lam=lam * lam)
+      self.assertTrue(is_conjugate(lam, [x_scaled]))
+      self.assertFalse(is_conjugate(lam, [x_exp]))
+      self.assertFalse(is_conjugate(lam, [x_bypass]))
+
+      pi = Dirichlet(alpha=tf.ones(3))
+      x_p = Categorical(p=tf.ones([4, 3]) * pi)
+      x_log = Categorical(logits=tf.ones([4, 3]) * tf.log(pi))
+      x_logits = Categorical(logits=tf.ones([4, 3]) * pi)
+      self.assertTrue(is_conjugate(pi, [x_p]))
+      self.assertTrue(is_conjugate(pi, [x_log]))
+      self.assertFalse(is_conjugate(pi, [x_logits]))
+
+if __name__ == '__main__':
+  tf.test.main()
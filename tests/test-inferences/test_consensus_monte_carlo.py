@@ -0,0 +1,43 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import tensorflow as tf
+
+from edward.inferences.consensus_monte_carlo import _consensus, \
+    _semiparametric
+
+
+class test_consensus_monte_carlo_class(tf.test.TestCase):
+
+  def test_consensus(self):
+    np.random.seed(42)
+    base = np.random.randn(1000, 2)
+    # Subposteriors with the same covariance have equal weights.
+    thetas = [base + 1.0, base - 1.0]
+    theta = _consensus(thetas, 1500)
+    self.assertEqual(theta.shape, (1500, 2))
+    self.assertAllClose(theta[:1000], base)
+    self.assertAllClose(theta[1000:], base[:500])
+
+  def test_consensus_precision_weighted(self):
+    np.random.seed(42)
+    base = np.random.randn(1000, 1)
+    # Precisions 1 and 1/4 weight the subposteriors by 4/5 and 1/5.
+    thetas = [base + 1.0, 2.0 * base - 1.0]
+    theta = _consensus(thetas, 1000)
+    self.assertAllClose(theta, 0.8 * (base + 1.0) + 0.2 * (2.0 * base - 1.0))
+
+  def test_semiparametric(self):
+    np.random.seed(42)
+    # The product of N(1, 1) and N(-1, 1) is N(0, 1/2).
+    thetas = [np.random.randn(2000, 1) + 1.0,
+              np.random.randn(2000, 1) - 1.0]
+    theta = _semiparametric(thetas, 2000)
+    self.assertEqual(theta.shape, (2000, 1))
+    self.assertAllClose(np.mean(theta), 0.0, atol=0.1)
+    self.assertAllClose(np.var(theta), 0.5, atol=0.2)
+
+if __name__ == '__main__':
+  tf.test.main()
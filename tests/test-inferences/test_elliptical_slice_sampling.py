@@ -0,0 +1,56 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.models import Empirical, Gamma, MultivariateNormalFull, Normal
+
+
+class test_elliptical_slice_sampling_class(tf.test.TestCase):
+
+  def test_normal_normal(self):
+    with self.test_session():
+      tf.set_random_seed(42)
+      mu = Normal(mu=0.0, sigma=1.0)
+      x = Normal(mu=tf.ones(10) * mu, sigma=tf.ones(10))
+
+      qmu = Empirical(params=tf.Variable(tf.zeros(2000)))
+      x_data = np.ones(10, dtype=np.float32)
+      inference = ed.EllipticalSliceSampling({mu: qmu}, data={x: x_data})
+      inference.run()
+
+      # The posterior is N(10 / 11, 1 / 11).
+      samples = qmu.params.eval()[500:]
+      self.assertAllClose(np.mean(samples), 10.0 / 11.0, atol=0.1)
+      self.assertAllClose(np.var(samples), 1.0 / 11.0, atol=0.05)
+
+  def test_multivariate_normal(self):
+    with self.test_session():
+      tf.set_random_seed(42)
+      sigma = np.array([[1.0, 0.5], [0.5, 1.0]], dtype=np.float32)
+      f = MultivariateNormalFull(mu=tf.zeros(2), sigma=sigma)
+      x = Normal(mu=f, sigma=tf.ones(2))
+
+      qf = Empirical(params=tf.Variable(tf.zeros([2000, 2])))
+      x_data = np.array([1.0, -1.0], dtype=np.float32)
+      inference = ed.EllipticalSliceSampling({f: qf}, data={x: x_data})
+      inference.run()
+
+      cov = np.linalg.inv(np.linalg.inv(sigma) + np.eye(2))
+      samples = qf.params.eval()[500:]
+      self.assertAllClose(np.mean(samples, 0), np.dot(cov, x_data),
+                          atol=0.1)
+      self.assertAllClose(np.cov(samples, rowvar=False), cov, atol=0.05)
+
+  def test_non_gaussian_prior(self):
+    with self.test_session():
+      z = Gamma(alpha=1.0, beta=1.0)
+      qz = Empirical(params=tf.Variable(tf.ones(100)))
+      inference = ed.EllipticalSliceSampling({z: qz})
+      self.assertRaises(TypeError, inference.initialize)
+
+if __name__ == '__main__':
+  tf.test.main()
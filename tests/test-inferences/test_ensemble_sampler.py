@@ -0,0 +1,43 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.models import Empirical, Normal
+
+
+class test_ensemble_sampler_class(tf.test.TestCase):
+
+  def test_normal_normal(self):
+    with self.test_session():
+      tf.set_random_seed(42)
+      mu = Normal(mu=0.0, sigma=1.0)
+      x = Normal(mu=tf.ones(10) * mu, sigma=tf.ones(10))
+
+      qmu = Empirical(params=tf.Variable(tf.zeros(8000)))
+      x_data = np.ones(10, dtype=np.float32)
+      inference = ed.EnsembleSampler({mu: qmu}, data={x: x_data})
+      inference.run(n_walkers=4)
+
+      # The posterior is N(10 / 11, 1 / 11).
+      samples = qmu.params.eval()
+      self.assertAllClose(np.mean(samples[2000:]), 10.0 / 11.0, atol=0.1)
+      self.assertAllClose(np.var(samples[2000:]), 1.0 / 11.0, atol=0.05)
+
+      # Each iteration stores the state of all walkers.
+      self.assertEqual(inference.n_iter, 2000)
+      self.assertAllClose(samples[-4:], inference.walkers[mu].eval())
+
+  def test_vectorized(self):
+    with self.test_session():
+      mu = Normal(mu=0.0, sigma=1.0)
+      qmu = Empirical(params=tf.Variable(tf.zeros(100)))
+      inference = ed.EnsembleSampler({mu: qmu})
+      self.assertRaises(NotImplementedError, inference.initialize,
+                        vectorized=True)
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -0,0 +1,58 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.models import Bernoulli, Beta, Empirical, Gamma, Normal
+
+
+class test_gibbs_class(tf.test.TestCase):
+
+  def test_beta_bernoulli(self):
+    with self.test_session():
+      tf.set_random_seed(42)
+      p = Beta(a=1.0, b=1.0)
+      x = Bernoulli(p=tf.ones(10) * p)
+
+      qp = Empirical(params=tf.Variable(tf.zeros(2000)))
+      x_data = np.array([0, 1, 0, 0, 0, 0, 0, 0, 0, 1], dtype=np.int32)
+      inference = ed.Gibbs({p: qp}, data={x: x_data})
+      inference.run()
+
+      # The posterior is Beta(3, 9).
+      samples = qp.params.eval()
+      self.assertAllClose(np.mean(samples), 0.25, atol=0.02)
+      self.assertAllClose(np.var(samples), 27.0 / (144.0 * 13.0),
+                          atol=0.005)
+
+  def test_normal_normal(self):
+    with self.test_session():
+      tf.set_random_seed(42)
+      mu = Normal(mu=0.0, sigma=1.0)
+      x = Normal(mu=tf.ones(10) * mu, sigma=tf.ones(10))
+
+      qmu = Empirical(params=tf.Variable(tf.zeros(2000)))
+      x_data = np.ones(10, dtype=np.float32)
+      inference = ed.Gibbs({mu: qmu}, data={x: x_data})
+      inference.run()
+
+      # The posterior is N(10 / 11, 1 / 11).
+      samples = qmu.params.eval()
+      self.assertAllClose(np.mean(samples), 10.0 / 11.0, atol=0.05)
+      self.assertAllClose(np.var(samples), 1.0 / 11.0, atol=0.02)
+
+  def test_not_conjugate(self):
+    with self.test_session():
+      sigma = Gamma(alpha=1.0, beta=1.0)
+      x = Normal(mu=tf.zeros(10), sigma=tf.ones(10) * sigma)
+
+      qsigma = Empirical(params=tf.Variable(tf.ones(100)))
+      x_data = np.ones(10, dtype=np.float32)
+      inference = ed.Gibbs({sigma: qsigma}, data={x: x_data})
+      self.assertRaises(ValueError, inference.initialize)
+
+if __name__ == '__main__':
+  tf.test.main()
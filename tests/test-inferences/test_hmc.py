@@ -0,0 +1,71 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.inferences.hmc import _adaptation_windows, leapfrog
+from edward.models import Empirical, Normal
+
+
+def _log_joint(z_sample):
+  # Standard normal.
+  return -0.5 * tf.reduce_sum(tf.square(z_sample['z']))
+
+
+class test_hmc_class(tf.test.TestCase):
+
+  def test_adaptation_windows(self):
+    self.assertEqual(_adaptation_windows(1000),
+                     (75, [100, 150, 250, 450, 950]))
+    # Short warm-up shrinks the buffers and keeps a terminal buffer.
+    self.assertEqual(_adaptation_windows(30), (4, [27]))
+    # Very short warm-up only adapts the step size.
+    self.assertEqual(_adaptation_windows(5), (0, []))
+
+  def test_leapfrog_energy(self):
+    with self.test_session():
+      z = {'z': tf.constant([1.0, -0.5])}
+      r = {'z': tf.constant([0.3, 0.8])}
+      z_new, r_new, log_joint_new, log_joint_old = leapfrog(
+          z, r, 0.05, _log_joint, 100)
+      energy_old = -log_joint_old + 0.5 * tf.reduce_sum(tf.square(r['z']))
+      energy_new = -log_joint_new + \
+          0.5 * tf.reduce_sum(tf.square(r_new['z']))
+      self.assertAllClose(energy_new.eval(), energy_old.eval(), atol=2e-3)
+      # The trajectory moved along the level set of the energy.
+      self.assertGreater(np.sum(np.abs(z_new['z'].eval() - [1.0, -0.5])),
+                         0.1)
+
+  def test_leapfrog_reversible(self):
+    with self.test_session():
+      z = {'z': tf.constant([1.0, -0.5])}
+      r = {'z': tf.constant([0.3, 0.8])}
+      z_new, r_new, _, _ = leapfrog(z, r, 0.1, _log_joint, 20)
+      z_back, r_back, _, _ = leapfrog(z_new, {'z': -r_new['z']}, 0.1,
+                                      _log_joint, 20)
+      self.assertAllClose(z_back['z'].eval(), [1.0, -0.5], atol=1e-5)
+      self.assertAllClose(r_back['z'].eval(), [-0.3, -0.8], atol=1e-5)
+
+  def test_step_size_adaptation(self):
+    with self.test_session():
+      tf.set_random_seed(42)
+      mu = Normal(mu=0.0, sigma=1.0)
+      x = Normal(mu=tf.ones(10) * mu, sigma=tf.ones(10))
+
+      qmu = Empirical(params=tf.Variable(tf.zeros(2000)))
+      x_data = np.ones(10, dtype=np.float32)
+      inference = ed.HMC({mu: qmu}, data={x: x_data})
+      inference.initialize(step_size=1.0, n_warmup=500, target_accept=0.65,
+                           mass_matrix=None)
+      tf.initialize_all_variables().run()
+      for _ in range(inference.n_iter):
+        info_dict = inference.update()
+
+      # The acceptance rate after warm-up is close to its target.
+      self.assertAllClose(info_dict['accept_rate'], 0.65, atol=0.1)
+
+if __name__ == '__main__':
+  tf.test.main()
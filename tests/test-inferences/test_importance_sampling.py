@@ -0,0 +1,60 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import edward as ed
+import numpy as np
+import six
+import sys
+import tensorflow as tf
+
+from edward.models import Empirical, Normal
+
+
+class test_importance_sampling_class(tf.test.TestCase):
+
+  def test_normal_normal(self):
+    with self.test_session():
+      mu = Normal(mu=0.0, sigma=1.0)
+      x = Normal(mu=tf.ones(1) * mu, sigma=tf.ones(1))
+
+      log_weights = tf.Variable(tf.zeros([5000]), trainable=False)
+      qmu = Empirical(params=tf.Variable(tf.zeros(5000)),
+                      log_weights=log_weights)
+      proposal_mu = Normal(mu=0.5, sigma=1.0)
+      x_data = np.array([1.0], dtype=np.float32)
+      inference = ed.ImportanceSampling({mu: qmu}, {mu: proposal_mu},
+                                        data={x: x_data})
+      inference.initialize()
+      tf.initialize_all_variables().run()
+      info_dict = inference.update()
+
+      # The posterior is N(0.5, 0.5).
+      log_evidence = -0.5 * np.log(4.0 * np.pi) - 0.25
+      self.assertAllClose(info_dict['log_evidence'], log_evidence, atol=0.05)
+      self.assertAllClose(qmu.mean().eval(), 0.5, atol=0.1)
+      self.assertAllClose(qmu.std().eval(), np.sqrt(0.5), atol=0.1)
+      self.assertLess(info_dict['pareto_k'], 0.7)
+
+  def test_pareto_k_warning(self):
+    with self.test_session():
+      mu = Normal(mu=0.0, sigma=1.0)
+      qmu = Empirical(params=tf.Variable(tf.zeros(100)),
+                      log_weights=tf.Variable(tf.zeros(100)))
+      inference = ed.ImportanceSampling({mu: qmu}, {mu: mu})
+      inference.initialize()
+
+      stdout = sys.stdout
+      sys.stdout = six.StringIO()
+      try:
+        inference.print_progress({'ess': 10.0, 'pareto_k': 0.5,
+                                  'log_evidence': 0.0})
+        self.assertNotIn('Warning', sys.stdout.getvalue())
+        inference.print_progress({'ess': 10.0, 'pareto_k': 0.8,
+                                  'log_evidence': 0.0})
+        self.assertIn('Warning', sys.stdout.getvalue())
+      finally:
+        sys.stdout = stdout
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -0,0 +1,35 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.models import Empirical, Normal
+
+
+class test_inference_class(tf.test.TestCase):
+
+  def test_log_joint_conditions_on_data(self):
+    # The prior of z depends on the observed x, which must be set to
+    # its realization rather than sampled.
+    log_joint_true = -np.log(2.0 * np.pi) - 2.0
+    for cls in [ed.HMC, ed.MetropolisHastings, ed.SGLD]:
+      with self.test_session():
+        x = Normal(mu=0.0, sigma=1.0)
+        z = Normal(mu=x, sigma=1.0)
+        qz = Empirical(params=tf.Variable(tf.zeros(10)))
+        if cls is ed.MetropolisHastings:
+          inference = cls({z: qz}, {z: Normal(mu=z, sigma=1.0)},
+                          data={x: np.array(2.0, dtype=np.float32)})
+        else:
+          inference = cls({z: qz}, data={x: np.array(2.0, dtype=np.float32)})
+
+        inference.initialize()
+        log_joint = inference.log_joint({z: tf.constant(2.0)})
+        for _ in range(3):
+          self.assertAllClose(log_joint.eval(), log_joint_true)
+
+if __name__ == '__main__':
+  tf.test.main()
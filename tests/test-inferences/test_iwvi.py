@@ -0,0 +1,31 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.models import Normal
+
+
+class test_iwvi_class(tf.test.TestCase):
+
+  def test_normal_normal(self):
+    with self.test_session():
+      mu = Normal(mu=0.0, sigma=1.0)
+      x = Normal(mu=tf.ones(1) * mu, sigma=tf.ones(1))
+
+      # The variational model is the exact posterior, so each
+      # importance weight is the marginal likelihood.
+      qmu = Normal(mu=tf.Variable(0.5), sigma=tf.Variable(0.70710678))
+      x_data = np.array([1.0], dtype=np.float32)
+      inference = ed.IWVI({mu: qmu}, data={x: x_data})
+      inference.initialize(K=3, n_samples=2)
+      tf.initialize_all_variables().run()
+
+      log_evidence = -0.5 * np.log(4.0 * np.pi) - 0.25
+      self.assertAllClose(inference.loss.eval(), -log_evidence, atol=1e-4)
+
+if __name__ == '__main__':
+  tf.test.main()
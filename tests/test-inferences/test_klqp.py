@@ -0,0 +1,159 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import edward as ed
+import numpy as np
+import six
+import tensorflow as tf
+
+from edward.inferences.klqp import build_natural_gradients, \
+    build_rao_blackwellized_signals, build_score_gradients
+from edward.models import Normal
+
+
+class _ScoreOptions(object):
+  def __init__(self, baseline=None, control_variate=False):
+    self.baseline = baseline
+    self.control_variate = control_variate
+    self.decay = 0.9
+    self.n_samples = 4
+
+
+class _Inference(object):
+  def __init__(self, latent_vars, data):
+    self.latent_vars = latent_vars
+    self.data = data
+    self.n_samples = 1
+    self.scale = {}
+
+
+class test_klqp_class(tf.test.TestCase):
+
+  def _score_gradient(self, baseline=None, control_variate=False):
+    # Score function h = z - mu of N(mu, 1) at mu = 0.5.
+    mu = tf.Variable(0.5)
+    z = tf.constant([-1.0, 0.0, 1.0, 3.0])
+    q_log_prob = Normal(mu=mu * tf.ones(4), sigma=tf.ones(4)).log_prob(z)
+    signal = tf.constant([1.0, 2.0, 3.0, 5.0])
+    inference = _ScoreOptions(baseline, control_variate)
+    _, grads_and_vars = build_score_gradients(inference, q_log_prob, signal,
+                                              [mu])
+    tf.initialize_all_variables().run()
+    return grads_and_vars[0][0]
+
+  def test_score_gradients(self):
+    h = np.array([-1.5, -0.5, 0.5, 2.5])
+    f = np.array([1.0, 2.0, 3.0, 5.0])
+    with self.test_session():
+      grad = self._score_gradient()
+      self.assertAllClose(grad.eval(), -np.mean(h * f))
+
+  def test_score_gradients_leave_one_out(self):
+    h = np.array([-1.5, -0.5, 0.5, 2.5])
+    f = np.array([1.0, 2.0, 3.0, 5.0])
+    with self.test_session():
+      grad = self._score_gradient(baseline='leave_one_out')
+      b = (np.sum(f) - f) / 3.0
+      self.assertAllClose(grad.eval(), -np.mean(h * (f - b)))
+
+  def test_score_gradients_moving_average(self):
+    h = np.array([-1.5, -0.5, 0.5, 2.5])
+    f = np.array([1.0, 2.0, 3.0, 5.0])
+    with self.test_session():
+      grad = self._score_gradient(baseline='moving_average')
+      # The baseline starts at zero, and is updated after each gradient.
+      self.assertAllClose(grad.eval(), -np.mean(h * f))
+      b = 0.1 * np.mean(f)
+      self.assertAllClose(grad.eval(), -np.mean(h * (f - b)))
+
+  def test_score_gradients_control_variate(self):
+    h = np.array([-1.5, -0.5, 0.5, 2.5])
+    f = np.array([1.0, 2.0, 3.0, 5.0])
+    with self.test_session():
+      grad = self._score_gradient(control_variate=True)
+      h_centered = h - np.mean(h)
+      a = np.sum((h * f - np.mean(h * f)) * h_centered) / \
+          np.sum(np.square(h_centered))
+      self.assertAllClose(grad.eval(), -np.mean(h * f - h * a))
+
+  def test_rao_blackwellized_signals(self):
+    with self.test_session():
+      mu = Normal(mu=0.0, sigma=1.0)
+      z = Normal(mu=mu, sigma=1.0)
+      x = Normal(mu=z, sigma=1.0)
+      inference = _Inference({mu: Normal(mu=0.0, sigma=1.0),
+                              z: Normal(mu=0.0, sigma=1.0)},
+                             {x: tf.constant(0.0)})
+      q_log_probs = [{mu: tf.constant(1.0), z: tf.constant(2.0)}]
+      # The KL divergence of z is analytic: its entry is -KL(q(z) || p(z)).
+      p_log_probs = [{mu: tf.constant(10.0), z: tf.constant(20.0),
+                      x: tf.constant(40.0)}]
+      q_log_prob, signals = build_rao_blackwellized_signals(
+          inference, q_log_probs, p_log_probs, [mu], [z])
+      signals = dict(zip(six.iterkeys(inference.latent_vars), signals))
+      q_log_prob = dict(zip(six.iterkeys(inference.latent_vars), q_log_prob))
+
+      # The signal of mu has its log density, the KL divergence of its
+      # child z, and its Monte Carlo entropy term.
+      self.assertAllClose(signals[mu].eval(), [10.0 + 20.0 - 1.0])
+      # The signal of z has the log likelihood of its child x, and not
+      # its own KL divergence, which is differentiated directly.
+      self.assertAllClose(signals[z].eval(), [40.0])
+      self.assertAllClose(q_log_prob[mu].eval(), [1.0])
+      self.assertAllClose(q_log_prob[z].eval(), [2.0])
+
+  def test_natural_gradients(self):
+    with self.test_session():
+      mu = tf.Variable(1.0)
+      sigma = tf.Variable(2.0)
+      inference = _Inference({Normal(mu=0.0, sigma=1.0):
+                              Normal(mu=mu, sigma=sigma)}, {})
+      grads_and_vars = build_natural_gradients(
+          inference, [(tf.constant(3.0), mu), (tf.constant(5.0), sigma)])
+      tf.initialize_all_variables().run()
+      # The inverse Fisher information is sigma^2 for mu and sigma^2 / 2
+      # for sigma.
+      self.assertAllClose(grads_and_vars[0][0].eval(), 4.0 * 3.0)
+      self.assertAllClose(grads_and_vars[1][0].eval(), 2.0 * 5.0)
+
+  def test_natural_gradients_saturated(self):
+    with self.test_session():
+      v = tf.Variable([0.0, 5.0])
+      inference = _Inference({Normal(mu=tf.zeros(2), sigma=tf.ones(2)):
+                              Normal(mu=tf.tanh(v), sigma=tf.ones(2))}, {})
+      grads_and_vars = build_natural_gradients(
+          inference, [(tf.ones(2), v)])
+      tf.initialize_all_variables().run()
+      # The Fisher information of the saturated element is floored, so
+      # its gradient is not amplified by 1 / (1 - tanh(5)^2)^2.
+      fisher = np.square(1.0 - np.square(np.tanh([0.0, 5.0])))
+      self.assertAllClose(grads_and_vars[0][0].eval(),
+                          1.0 / np.maximum(fisher, 1e-3 * np.mean(fisher)),
+                          rtol=1e-3)
+
+  def test_klpq_leave_one_out(self):
+    with self.test_session():
+      mu = Normal(mu=0.0, sigma=1.0)
+      qmu = Normal(mu=tf.Variable(0.0), sigma=tf.Variable(1.0))
+      inference = ed.KLpq({mu: qmu})
+      self.assertRaises(ValueError, inference.initialize, n_samples=4,
+                        baseline='leave_one_out')
+
+  def test_prettytensor_gradient_options(self):
+    with self.test_session():
+      mu = Normal(mu=0.0, sigma=1.0)
+      qmu = Normal(mu=tf.Variable(0.0), sigma=tf.Variable(1.0))
+      for kwargs in [{'baseline': 'moving_average'},
+                     {'control_variate': True, 'n_samples': 4},
+                     {'natural_gradient': True}]:
+        inference = ed.KLqp({mu: qmu})
+        self.assertRaises(NotImplementedError, inference.initialize,
+                          use_prettytensor=True, **kwargs)
+
+      inference = ed.KLpq({mu: qmu})
+      self.assertRaises(NotImplementedError, inference.initialize,
+                        use_prettytensor=True, baseline='moving_average')
+
+if __name__ == '__main__':
+  tf.test.main()
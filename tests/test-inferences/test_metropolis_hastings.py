@@ -0,0 +1,89 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.models import Empirical, Normal
+
+
+class test_metropolis_hastings_class(tf.test.TestCase):
+
+  def test_normal_normal(self):
+    with self.test_session():
+      tf.set_random_seed(42)
+      mu = Normal(mu=0.0, sigma=1.0)
+      x = Normal(mu=tf.ones(10) * mu, sigma=tf.ones(10))
+
+      qmu = Empirical(params=tf.Variable(tf.zeros(2000)))
+      proposal_mu = Normal(mu=mu, sigma=0.5)
+      x_data = np.ones(10, dtype=np.float32)
+      inference = ed.MetropolisHastings({mu: qmu}, {mu: proposal_mu},
+                                        data={x: x_data})
+      inference.run()
+
+      # The posterior is N(10 / 11, 1 / 11).
+      samples = qmu.params.eval()[500:]
+      self.assertAllClose(np.mean(samples), 10.0 / 11.0, atol=0.1)
+      self.assertAllClose(np.var(samples), 1.0 / 11.0, atol=0.05)
+
+  def test_cached_log_joint(self):
+    with self.test_session():
+      mu = Normal(mu=0.0, sigma=1.0)
+      x = Normal(mu=tf.ones(10) * mu, sigma=tf.ones(10))
+
+      qmu = Empirical(params=tf.Variable(tf.zeros(100)))
+      proposal_mu = Normal(mu=mu, sigma=0.5)
+      x_data = np.ones(10, dtype=np.float32)
+      inference = ed.MetropolisHastings({mu: qmu}, {mu: proposal_mu},
+                                        data={x: x_data})
+      inference.initialize()
+      tf.initialize_all_variables().run()
+      last_sample = tf.gather(qmu.params, inference.t - 1)
+      log_joint = inference.log_joint({mu: last_sample})
+      # The cached log joint is the log joint of the current state,
+      # whether or not the last proposal was accepted.
+      for _ in range(20):
+        inference.update()
+        self.assertAllClose(inference.current_log_joint.eval(),
+                            log_joint.eval())
+
+  def test_blocks(self):
+    with self.test_session():
+      tf.set_random_seed(42)
+      mu = Normal(mu=0.0, sigma=1.0)
+      x = Normal(mu=tf.ones(10) * mu, sigma=tf.ones(10))
+      nu = Normal(mu=0.0, sigma=1.0)
+      y = Normal(mu=tf.ones(10) * nu, sigma=tf.ones(10))
+
+      qmu = Empirical(params=tf.Variable(tf.zeros(4000)))
+      qnu = Empirical(params=tf.Variable(tf.zeros(4000)))
+      proposal_mu = Normal(mu=mu, sigma=0.5)
+      proposal_nu = Normal(mu=nu, sigma=0.5)
+      x_data = np.ones(10, dtype=np.float32)
+      y_data = -np.ones(10, dtype=np.float32)
+      inference = ed.MetropolisHastings(
+          {mu: qmu, nu: qnu}, {mu: proposal_mu, nu: proposal_nu},
+          data={x: x_data, y: y_data})
+      inference.initialize(blocks=[[mu], [nu]])
+      tf.initialize_all_variables().run()
+
+      # Iterations alternate between proposing mu and nu.
+      inference.update()
+      inference.update()
+      self.assertEqual(qnu.params.eval()[0], 0.0)
+      self.assertEqual(qmu.params.eval()[1], qmu.params.eval()[0])
+
+      for _ in range(3998):
+        inference.update()
+
+      # The posteriors are N(10 / 11, 1 / 11) and N(-10 / 11, 1 / 11).
+      self.assertAllClose(np.mean(qmu.params.eval()[1000:]), 10.0 / 11.0,
+                          atol=0.1)
+      self.assertAllClose(np.mean(qnu.params.eval()[1000:]), -10.0 / 11.0,
+                          atol=0.1)
+
+if __name__ == '__main__':
+  tf.test.main()
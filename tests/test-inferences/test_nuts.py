@@ -0,0 +1,51 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.models import Empirical, Normal
+
+
+class test_nuts_class(tf.test.TestCase):
+
+  def _test_normal_normal(self, *args, **kwargs):
+    tf.set_random_seed(42)
+    mu = Normal(mu=tf.zeros(2), sigma=tf.ones(2))
+    x = Normal(mu=tf.ones([10, 2]) * mu, sigma=tf.ones([10, 2]))
+
+    qmu = Empirical(params=tf.Variable(tf.zeros([1000, 2])))
+    x_data = np.ones([10, 2], dtype=np.float32)
+    inference = ed.NUTS({mu: qmu}, data={x: x_data})
+    inference.run(*args, **kwargs)
+
+    # The posterior is N(10 / 11, 1 / 11) in each dimension.
+    samples = qmu.params.eval()[100:]
+    self.assertAllClose(np.mean(samples, 0), [10.0 / 11.0] * 2, atol=0.1)
+    self.assertAllClose(np.var(samples, 0), [1.0 / 11.0] * 2, atol=0.03)
+    return inference
+
+  def test_normal_normal(self):
+    with self.test_session():
+      self._test_normal_normal(step_size=0.25)
+
+  def test_warmup(self):
+    with self.test_session():
+      # The initial step size is unstable for the posterior's scale of
+      # 1 / sqrt(11); warm-up must shrink it.
+      inference = self._test_normal_normal(step_size=2.0, n_warmup=200,
+                                           mass_matrix=None)
+      step_size = inference.step_size.eval()
+      self.assertGreater(step_size, 0.05)
+      self.assertLess(step_size, 2.0 / np.sqrt(11.0))
+
+  def test_warmup_mass_matrix(self):
+    with self.test_session():
+      inference = self._test_normal_normal(n_warmup=200)
+      inv_mass = list(inference.inv_mass.values())[0].eval()
+      self.assertAllClose(inv_mass, [1.0 / 11.0] * 2, atol=0.05)
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -0,0 +1,66 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.inferences.parallel_tempering import _swap_permutation
+from edward.models import Empirical, Normal
+
+
+class test_parallel_tempering_class(tf.test.TestCase):
+
+  def _normal_normal(self):
+    mu = Normal(mu=0.0, sigma=1.0)
+    x = Normal(mu=tf.ones(10) * mu, sigma=tf.ones(10))
+    qmu = Empirical(params=tf.Variable(tf.zeros(2000)))
+    proposal_mu = Normal(mu=mu, sigma=0.5)
+    x_data = np.ones(10, dtype=np.float32)
+    inference = ed.ParallelTempering({mu: qmu}, {mu: proposal_mu},
+                                     data={x: x_data})
+    return mu, qmu, inference
+
+  def test_swap_permutation(self):
+    with self.test_session():
+      self.assertAllEqual(
+          _swap_permutation(tf.constant([True, False, True])).eval(),
+          [1, 0, 3, 2])
+      self.assertAllEqual(
+          _swap_permutation(tf.constant([False, True, False])).eval(),
+          [0, 2, 1, 3])
+      self.assertAllEqual(
+          _swap_permutation(tf.constant([False, False, False])).eval(),
+          [0, 1, 2, 3])
+
+  def test_normal_normal(self):
+    with self.test_session():
+      tf.set_random_seed(42)
+      mu, qmu, inference = self._normal_normal()
+      inference.run(n_replicas=3, max_temperature=4.0)
+
+      # The cold replica targets the posterior N(10 / 11, 1 / 11).
+      samples = qmu.params.eval()[500:]
+      self.assertAllClose(np.mean(samples), 10.0 / 11.0, atol=0.1)
+      self.assertAllClose(np.var(samples), 1.0 / 11.0, atol=0.05)
+
+      # Only the cold replica is written to the Empirical.
+      replicas = inference.replicas[mu].eval()
+      self.assertEqual(qmu.params.eval()[-1], replicas[0])
+
+  def test_swap_rate(self):
+    with self.test_session():
+      mu, qmu, inference = self._normal_normal()
+      # Swaps between replicas of equal temperatures are always
+      # accepted, and each pair is proposed every other iteration.
+      inference.initialize(temperatures=[1.0, 1.0, 1.0])
+      tf.initialize_all_variables().run()
+      for _ in range(4):
+        info_dict = inference.update()
+
+      self.assertAllClose(info_dict['swap_rate'], [1.0, 1.0])
+      self.assertAllClose(inference.n_swap_proposed.eval(), [2.0, 2.0])
+
+if __name__ == '__main__':
+  tf.test.main()
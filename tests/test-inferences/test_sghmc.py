@@ -0,0 +1,40 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.models import Empirical, Normal
+
+
+class test_sghmc_class(tf.test.TestCase):
+
+  def test_normal_normal(self):
+    with self.test_session():
+      tf.set_random_seed(42)
+      mu = Normal(mu=0.0, sigma=1.0)
+      x = Normal(mu=tf.ones(10) * mu, sigma=tf.ones(10))
+
+      qmu = Empirical(params=tf.Variable(tf.zeros(2000)))
+      x_data = np.ones(10, dtype=np.float32)
+      inference = ed.SGHMC({mu: qmu}, data={x: x_data})
+      inference.run(step_size=0.001, schedule='constant', friction=0.1)
+
+      # The posterior is N(10 / 11, 1 / 11).
+      samples = qmu.params.eval()[500:]
+      self.assertAllClose(np.mean(samples), 10.0 / 11.0, atol=0.1)
+      self.assertAllClose(np.var(samples), 1.0 / 11.0, atol=0.05)
+
+  def test_positional_step_size(self):
+    with self.test_session():
+      mu = Normal(mu=0.0, sigma=1.0)
+      qmu = Empirical(params=tf.Variable(tf.zeros(100)))
+      inference = ed.SGHMC({mu: qmu})
+      inference.initialize(0.1)
+      self.assertEqual(inference.step_size, 0.1)
+      self.assertEqual(inference.friction, 0.1)
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -0,0 +1,75 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.models import Empirical, Normal
+
+
+class test_smc_class(tf.test.TestCase):
+
+  def _normal_normal(self, dtype=tf.float32):
+    mu = Normal(mu=0.0, sigma=1.0)
+    x = Normal(mu=tf.ones(10) * mu, sigma=tf.ones(10))
+    qmu = Empirical(params=tf.Variable(tf.zeros(1000, dtype=dtype)))
+    x_data = np.ones(10, dtype=np.float32)
+    inference = ed.SMC({mu: qmu}, data={x: x_data})
+    return qmu, inference
+
+  def _test_normal_normal(self, dtype):
+    tf.set_random_seed(42)
+    qmu, inference = self._normal_normal(dtype)
+    inference.run(n_stages=20)
+
+    # The posterior is N(10 / 11, 1 / 11), and the evidence is
+    # N(x; 0, I + 1 1^T).
+    log_evidence = -5.0 * np.log(2.0 * np.pi) - 0.5 * np.log(11.0) - \
+        5.0 / 11.0
+    self.assertAllClose(inference.log_evidence.eval(), log_evidence,
+                        atol=0.1)
+    self.assertAllClose(qmu.mean().eval(), 10.0 / 11.0, atol=0.05)
+    self.assertAllClose(qmu.std().eval(), np.sqrt(1.0 / 11.0), atol=0.05)
+
+  def test_normal_normal(self):
+    with self.test_session():
+      self._test_normal_normal(tf.float32)
+
+  def test_normal_normal_compressed(self):
+    with self.test_session():
+      self._test_normal_normal(tf.float16)
+
+  def test_resampling(self):
+    with self.test_session():
+      qmu, inference = self._normal_normal()
+      inference.initialize(n_stages=5, ess_threshold=0.0)
+      tf.initialize_all_variables().run()
+
+      # Particles are not resampled while the effective sample size is
+      # above the threshold, except at the last stage.
+      for _ in range(4):
+        info_dict = inference.update()
+        self.assertLess(info_dict['ess'], 1000.0)
+        self.assertGreater(np.std(inference.log_weights.eval()), 0.0)
+
+      info_dict = inference.update()
+      self.assertAllClose(info_dict['ess'], 1000.0)
+      self.assertAllClose(inference.log_weights.eval(),
+                          [-np.log(1000.0)] * 1000)
+
+  def test_resampling_threshold(self):
+    with self.test_session():
+      qmu, inference = self._normal_normal()
+      inference.initialize(n_stages=5, ess_threshold=1.1)
+      tf.initialize_all_variables().run()
+
+      # Particles are resampled at every stage.
+      info_dict = inference.update()
+      self.assertAllClose(info_dict['ess'], 1000.0)
+      self.assertAllClose(inference.log_weights.eval(),
+                          [-np.log(1000.0)] * 1000)
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -0,0 +1,86 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.models import Bernoulli, Empirical, Normal
+
+
+class test_subsampled_metropolis_hastings_class(tf.test.TestCase):
+
+  def _normal_normal(self, x_data):
+    mu = Normal(mu=0.0, sigma=1.0)
+    x = Normal(mu=tf.ones(100) * mu, sigma=tf.ones(100))
+    qmu = Empirical(params=tf.Variable(tf.zeros(2000)))
+    proposal_mu = Normal(mu=mu, sigma=0.05)
+    inference = ed.SubsampledMetropolisHastings(
+        {mu: qmu}, {mu: proposal_mu}, data={x: x_data})
+    return mu, qmu, inference
+
+  def test_normal_normal(self):
+    with self.test_session():
+      tf.set_random_seed(42)
+      x_data = np.random.RandomState(42).normal(
+          1.0, 1.0, 1000).astype(np.float32)
+      mu, qmu, inference = self._normal_normal(x_data)
+      mu_map = np.sum(x_data) / 1001.0
+      inference.run(batch_size=100, reference={mu: mu_map})
+
+      # The posterior is N(sum(x) / 1001, 1 / 1001).
+      samples = qmu.params.eval()[500:]
+      self.assertAllClose(np.mean(samples), mu_map, atol=0.02)
+
+  def test_control_variates(self):
+    with self.test_session():
+      x_data = np.random.RandomState(42).normal(
+          1.0, 1.0, 1000).astype(np.float32)
+      mu, qmu, inference = self._normal_normal(x_data)
+      inference.initialize(batch_size=100)
+      tf.initialize_all_variables().run()
+      # The log-likelihood ratio is linear in each data point, so the
+      # control variates are exact, and every test stops after one
+      # minibatch.
+      for _ in range(10):
+        info_dict = inference.update()
+
+      self.assertAllClose(info_dict['data_fraction'], 0.1)
+
+  def test_sequential_test(self):
+    with self.test_session():
+      tf.set_random_seed(42)
+      rng = np.random.RandomState(42)
+      c_data = rng.normal(0.0, 1.0, 1000).astype(np.float32)
+      y_data = (rng.uniform(size=1000) < 1.0 / (1.0 + np.exp(-c_data)))
+      y_data = y_data.astype(np.int32)
+      data_fractions = []
+      for epsilon in [0.5, 1e-8]:
+        c = tf.placeholder(tf.float32, [100])
+        w = Normal(mu=0.0, sigma=1.0)
+        y = Bernoulli(logits=c * w)
+        qw = Empirical(params=tf.Variable(tf.zeros(2000)))
+        proposal_w = Normal(mu=w, sigma=0.5)
+        inference = ed.SubsampledMetropolisHastings(
+            {w: qw}, {w: proposal_w}, data={c: c_data, y: y_data})
+        inference.initialize(batch_size=100, epsilon=epsilon)
+        tf.initialize_all_variables().run()
+        for _ in range(50):
+          info_dict = inference.update()
+
+        data_fractions.append(info_dict['data_fraction'])
+
+      # With epsilon = 0.5, every test stops after one minibatch; a
+      # smaller epsilon needs more data.
+      self.assertAllClose(data_fractions[0], 0.1)
+      self.assertGreater(data_fractions[1], 0.1)
+      self.assertLessEqual(data_fractions[1], 1.0)
+
+  def test_batch_size(self):
+    with self.test_session():
+      mu, qmu, inference = self._normal_normal(np.zeros(50, dtype=np.float32))
+      self.assertRaises(ValueError, inference.initialize, batch_size=100)
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -0,0 +1,54 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import edward as ed
+import numpy as np
+import tensorflow as tf
+
+from edward.models import Normal
+
+
+class test_svi_class(tf.test.TestCase):
+
+  def test_local_updates(self):
+    with self.test_session():
+      N = 4
+      M = 2
+      mu = Normal(mu=0.0, sigma=1.0)
+      z = Normal(mu=tf.ones(M) * mu, sigma=tf.ones(M))
+      x = Normal(mu=z, sigma=tf.ones(M))
+
+      # Variational factors with negligible standard deviations, so
+      # the gradient of each row mean m is 1 - 2 m given x = 1.
+      qmu = Normal(mu=tf.Variable(0.0),
+                   sigma=tf.nn.softplus(tf.Variable(-10.0)))
+      qz_mu = tf.Variable(tf.zeros(N))
+      qz_sigma = tf.Variable(-10.0 * tf.ones(N))
+      # A shared variable of another outer dimension is global.
+      shared = tf.Variable(tf.zeros([1]))
+      qz = Normal(mu=qz_mu + shared, sigma=tf.nn.softplus(qz_sigma))
+
+      x_ph = tf.placeholder(tf.float32, [M])
+      idx_ph = tf.placeholder(tf.int32, [M])
+      inference = ed.SVI({mu: qmu, z: qz}, data={x: x_ph})
+      # A large scale must not change the step size of the rows.
+      inference.initialize(local_vars=[z], idx=idx_ph, n_data=N,
+                           n_local_steps=4, local_step_size=0.1,
+                           scale={x: 1e4, z: 1e4})
+      self.assertEqual(set(inference.local_variables), set([qz_mu, qz_sigma]))
+
+      tf.initialize_all_variables().run()
+      inference.update(feed_dict={x_ph: np.ones(M, np.float32),
+                                  idx_ph: np.array([0, 2], np.int32)})
+
+      # Five gradient steps m <- m + 0.1 (1 - 2 m) on the rows of the
+      # minibatch only.
+      m = 0.0
+      for _ in range(5):
+        m += 0.1 * (1.0 - 2.0 * m)
+
+      self.assertAllClose(qz_mu.eval(), [m, 0.0, m, 0.0], atol=1e-2)
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -32,5 +32,41 @@ class test_empirical_sample_class(tf.test.TestCase):
       _test(tf.constant([0.2, 0.8]), [1])
       _test(tf.constant([0.2, 0.8]), [10])
 
+  def test_n_filled(self):
+    with self.test_session() as sess:
+      params = tf.Variable(tf.constant([1.0, 2.0, 0.0, 0.0]))
+      x = Empirical(params=params)
+      sample = x.sample(100)
+      tf.initialize_all_variables().run()
+      sess.run(x.n_filled.assign(2))
+      val = sample.eval()
+      assert np.all(np.logical_or(val == 1.0, val == 2.0))
+      self.assertAllClose(x.mean().eval(), 1.5)
+
+  def test_compressed(self):
+    with self.test_session():
+      params = np.array([[0.0, 1.0], [0.5, 2.0]])
+      x = Empirical(params=tf.constant(params, dtype=tf.float16))
+      self.assertEqual(x.sample(5).dtype, tf.float32)
+      self.assertAllClose(x.mean().eval(), np.mean(params, 0))
+
+      scale = tf.constant([0.5 / 255, 1.0 / 255])
+      offset = tf.constant([0.0, 1.0])
+      x = Empirical(params=tf.zeros([2, 2], dtype=tf.uint8),
+                    scale=scale, offset=offset)
+      stored = x.compress(tf.constant(params, dtype=tf.float32))
+      x = Empirical(params=stored, scale=scale, offset=offset)
+      self.assertAllClose(x.mean().eval(), np.mean(params, 0), atol=1e-2)
+
+  def test_weighted(self):
+    with self.test_session():
+      params = tf.constant([0.0, 1.0, 2.0])
+      log_weights = tf.log(tf.constant([0.0, 0.25, 0.75]))
+      x = Empirical(params=params, log_weights=log_weights)
+      self.assertAllClose(x.mean().eval(), 1.75)
+      self.assertAllClose(x.std().eval(), np.sqrt(0.1875))
+      val = x.sample(100).eval()
+      assert np.all(np.logical_or(val == 1.0, val == 2.0))
+
 if __name__ == '__main__':
   tf.test.main()
@@ -0,0 +1,26 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import tensorflow as tf
+
+from edward.models import Normal
+from edward.util import get_blanket
+
+
+class test_get_blanket_class(tf.test.TestCase):
+
+  def test_blanket_structure(self):
+    with self.test_session():
+      a = Normal(mu=0.0, sigma=1.0)
+      b = Normal(mu=0.0, sigma=1.0)
+      c = Normal(mu=tf.mul(a, b), sigma=1.0)
+      d = Normal(mu=0.0, sigma=1.0)
+      e = Normal(mu=tf.mul(c, d), sigma=1.0)
+      f = Normal(mu=e, sigma=1.0)
+      self.assertEqual(set(get_blanket(a)), set([b, c]))
+      self.assertEqual(set(get_blanket(c)), set([a, b, d, e]))
+      self.assertEqual(set(get_blanket(f)), set([e]))
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -0,0 +1,31 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import tensorflow as tf
+
+from edward.models import Normal
+from edward.util import get_children
+
+
+class test_get_children_class(tf.test.TestCase):
+
+  def test_v_structure(self):
+    with self.test_session():
+      a = Normal(mu=0.0, sigma=1.0)
+      b = Normal(mu=0.0, sigma=1.0)
+      c = Normal(mu=tf.mul(a, b), sigma=1.0)
+      self.assertEqual(get_children(a), [c])
+      self.assertEqual(get_children(b), [c])
+      self.assertEqual(get_children(c), [])
+
+  def test_chain_structure(self):
+    with self.test_session():
+      a = Normal(mu=0.0, sigma=1.0)
+      b = Normal(mu=a, sigma=1.0)
+      c = Normal(mu=b, sigma=1.0)
+      self.assertEqual(get_children(a), [b])
+      self.assertEqual(get_children(b), [c])
+
+if __name__ == '__main__':
+  tf.test.main()
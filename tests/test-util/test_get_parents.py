@@ -0,0 +1,39 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import tensorflow as tf
+
+from edward.models import Bernoulli, Normal
+from edward.util import get_parents
+
+
+class test_get_parents_class(tf.test.TestCase):
+
+  def test_v_structure(self):
+    with self.test_session():
+      a = Normal(mu=0.0, sigma=1.0)
+      b = Normal(mu=0.0, sigma=1.0)
+      c = Normal(mu=tf.mul(a, b), sigma=1.0)
+      self.assertEqual(set(get_parents(a)), set([]))
+      self.assertEqual(set(get_parents(b)), set([]))
+      self.assertEqual(set(get_parents(c)), set([a, b]))
+
+  def test_chain_structure(self):
+    with self.test_session():
+      a = Normal(mu=0.0, sigma=1.0)
+      b = Normal(mu=a, sigma=1.0)
+      c = Normal(mu=b, sigma=tf.exp(b))
+      self.assertEqual(get_parents(b), [a])
+      self.assertEqual(get_parents(c), [b])
+
+  def test_collection(self):
+    with self.test_session():
+      a = Normal(mu=0.0, sigma=1.0)
+      b = Bernoulli(logits=a)
+      c = Normal(mu=tf.cast(b, tf.float32), sigma=1.0)
+      self.assertEqual(get_parents(c), [b])
+      self.assertEqual(get_parents(c, collection=[a, c]), [a])
+
+if __name__ == '__main__':
+  tf.test.main()
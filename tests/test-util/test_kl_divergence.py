@@ -0,0 +1,65 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import tensorflow as tf
+
+from edward.models import Bernoulli, Beta, Categorical, Exponential, \
+    Gamma, MultivariateNormalDiag, MultivariateNormalFull, Normal, \
+    Poisson, Uniform
+from edward.util import kl_divergence, register_kl
+
+
+class test_kl_divergence_class(tf.test.TestCase):
+
+  def _mc_kl(self, q, p, n_samples=100000):
+    samples = q.sample(n_samples)
+    return tf.reduce_mean(q.log_prob(samples) - p.log_prob(samples), 0)
+
+  def test_normal(self):
+    with self.test_session():
+      q = Normal(mu=tf.constant([0.0, 1.0]), sigma=tf.constant([1.0, 2.0]))
+      p = Normal(mu=tf.constant([1.0, 1.0]), sigma=tf.constant([1.0, 1.0]))
+      self.assertAllClose(kl_divergence(q, p).eval(),
+                          [0.5, 1.5 - np.log(2.0)])
+
+  def test_multivariate_normal(self):
+    with self.test_session():
+      q = MultivariateNormalDiag(mu=tf.constant([0.0, 1.0]),
+                                 diag_stdev=tf.constant([1.0, 2.0]))
+      p = MultivariateNormalDiag(mu=tf.constant([1.0, 1.0]),
+                                 diag_stdev=tf.constant([1.0, 1.0]))
+      p_full = MultivariateNormalFull(mu=tf.constant([1.0, 1.0]),
+                                      sigma=tf.diag(tf.constant([1.0, 1.0])))
+      expected = 2.0 - np.log(2.0)
+      self.assertAllClose(kl_divergence(q, p).eval(), expected)
+      self.assertAllClose(kl_divergence(q, p_full).eval(), expected)
+
+  def test_monte_carlo(self):
+    with self.test_session():
+      pairs = [(Gamma(alpha=2.0, beta=3.0), Gamma(alpha=1.0, beta=1.0)),
+               (Exponential(lam=2.0), Exponential(lam=0.5)),
+               (Beta(a=2.0, b=3.0), Beta(a=1.0, b=1.0)),
+               (Bernoulli(p=0.2), Bernoulli(p=0.7)),
+               (Categorical(logits=tf.constant([0.0, 1.0, 2.0])),
+                Categorical(logits=tf.constant([1.0, 1.0, 1.0]))),
+               (Poisson(lam=2.0), Poisson(lam=4.0))]
+      for q, p in pairs:
+        self.assertAllClose(kl_divergence(q, p).eval(),
+                            self._mc_kl(q, p).eval(), atol=1e-2)
+
+  def test_register_kl(self):
+    with self.test_session():
+      q = Uniform(a=0.0, b=1.0)
+      p = Uniform(a=0.0, b=2.0)
+      self.assertRaises(NotImplementedError, kl_divergence, q, p)
+
+      @register_kl(Uniform, Uniform)
+      def _kl_uniform_uniform(q, p):
+        return tf.log(p.b - p.a) - tf.log(q.b - q.a)
+
+      self.assertAllClose(kl_divergence(q, p).eval(), np.log(2.0))
+
+if __name__ == '__main__':
+  tf.test.main()